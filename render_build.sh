@@ -8,6 +8,12 @@ echo "🚀 Starting Build Process..."
 echo "🐍 Installing Python Dependencies..."
 pip install -r server/requirements.txt
 
+# Precompute color lookup tables loaded by the server at startup
+echo "🎨 Building OKLCH gamut table..."
+(cd server && python gamut_lut.py)
+echo "🔎 Building nearest-compliant-color index..."
+(cd server && python color_index.py)
+
 # Build Frontend only if web directory exists (optional)
 if [ -d "web" ] && [ -f "web/package.json" ]; then
     echo "🏗️ Building Frontend..."
@@ -0,0 +1,269 @@
+"""
+Offline batch auditor: the check_color_accessibility analysis from the
+command line, without starting the server.
+
+    python audit_cli.py pairs.csv -o results.jsonl --target AA
+    python audit_cli.py pairs.jsonl --workers 4 --fail-on-violations
+    python audit_cli.py pairs.csv --metrics apca --target-metric apca --target BODY
+    cat pairs.jsonl | python audit_cli.py - > results.jsonl
+
+Inputs are CSV (columns foreground, background and optionally element),
+JSONL (one {"foreground", "background", "element"} object per line) or
+JSON (an array of those objects, or {"color_pairs": [...]}). The input is
+read in chunks that are sharded across a process pool; results are
+written in input order as JSONL, one line per input record, in the same
+format as POST /audit. Throughput and per-stage timings go to stderr.
+
+Only the analysis modules are imported (no FastAPI), so start-up stays
+short for CI jobs.
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import bulk_audit
+import contrast_metrics
+import contrast_solver
+import cvd_simulation
+import gamut_lut
+
+FORMATS = ("csv", "jsonl", "json")
+
+
+def detect_format(path):
+    """Input format from the file extension (stdin and unknown extensions: JSONL)"""
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    if ext == "ndjson":
+        return "jsonl"
+    return ext if ext in FORMATS else "jsonl"
+
+
+def _check_pair(pair):
+    if not isinstance(pair, dict):
+        return None, "Each record must be a JSON object"
+    for key in ("foreground", "background"):
+        if not isinstance(pair.get(key), str):
+            return None, f"Missing or non-string '{key}'"
+    return pair, None
+
+
+def read_records(stream, fmt):
+    """Yield (record number, pair or None, error or None) from an input stream"""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for number, row in enumerate(reader, 1):
+            pair = {key.strip().lower(): (value or "").strip()
+                    for key, value in row.items() if key is not None}
+            if not pair.get("element"):
+                pair.pop("element", None)
+            if not pair.get("foreground") or not pair.get("background"):
+                yield number, None, "Missing 'foreground' or 'background' column"
+            else:
+                yield number, pair, None
+    elif fmt == "json":
+        data = json.load(stream)
+        if isinstance(data, dict):
+            data = data.get("color_pairs")
+        if not isinstance(data, list):
+            raise ValueError("JSON input must be an array of pairs or an object with 'color_pairs'")
+        for number, item in enumerate(data, 1):
+            pair, error = _check_pair(item)
+            yield number, pair, error
+    else:
+        for number, line in enumerate(stream, 1):
+            if line.strip():
+                pair, error = bulk_audit.parse_record(line)
+                yield number, pair, error
+
+
+def _chunks(records, size):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _audit_chunk(records, target_ratio, options=None):
+    """bulk_audit.audit_records() plus the time spent on it (runs in a worker)"""
+    start = time.perf_counter()
+    body, counts = bulk_audit.audit_records(records, target_ratio, options)
+    return body, counts, time.perf_counter() - start
+
+
+def run_audit(records, output, target_ratio=4.5, workers=None, chunk_size=bulk_audit.BULK_CHUNK_SIZE,
+              options=None):
+    """
+    Audit (number, pair, error) records, writing JSONL bytes to output in
+    input order. `options` are the bulk_audit.audit_records() options
+    (vision, metrics, ...). Returns the summary dict with totals and stage
+    timings.
+    """
+    options = options or {}
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    totals = {"pairs": 0, "passed": 0, "failed": 0, "invalid": 0}
+    timings = {"read": 0.0, "analyze": 0.0, "wait": 0.0, "write": 0.0}
+    chunks = 0
+    start = time.perf_counter()
+
+    def collect(result):
+        body, counts, analyze_seconds = result
+        timings["analyze"] += analyze_seconds
+        for key, value in counts.items():
+            totals[key] = totals.get(key, 0) + value
+        tick = time.perf_counter()
+        output.write(body)
+        timings["write"] += time.perf_counter() - tick
+
+    source = _chunks(records, chunk_size)
+
+    def next_chunk():
+        tick = time.perf_counter()
+        chunk = next(source, None)
+        timings["read"] += time.perf_counter() - tick
+        return chunk
+
+    if workers <= 0:
+        gamut_lut.load()
+        while (chunk := next_chunk()) is not None:
+            chunks += 1
+            collect(_audit_chunk(chunk, target_ratio, options))
+    else:
+        # spawn, like the server's pool: workers import only the analysis modules
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=gamut_lut.load) as executor:
+            in_flight = deque()
+            # Two chunks per worker: one running, one queued while results are written
+            while (chunk := next_chunk()) is not None:
+                chunks += 1
+                in_flight.append(executor.submit(_audit_chunk, chunk, target_ratio, options))
+                while len(in_flight) > 2 * workers:
+                    tick = time.perf_counter()
+                    result = in_flight.popleft().result()
+                    timings["wait"] += time.perf_counter() - tick
+                    collect(result)
+            while in_flight:
+                tick = time.perf_counter()
+                result = in_flight.popleft().result()
+                timings["wait"] += time.perf_counter() - tick
+                collect(result)
+    output.flush()
+
+    elapsed = time.perf_counter() - start
+    lines = totals["pairs"] + totals["invalid"]
+    summary = {
+        "total_lines": lines,
+        "total_pairs": totals["pairs"],
+        "passed_pairs": totals["passed"],
+        "failed_pairs": totals["failed"],
+        "invalid_lines": totals["invalid"],
+        "target_ratio": target_ratio,
+        "workers": max(0, workers),
+        "chunks": chunks,
+        "elapsed_seconds": round(elapsed, 3),
+        "pairs_per_second": round(lines / elapsed, 1) if elapsed > 0 else None,
+        # analyze is summed across workers; read/wait/write are main-process wall time
+        "stage_seconds": {stage: round(seconds, 3) for stage, seconds in timings.items()},
+    }
+    summary.update(bulk_audit.summary_blocks(totals, options))
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Audit color pairs for WCAG contrast without running the server")
+    parser.add_argument("input", help="CSV, JSONL or JSON file of color pairs ('-' for stdin)")
+    parser.add_argument("-o", "--output", default="-", help="JSONL output file (default: stdout)")
+    parser.add_argument("--format", choices=FORMATS,
+                        help="input format (default: from the extension, JSONL for stdin)")
+    parser.add_argument("--target",
+                        help="AA, AAA, AA_LARGE, AAA_LARGE or a ratio (default: AA); with --target-metric apca: "
+                             "BODY, CONTENT, LARGE, SPOT or an Lc value (default: BODY)")
+    parser.add_argument("--metrics", default="",
+                        help="extra contrast metrics reported per pair, comma-separated: apca (wcag2 is always included)")
+    parser.add_argument("--target-metric", default="wcag2", choices=list(contrast_metrics.METRICS),
+                        help="metric the suggestions must reach (default: wcag2)")
+    parser.add_argument("--threshold", action="append", default=[], metavar="FLAG=VALUE",
+                        help="override a pass level, e.g. aa_normal=5 or apca_body=90 (repeatable)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: CPU count, 0 = no pool)")
+    parser.add_argument("--chunk-size", type=int, default=bulk_audit.BULK_CHUNK_SIZE,
+                        help=f"records per task (default: {bulk_audit.BULK_CHUNK_SIZE})")
+    parser.add_argument("--vision", nargs="?", const="all", default="all",
+                        help="color vision deficiencies to simulate, as check_color_accessibility does: "
+                             "'all' (default), 'none' or comma-separated "
+                             "protanopia,deuteranopia,tritanopia,achromatopsia")
+    parser.add_argument("--vision-severity", type=float, default=1.0,
+                        help="severity of the simulated deficiencies, 0-1 (default: 1)")
+    parser.add_argument("--fail-on-violations", action="store_true",
+                        help="exit with status 1 if any pair fails or any record is invalid")
+    parser.add_argument("--quiet", action="store_true", help="do not print the summary to stderr")
+    args = parser.parse_args(argv)
+
+    try:
+        metrics = contrast_metrics.resolve_metrics(args.metrics, args.target_metric)
+        overrides = {}
+        for item in args.threshold:
+            flag, sep, value = item.partition("=")
+            if not sep:
+                raise ValueError(f"expected FLAG=VALUE, got '{item}'")
+            overrides[flag.strip()] = float(value)
+        thresholds = contrast_metrics.resolve_thresholds(metrics, overrides)
+    except ValueError as e:
+        parser.error(f"invalid --metrics/--threshold: {e}")
+    try:
+        target_ratio = contrast_solver.resolve_target(args.target, args.target_metric)
+    except ValueError as e:
+        parser.error(f"invalid --target: {e}")
+    try:
+        vision = cvd_simulation.parse_deficiencies(args.vision)
+        severity = cvd_simulation.resolve_severity(args.vision_severity)
+    except ValueError as e:
+        parser.error(f"invalid --vision: {e}")
+    options = {
+        "vision": vision,
+        "severity": severity,
+        "metrics": metrics,
+        "thresholds": thresholds,
+        "target_metric": args.target_metric,
+    }
+    fmt = args.format or detect_format(args.input)
+
+    source = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+    output = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    try:
+        summary = run_audit(read_records(source, fmt), output, target_ratio,
+                            args.workers, max(1, args.chunk_size), options)
+    except (ValueError, csv.Error) as e:
+        print(f"❌ Could not read {args.input}: {e}", file=sys.stderr)
+        return 2
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout.buffer:
+            output.close()
+
+    if not args.quiet:
+        stages = ", ".join(f"{stage} {seconds}s" for stage, seconds in summary["stage_seconds"].items())
+        print(f"📦 Audited {summary['total_pairs']} pairs ({summary['failed_pairs']} failed, "
+              f"{summary['invalid_lines']} invalid) in {summary['elapsed_seconds']}s "
+              f"= {summary['pairs_per_second']} pairs/s [{stages}]", file=sys.stderr)
+        print(json.dumps({"summary": summary}), file=sys.stderr)
+
+    if args.fail_on_violations and (summary["failed_pairs"] or summary["invalid_lines"]):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
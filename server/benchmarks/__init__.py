@@ -0,0 +1,18 @@
+"""
+Micro-benchmarks for the color math and the MCP dispatch, with baselines.
+
+Run from the server directory:
+
+    python -m benchmarks                                   # default workloads
+    python -m benchmarks --sizes 10,1000 --fail-ratios 0.5 --cases analyze
+    python -m benchmarks --save benchmarks/baseline.json   # record a baseline
+    python -m benchmarks --compare benchmarks/baseline.json --max-regression 10
+
+Workloads (workloads.py) are deterministic fg/bg pairs of a given size with
+a given share failing WCAG AA. Cases (cases.py) time one function each over a
+workload, plus an end-to-end tools/call through the ASGI app in-process.
+runner.py reports the best time and throughput (items per second) of
+each case and fails when throughput dropped more than --max-regression
+percent against a saved baseline. Baselines are specific to one machine:
+record them where they will be compared.
+"""
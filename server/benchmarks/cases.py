@@ -0,0 +1,132 @@
+"""
+Benchmark cases. Each case prepares a callable over a workload and says
+how many items (colors, pairs, calls) one run processes; runner.py times it.
+
+prepare(workload) returns (run, items), or None when the workload has
+nothing for the case (e.g. no failing pairs to suggest colors for).
+"""
+import asyncio
+import json
+import logging
+
+import color_audit
+import structured_log
+from tests.asgi_client import asgi_request
+
+# generate_oklch_suggestions is one solver call per pair: time it on this many
+SINGLE_CALL_LIMIT = 200
+
+
+class Case:
+    def __init__(self, name, prepare, unit, by_fail_ratio=True):
+        self.name = name
+        self.prepare = prepare
+        self.unit = unit
+        # Cases whose cost doesn't depend on the fail ratio run once per size
+        self.by_fail_ratio = by_fail_ratio
+
+
+def _luminance(workload):
+    colors = [tuple(rgb) for rgb in workload.fg_rgb.tolist()]
+    return (lambda: [color_audit.calculate_luminance(r, g, b) for r, g, b in colors]), len(colors)
+
+
+def _contrast_ratio(workload):
+    pairs = list(zip(workload.fg_rgb.tolist(), workload.bg_rgb.tolist()))
+    return (lambda: [color_audit.calculate_contrast_ratio(fg, bg) for fg, bg in pairs]), len(pairs)
+
+
+def _hex_to_rgb(workload):
+    colors = workload.foregrounds
+    return (lambda: [color_audit.hex_to_rgb(color) for color in colors]), len(colors)
+
+
+def _evaluate_wcag(workload):
+    ratios = workload.ratios.tolist()
+    return (lambda: [color_audit.evaluate_wcag(ratio) for ratio in ratios]), len(ratios)
+
+
+def _suggestions(workload):
+    failing = workload.failing_pairs()[:SINGLE_CALL_LIMIT]
+    if not failing:
+        return None
+    return (lambda: [color_audit.generate_oklch_suggestions(bg, fg) for bg, fg in failing]), len(failing)
+
+
+def _suggestions_batch(workload):
+    failing = workload.failing_pairs()
+    if not failing:
+        return None
+    return (lambda: color_audit.generate_oklch_suggestions_batch(failing, verbose=False)), len(failing)
+
+
+def _analyze(workload):
+    pairs = workload.color_pairs()
+    return (lambda: color_audit.analyze_color_pairs(pairs, options={"verbose": False})), len(pairs)
+
+
+# ============================================================================
+# IN-PROCESS ASGI
+# ============================================================================
+
+class _Server:
+    """The FastAPI app with its startup hooks run, on a private event loop"""
+
+    def __init__(self):
+        # Imported here: FastAPI is only needed by this case
+        import main
+        import result_cache
+        self.main = main
+        # Every run must do the work, not read the previous one's result
+        result_cache.RESULTS.enabled = False
+        # One INFO summary per call would interleave with the report
+        logging.getLogger(structured_log.ROOT).setLevel(logging.WARNING)
+        self.loop = asyncio.new_event_loop()
+        self.loop.run_until_complete(main.start_worker_pool())
+
+    def call(self, body):
+        return self.loop.run_until_complete(asgi_request(
+            self.main.app, "POST", "/mcp", body, [(b"content-type", b"application/json")]))
+
+    def close(self):
+        self.loop.run_until_complete(self.main.shutdown_worker_pool())
+        self.loop.close()
+
+
+_server = None
+
+
+def _tools_call(workload):
+    global _server
+    if _server is None:
+        _server = _Server()
+    body = json.dumps({
+        "jsonrpc": "2.0",
+        "id": 1,
+        "method": "tools/call",
+        "params": {"name": "check_color_accessibility", "arguments": {"color_pairs": workload.color_pairs()}}
+    }).encode("utf-8")
+    status, content = _server.call(body)
+    if status != 200 or "error" in json.loads(content):
+        raise RuntimeError(f"tools/call failed with HTTP {status}: {content[:200]!r}")
+    return (lambda: _server.call(body)), workload.size
+
+
+def close():
+    """Stop what the cases started (the in-process server and its worker pool)"""
+    global _server
+    if _server is not None:
+        _server.close()
+        _server = None
+
+
+CASES = [
+    Case("calculate_luminance", _luminance, "colors", by_fail_ratio=False),
+    Case("calculate_contrast_ratio", _contrast_ratio, "pairs", by_fail_ratio=False),
+    Case("hex_to_rgb", _hex_to_rgb, "colors", by_fail_ratio=False),
+    Case("evaluate_wcag", _evaluate_wcag, "ratios", by_fail_ratio=False),
+    Case("generate_oklch_suggestions", _suggestions, "pairs"),
+    Case("generate_oklch_suggestions_batch", _suggestions_batch, "pairs"),
+    Case("analyze_color_pairs", _analyze, "pairs"),
+    Case("mcp_tools_call", _tools_call, "pairs"),
+]
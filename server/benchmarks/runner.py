@@ -0,0 +1,187 @@
+"""
+Run the benchmark cases over the workloads, save results as a baseline
+and compare against one.
+
+Each case runs once untimed (warm-up: caches, lookup tables, worker
+processes), then --repeat timed runs. Throughput is items per second of
+the best run, the least noisy estimate on a shared machine. A case
+regresses when its throughput is more than --max-regression percent
+below the baseline; the exit status is then 1.
+"""
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import gamut_lut
+from benchmarks import cases as bench_cases
+from benchmarks.workloads import Workload
+
+DEFAULT_SIZES = (10, 1000, 100000)
+DEFAULT_FAIL_RATIOS = (0.1, 0.5, 0.9)
+RESULTS_VERSION = 1
+
+
+def _numbers(text, kind):
+    return [kind(value) for value in text.split(",") if value.strip()]
+
+
+def time_runs(run, repeat):
+    """Seconds of each of `repeat` runs after one warm-up run (GC off while timing, like timeit)"""
+    run()
+    times = []
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+    finally:
+        if enabled:
+            gc.enable()
+    return times
+
+
+def run_benchmarks(selected, sizes, fail_ratios, repeat, seed=0, report=None):
+    """{key: result} for every case x workload; `report(key, result)` is called as each one finishes"""
+    results = {}
+    for size in sizes:
+        workloads = [Workload(size, fail_ratio, seed) for fail_ratio in fail_ratios]
+        for case in selected:
+            for workload in workloads if case.by_fail_ratio else workloads[:1]:
+                key = f"{case.name}/{workload.name}" if case.by_fail_ratio else f"{case.name}/{size}"
+                prepared = case.prepare(workload)
+                if prepared is None:
+                    continue
+                run, items = prepared
+                times = time_runs(run, repeat)
+                best = min(times)
+                results[key] = {
+                    "case": case.name,
+                    "size": size,
+                    "fail_ratio": workload.fail_ratio if case.by_fail_ratio else None,
+                    "items": items,
+                    "unit": case.unit,
+                    "best_seconds": round(best, 6),
+                    "median_seconds": round(statistics.median(times), 6),
+                    "items_per_second": round(items / best, 1) if best > 0 else None,
+                }
+                if report is not None:
+                    report(key, results[key])
+    return results
+
+
+def compare(results, baseline, max_regression):
+    """[(key, baseline items/s, current items/s, change %)] and the keys that regressed"""
+    rows = []
+    regressed = []
+    for key, result in results.items():
+        before = baseline.get("results", {}).get(key, {}).get("items_per_second")
+        now = result["items_per_second"]
+        if not before or not now:
+            rows.append((key, before, now, None))
+            continue
+        change = (now - before) / before * 100.0
+        rows.append((key, before, now, change))
+        if change < -max_regression:
+            regressed.append(key)
+    return rows, regressed
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmark the color math and the MCP dispatch; compare against a saved baseline")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help=f"pairs per workload, comma-separated (default: {','.join(map(str, DEFAULT_SIZES))})")
+    parser.add_argument("--fail-ratios", default=",".join(map(str, DEFAULT_FAIL_RATIOS)),
+                        help="share of pairs failing WCAG AA per workload, comma-separated "
+                             f"(default: {','.join(map(str, DEFAULT_FAIL_RATIOS))})")
+    parser.add_argument("--cases", default="",
+                        help="only the cases whose name contains one of these words, comma-separated "
+                             f"(available: {', '.join(case.name for case in bench_cases.CASES)})")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case (default: 3)")
+    parser.add_argument("--seed", type=int, default=0, help="workload random seed (default: 0)")
+    parser.add_argument("--save", metavar="FILE", help="write the results as a baseline JSON file")
+    parser.add_argument("--compare", metavar="FILE", help="baseline JSON file to compare against")
+    parser.add_argument("--max-regression", type=float, default=10.0,
+                        help="fail if throughput drops more than this percent below the baseline (default: 10)")
+    args = parser.parse_args(argv)
+
+    try:
+        sizes = _numbers(args.sizes, int)
+        fail_ratios = _numbers(args.fail_ratios, float)
+        if any(size < 1 for size in sizes) or not sizes or not fail_ratios:
+            raise ValueError("sizes must be positive and at least one size and fail ratio is needed")
+        if any(not 0.0 <= ratio <= 1.0 for ratio in fail_ratios):
+            raise ValueError("fail ratios must be between 0 and 1")
+    except ValueError as e:
+        parser.error(str(e))
+    words = [word.strip() for word in args.cases.split(",") if word.strip()]
+    selected = [case for case in bench_cases.CASES if not words or any(word in case.name for word in words)]
+    if not selected:
+        parser.error(f"no case matches '{args.cases}'")
+
+    baseline = None
+    if args.compare:
+        try:
+            with open(args.compare, encoding="utf-8") as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"❌ Could not read baseline {args.compare}: {e}", file=sys.stderr)
+            return 2
+
+    gamut_lut.load()
+
+    def report(key, result):
+        print(f"{key:<50} {result['best_seconds'] * 1000:>11.3f} ms {result['items_per_second']:>14,.0f} "
+              f"{result['unit']}/s", flush=True)
+
+    try:
+        results = run_benchmarks(selected, sizes, fail_ratios, max(1, args.repeat), args.seed, report)
+    finally:
+        bench_cases.close()
+
+    if args.save:
+        document = {
+            "version": RESULTS_VERSION,
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "environment": environment(),
+            "config": {"sizes": sizes, "fail_ratios": fail_ratios, "repeat": args.repeat, "seed": args.seed},
+            "results": results,
+        }
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=2)
+            f.write("\n")
+        print(f"✅ Baseline written to {args.save}")
+
+    if baseline is None:
+        return 0
+    rows, regressed = compare(results, baseline, args.max_regression)
+    print(f"\nAgainst {args.compare} (max regression {args.max_regression:g}%):")
+    for key, before, now, change in rows:
+        if change is None:
+            print(f"  {key:<50} not in baseline")
+            continue
+        status = "❌" if key in regressed else "✅"
+        print(f"  {status} {key:<48} {before:>14,.0f} → {now:>14,.0f} ({change:+.1f}%)")
+    if regressed:
+        print(f"❌ {len(regressed)} of {len(rows)} benchmarks regressed more than {args.max_regression:g}%")
+        return 1
+    print(f"✅ No benchmark regressed more than {args.max_regression:g}%")
+    return 0
@@ -0,0 +1,67 @@
+"""
+Deterministic benchmark workloads: fg/bg hex pairs with a chosen share
+failing WCAG AA (normal text).
+
+Random colors are drawn in batches, their ratios computed with
+contrast_engine and sorted into passing / failing pools until both hold
+enough pairs; the same (size, fail_ratio, seed) always gives the same pairs.
+"""
+import numpy as np
+
+import contrast_engine
+
+AA_NORMAL = 4.5
+
+
+def _hex(rgb):
+    return [f"#{r:02X}{g:02X}{b:02X}" for r, g, b in rgb.tolist()]
+
+
+class Workload:
+    """`size` pairs of which round(size * fail_ratio) fail AA, plus views the cases need"""
+
+    def __init__(self, size, fail_ratio, seed=0):
+        if not 0.0 <= fail_ratio <= 1.0:
+            raise ValueError(f"fail_ratio must be between 0 and 1, got {fail_ratio}")
+        self.size = size
+        self.fail_ratio = fail_ratio
+        self.seed = seed
+        rng = np.random.default_rng([seed, size, int(fail_ratio * 1000)])
+        n_fail = round(size * fail_ratio)
+        fg, bg, ratios = self._draw(rng, size - n_fail, n_fail)
+        self.fg_rgb = fg
+        self.bg_rgb = bg
+        self.ratios = ratios
+        self.foregrounds = _hex(fg)
+        self.backgrounds = _hex(bg)
+
+    @staticmethod
+    def _draw(rng, n_pass, n_fail):
+        passing, failing = [], []
+        have_pass = have_fail = 0
+        while have_pass < n_pass or have_fail < n_fail:
+            colors = rng.integers(0, 256, size=(max(4096, 2 * (n_pass + n_fail)), 2, 3), dtype=np.uint8)
+            fails = contrast_engine.contrast_ratios(colors[:, 0], colors[:, 1]) < AA_NORMAL
+            passing.append(colors[~fails])
+            failing.append(colors[fails])
+            have_pass += int((~fails).sum())
+            have_fail += int(fails.sum())
+        pairs = np.concatenate([np.concatenate(passing)[:n_pass], np.concatenate(failing)[:n_fail]])
+        pairs = pairs[rng.permutation(len(pairs))]
+        return pairs[:, 0], pairs[:, 1], contrast_engine.contrast_ratios(pairs[:, 0], pairs[:, 1])
+
+    @property
+    def name(self):
+        return f"{self.size}/fail={self.fail_ratio:g}"
+
+    def color_pairs(self):
+        """check_color_accessibility input"""
+        return [
+            {"element": f"Elemento {i}", "foreground": fg, "background": bg}
+            for i, (fg, bg) in enumerate(zip(self.foregrounds, self.backgrounds))
+        ]
+
+    def failing_pairs(self):
+        """(bg_hex, fg_hex) of the pairs below AA, as generate_oklch_suggestions takes them"""
+        rows = np.flatnonzero(self.ratios < AA_NORMAL).tolist()
+        return [(self.backgrounds[i], self.foregrounds[i]) for i in rows]
@@ -0,0 +1,198 @@
+"""
+Constant-memory NDJSON bulk audit.
+
+The request body is read as a stream of newline-delimited pairs
+({"foreground", "background", "element"}), grouped into BULK_CHUNK_SIZE
+chunks and analyzed with the same logic as check_color_accessibility.
+Each chunk is analyzed and serialized to NDJSON in the worker pool while
+the next one is being read; at most one chunk per worker is in flight, so
+memory stays flat whatever the input size. Every input line gets one
+output line (`line` is its 1-based number): the analyzed pair or an
+`error`. A final {"summary": {...}} line closes the stream. When color
+vision deficiencies are requested, each pair also carries "vision" and
+the summary counts the pairs failing AA under each deficiency. With
+other contrast metrics (APCA), the summary counts the pairs passing each
+of their levels.
+"""
+import asyncio
+import json
+import os
+import time
+from collections import deque
+
+import contrast_metrics
+import contrast_solver
+import cvd_simulation
+import structured_log
+import worker_pool
+from color_audit import analyze_pairs_with_errors
+
+log = structured_log.get_logger("bulk_audit")
+
+BULK_CHUNK_SIZE = max(1, int(os.getenv("BULK_CHUNK_SIZE", "1024")))
+MAX_LINE_BYTES = int(os.getenv("BULK_MAX_LINE_BYTES", "65536"))
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def parse_record(line):
+    """(pair dict, None) for a valid NDJSON line, or (None, error message)"""
+    try:
+        pair = json.loads(line)
+    except ValueError as e:
+        return None, f"Invalid JSON: {e}"
+    if not isinstance(pair, dict):
+        return None, "Each line must be a JSON object"
+    for key in ("foreground", "background"):
+        if not isinstance(pair.get(key), str):
+            return None, f"Missing or non-string '{key}'"
+    return pair, None
+
+
+def audit_records(records, target_ratio, options=None):
+    """
+    Analyze (line, pair, error) records; returns the NDJSON output as bytes
+    and the chunk's counts. `options` holds analyze_pairs_with_errors
+    keyword arguments (vision, severity, metrics, thresholds, target_metric).
+    Runs in the worker pool.
+    """
+    options = options or {}
+    valid = [(line, pair) for line, pair, error in records if error is None]
+    analyzed, errors = analyze_pairs_with_errors([pair for _, pair in valid], target_ratio, verbose=False, **options)
+    by_line = {}
+    for i, (line, _) in enumerate(valid):
+        if analyzed[i] is None:
+            by_line[line] = {"line": line, "error": f"Invalid color: {errors.get(i)}"}
+        else:
+            by_line[line] = {"line": line, **analyzed[i]}
+
+    counts = {"pairs": 0, "passed": 0, "failed": 0, "invalid": 0}
+    out = []
+    for line, _, error in records:
+        result = by_line.get(line) or {"line": line, "error": error}
+        if "error" in result:
+            counts["invalid"] += 1
+        else:
+            counts["pairs"] += 1
+            counts["passed" if result["passes_aa_normal"] else "failed"] += 1
+        out.append(_dumps(result))
+    for name, failed in cvd_simulation.count_failures(analyzed, options.get("vision", ())).items():
+        counts[f"vision_{name}"] = failed
+    if "metrics" in options:
+        counts.update(contrast_metrics.count_passes(analyzed, options["metrics"]))
+    return ("\n".join(out) + "\n").encode("utf-8"), counts
+
+
+def vision_summary(totals, vision=(), severity=1.0):
+    """Summary "vision" block from totals accumulated over audit_records() counts"""
+    failed = {name: totals.get(f"vision_{name}", 0) for name in vision}
+    return cvd_simulation.summarize(None, vision, severity, failed)
+
+
+def metrics_summary(totals, options):
+    """Summary "metrics" block from totals accumulated over audit_records() counts"""
+    metrics = options["metrics"]
+    passed = {flag: totals.get(flag, 0) for flag in contrast_metrics.flag_names(metrics)}
+    return contrast_metrics.summarize(None, metrics, options.get("thresholds"),
+                                      options.get("target_metric", "wcag2"), passed)
+
+
+def summary_blocks(totals, options):
+    """Optional summary blocks ("metrics", "vision") for the options of an audit"""
+    blocks = {}
+    metrics = tuple(options.get("metrics", contrast_metrics.DEFAULT_METRICS))
+    thresholds = options.get("thresholds")
+    if metrics != contrast_metrics.DEFAULT_METRICS or thresholds not in (None, contrast_metrics.resolve_thresholds(metrics)):
+        blocks["metrics"] = metrics_summary(totals, {**options, "metrics": metrics})
+    if options.get("vision"):
+        blocks["vision"] = vision_summary(totals, options["vision"], options.get("severity", 1.0))
+    return blocks
+
+
+async def iter_lines(byte_chunks, max_line=MAX_LINE_BYTES):
+    """Yield (line number, line bytes or None if longer than max_line) from a byte stream"""
+    buffer = b""
+    line_no = 0
+    overflow = False
+    async for data in byte_chunks:
+        lines = (buffer + data).split(b"\n")
+        buffer = lines.pop()
+        for line in lines:
+            line_no += 1
+            yield line_no, None if overflow or len(line) > max_line else line
+            overflow = False
+        if len(buffer) > max_line:
+            # Drop the rest of an oversized line instead of buffering it
+            overflow = True
+            buffer = b""
+    if buffer or overflow:
+        yield line_no + 1, None if overflow or len(buffer) > max_line else buffer
+
+
+async def audit_ndjson(byte_chunks, target_ratio=4.5, chunk_size=BULK_CHUNK_SIZE, options=None):
+    """Async generator of NDJSON output bytes for an NDJSON input byte stream"""
+    options = options or {}
+    target_ratio = contrast_solver.resolve_target(target_ratio, options.get("target_metric", "wcag2"))
+    in_flight = deque()
+    max_in_flight = max(1, worker_pool.POOL_SIZE)
+    totals = {"pairs": 0, "passed": 0, "failed": 0, "invalid": 0}
+    start = time.perf_counter()
+
+    def submit(records):
+        task = asyncio.ensure_future(
+            worker_pool.run(audit_records, records, target_ratio, options, weight=len(records)))
+        in_flight.append(task)
+
+    async def drain_one():
+        body, counts = await in_flight.popleft()
+        for key, value in counts.items():
+            totals[key] = totals.get(key, 0) + value
+        return body
+
+    try:
+        records = []
+        async for line_no, line in iter_lines(byte_chunks):
+            if line is None:
+                records.append((line_no, None, f"Line longer than {MAX_LINE_BYTES} bytes"))
+            elif line.strip():
+                pair, error = parse_record(line)
+                records.append((line_no, pair, error))
+            else:
+                continue
+            if len(records) >= chunk_size:
+                submit(records)
+                records = []
+                # Keep every worker busy while the next chunk is read
+                while len(in_flight) > max_in_flight:
+                    yield await drain_one()
+        if records:
+            submit(records)
+        while in_flight:
+            yield await drain_one()
+    finally:
+        # Client gone or error: drop chunks still queued
+        for task in in_flight:
+            task.cancel()
+
+    lines = totals["pairs"] + totals["invalid"]
+    elapsed = time.perf_counter() - start
+    summary = {
+        "total_lines": lines,
+        "total_pairs": totals["pairs"],
+        "passed_pairs": totals["passed"],
+        "failed_pairs": totals["failed"],
+        "invalid_lines": totals["invalid"],
+        "target_ratio": target_ratio,
+        "elapsed_seconds": round(elapsed, 3),
+        "pairs_per_second": round(lines / elapsed, 1) if elapsed > 0 else None,
+    }
+    summary.update(summary_blocks(totals, options))
+    log.info("📦 Bulk audit", extra={"fields": {
+        "pairs": summary["total_pairs"],
+        "failed": summary["failed_pairs"],
+        "invalid": summary["invalid_lines"],
+        "elapsed_seconds": summary["elapsed_seconds"],
+    }})
+    yield (_dumps({"summary": summary}) + "\n").encode("utf-8")
@@ -0,0 +1,420 @@
+"""
+Color accessibility analysis, independent of the web framework.
+
+Everything CPU-bound that the MCP tools run lives here so it can be
+executed in the server process, in worker_pool's process pool, or from
+offline scripts without importing FastAPI.
+"""
+import logging
+import time
+
+import numpy as np
+
+import color_cache
+import color_index
+import color_parser
+import contrast_engine
+import contrast_metrics
+import contrast_solver
+import cvd_simulation
+import oklab
+import structured_log
+
+log = structured_log.get_logger("color_audit")
+
+# ============================================================================
+# COLOR ACCESSIBILITY FUNCTIONS
+# ============================================================================
+
+def calculate_luminance(r, g, b):
+    """Calculate relative luminance according to WCAG"""
+    def normalize(c):
+        c = c / 255.0
+        return c / 12.92 if c <= 0.03928 else ((c + 0.055) / 1.055) ** 2.4
+    return 0.2126 * normalize(r) + 0.7152 * normalize(g) + 0.0722 * normalize(b)
+
+def calculate_contrast_ratio(rgb1, rgb2):
+    """Calculate contrast ratio between two RGB colors"""
+    l1 = calculate_luminance(rgb1[0], rgb1[1], rgb1[2])
+    l2 = calculate_luminance(rgb2[0], rgb2[1], rgb2[2])
+    lighter = max(l1, l2)
+    darker = min(l1, l2)
+    return (lighter + 0.05) / (darker + 0.05)
+
+def hex_to_rgb(hex_color):
+    """Convert hex color to RGB tuple (served from the color cache)"""
+    return color_cache.cached_rgb(hex_color)
+
+def evaluate_wcag(ratio):
+    """Evaluate WCAG compliance for a contrast ratio"""
+    return {
+        "passes_aa_normal": ratio >= 4.5,
+        "passes_aa_large": ratio >= 3.0,
+        "passes_aaa_normal": ratio >= 7.0,
+        "passes_aaa_large": ratio >= 4.5
+    }
+
+def _normalize_suggestion_hex(hex_color):
+    hex_color = hex_color.strip().upper()
+    if not hex_color.startswith('#'):
+        hex_color = '#' + hex_color
+    return hex_color
+
+def generate_oklch_suggestions_batch(pairs, target_ratio=4.5, verbose=True, target_metric="wcag2"):
+    """
+    Generate minimal-change OKLCH suggestions for many (bg_hex, fg_hex) pairs at once.
+    With a target_metric other than wcag2, target_ratio is in that metric (e.g. APCA Lc)
+    and each suggestion also reports its new score (e.g. new_apca_lc).
+    With `verbose`, a sample of the suggestions is logged at DEBUG.
+    """
+    results = [[] for _ in pairs]
+    metric = contrast_metrics.get_metric(target_metric)
+    target_ratio = contrast_solver.resolve_target(target_ratio, target_metric)
+    
+    # Normalize hex colors and look up cached RGB / OKLCH
+    rows = []
+    bg_entries = []
+    fg_entries = []
+    for i, (bg_hex, fg_hex) in enumerate(pairs):
+        try:
+            bg_entry = color_cache.get_color(_normalize_suggestion_hex(bg_hex))
+            fg_entry = color_cache.get_color(_normalize_suggestion_hex(fg_hex))
+        except Exception as e:
+            log.warning("⚠️ Error generating OKLCH suggestions for %s on %s: %s", fg_hex, bg_hex, e)
+            continue
+        rows.append(i)
+        bg_entries.append(bg_entry)
+        fg_entries.append(fg_entry)
+    
+    if not rows:
+        return results
+    
+    color_cache.fill_oklch(bg_entries + fg_entries)
+    bg_lch = np.array([e.oklch for e in bg_entries])
+    fg_lch = np.array([e.oklch for e in fg_entries])
+    bg_rgb = np.array([e.rgb for e in bg_entries], dtype=np.uint8)
+    fg_rgb = np.array([e.rgb for e in fg_entries], dtype=np.uint8)
+    
+    solved = contrast_solver.solve_pairs(bg_rgb, fg_rgb, bg_lch, fg_lch, target_ratio, target_metric)
+    if metric.name != "wcag2":
+        # Suggestions always report the WCAG ratio; the target metric's own score goes alongside
+        for fix in solved.values():
+            fix["score"] = metric.contrast(metric.luminance(fix["fg_rgb"]), metric.luminance(fix["bg_rgb"]))
+            fix["ratio"] = contrast_engine.contrast_ratios(fix["fg_rgb"], fix["bg_rgb"])
+    
+    debug = verbose and log.isEnabledFor(logging.DEBUG)
+    for row, i in enumerate(rows):
+        for kind in contrast_solver.KINDS:
+            fix = solved[kind]
+            if not fix["feasible"][row]:
+                continue
+            new_bg_hex = oklab.to_hex(fix["bg_rgb"][row])
+            new_fg_hex = oklab.to_hex(fix["fg_rgb"][row])
+            bg_changed = kind != "adjust_fg"
+            fg_changed = kind in ("adjust_fg", "adjust_both")
+            ratio = float(fix["ratio"][row])
+            suggestion = {
+                "type": kind,
+                "background_oklch": oklab.format_oklch(fix["bg_lch"][row] if bg_changed else bg_lch[row]),
+                "foreground_oklch": oklab.format_oklch(fix["fg_lch"][row] if fg_changed else fg_lch[row]),
+                "new_contrast_ratio": round(ratio, 1),
+                "preview_hex_bg": new_bg_hex if bg_changed else bg_entries[row].hex,
+                "preview_hex_fg": new_fg_hex if fg_changed else fg_entries[row].hex,
+                "delta_e": round(float(fix["delta_e"][row]), 4)
+            }
+            if "score" in fix:
+                suggestion[f"new_{metric.key}"] = round(float(fix["score"][row]), metric.digits)
+            results[i].append(suggestion)
+            if debug and structured_log.sampled():
+                log.debug("    ✅ Found %s suggestion: %s/%s → %.2f:1", kind, new_bg_hex, new_fg_hex, ratio)
+    
+    return results
+
+def generate_oklch_suggestions(bg_hex, fg_hex, target_ratio=4.5):
+    """Generate OKLCH color suggestions to improve contrast"""
+    suggestions = generate_oklch_suggestions_batch([(bg_hex, fg_hex)], target_ratio)[0]
+    if len(suggestions) == 0:
+        log.debug("    ⚠️ No suggestions found for %s on %s - may need more aggressive adjustments", fg_hex, bg_hex)
+    return suggestions
+
+def normalize_color(value):
+    """
+    (normalized color, plain) of an input color: hex values get their '#' and
+    are upper-cased; other syntaxes are kept as given. `plain` is True for
+    opaque #RGB / #RRGGBB, which need no foreground_hex / background_hex.
+    """
+    value = str(value).strip()
+    if color_parser.HEX_PATTERN.match(value):
+        return (value if value.startswith("#") else f"#{value}").upper(), color_parser.is_plain_hex(value)
+    return value, False
+
+def normalize_pairs(color_pairs_input):
+    """
+    Normalized foregrounds, backgrounds and per-pair `plain` flags of the
+    input pairs (see normalize_color); each distinct color is normalized once.
+    """
+    normalized = {}
+    foregrounds = []
+    backgrounds = []
+    plain = []
+    for pair in color_pairs_input:
+        colors = []
+        for key in ("foreground", "background"):
+            value = str(pair.get(key, ""))
+            if value not in normalized:
+                normalized[value] = normalize_color(value)
+            colors.append(normalized[value])
+        (fg, fg_plain), (bg, bg_plain) = colors
+        foregrounds.append(fg)
+        backgrounds.append(bg)
+        plain.append(fg_plain and bg_plain)
+    return foregrounds, backgrounds, plain
+
+def analyze_color_pairs(color_pairs_input, target_ratio=4.5, options=None):
+    """
+    Analyze a list of fg/bg pairs with the batch contrast engine. `options` holds
+    analyze_pairs_with_errors keyword arguments (vision, metrics, thresholds, ...).
+    """
+    analyzed_pairs, _ = analyze_pairs_with_errors(color_pairs_input, target_ratio, **(options or {}))
+    return [pair for pair in analyzed_pairs if pair is not None]
+
+def analyze_color_chunk(color_pairs_input, target_ratio=4.5, options=None):
+    """
+    One analyzed pair per input (None if invalid), the pairs that could not
+    be parsed, as [{index, element, foreground, background, error}] (index into
+    the input), and the chunk's solver stats (see analyze_pairs_with_errors).
+    """
+    stats = {}
+    analyzed_pairs, errors = analyze_pairs_with_errors(color_pairs_input, target_ratio, stats=stats, **(options or {}))
+    invalid_pairs = [
+        {
+            "index": i,
+            "element": color_pairs_input[i].get("element", "Elemento"),
+            "foreground": color_pairs_input[i].get("foreground"),
+            "background": color_pairs_input[i].get("background"),
+            "error": error
+        }
+        for i, error in sorted(errors.items())
+    ]
+    return analyzed_pairs, invalid_pairs, stats
+
+def analyze_pairs_with_errors(color_pairs_input, target_ratio=4.5, verbose=True, vision=(), severity=1.0,
+                              metrics=contrast_metrics.DEFAULT_METRICS, thresholds=None, target_metric="wcag2",
+                              stats=None):
+    """
+    Analyzed pair per input (None if invalid) and {index: error} for invalid ones.
+    
+    Every metric in `metrics` (see contrast_metrics) is computed in the same
+    pass and reported per pair, with `thresholds` overriding the pass levels.
+    Suggestions are generated for pairs below target_ratio in target_metric.
+    With `vision` (deficiency names), each pair also gets a "vision" dict with
+    its simulated colors, scores and flags per deficiency.
+    
+    Colors may use any CSS syntax (see color_parser); when one is not a plain
+    #RGB / #RRGGBB value, the pair also reports the opaque colors that were
+    evaluated as foreground_hex / background_hex.
+    
+    If `stats` is a dict, it receives the number of suggestions generated and
+    the seconds spent in each stage ("stages": parse, contrast, suggestions,
+    vision if requested, build), measured where the analysis runs (possibly
+    a worker process).
+    """
+    metrics = contrast_metrics.resolve_metrics(metrics, target_metric)
+    thresholds = contrast_metrics.resolve_thresholds(metrics, thresholds)
+    target = contrast_metrics.get_metric(target_metric)
+    elements = [pair.get("element", "Elemento") for pair in color_pairs_input]
+    foregrounds, backgrounds, plain_pairs = normalize_pairs(color_pairs_input)
+    stages = {}
+    
+    def parse_pairs(fgs, bgs):
+        start = time.perf_counter()
+        parsed = color_parser.parse_pairs(fgs, bgs)
+        stages["parse"] = time.perf_counter() - start
+        return parsed
+    
+    start = time.perf_counter()
+    batch = contrast_metrics.analyze_batch(foregrounds, backgrounds, parse_pairs, metrics, thresholds)
+    stages["contrast"] = time.perf_counter() - start - stages["parse"]
+    rgb = batch["rgb"]
+    
+    def resolved(i, j):
+        r, g, b = rgb[i, j].tolist()
+        return f"#{r:02X}{g:02X}{b:02X}"
+    
+    ratios = batch["ratio"].tolist()
+    scores = {key: np.round(batch[key], digits).tolist()
+              for key, digits in contrast_metrics.score_keys(metrics).items() if key != "ratio"}
+    flags = {key: batch[key].tolist() for key in contrast_metrics.flag_names(metrics)}
+    valid = batch["valid"].tolist()
+    target_ratio = contrast_solver.resolve_target(target_ratio, target_metric)
+    below_target = (target.magnitude(batch[target.key]) < target_ratio).tolist()
+    
+    # Suggestions are generated once per distinct failing pair, all in one batch
+    failing = []
+    for i in range(len(elements)):
+        if valid[i] and below_target[i]:
+            failing.append((resolved(i, 1), resolved(i, 0)))
+    failing = list(dict.fromkeys(failing))
+    # Per-pair detail is DEBUG and sampled; the level is checked once for the whole batch
+    debug = verbose and log.isEnabledFor(logging.DEBUG)
+    if failing and debug:
+        log.debug("  🔍 Generating OKLCH suggestions for %d failing pairs", len(failing))
+    start = time.perf_counter()
+    suggestions_by_pair = dict(zip(failing, generate_oklch_suggestions_batch(failing, target_ratio, verbose, target_metric)))
+    stages["suggestions"] = time.perf_counter() - start
+    
+    # Color vision deficiencies: every valid pair, all deficiencies in one batch
+    simulated = {}
+    if vision:
+        start = time.perf_counter()
+        valid_rows = np.flatnonzero(batch["valid"])
+        simulated = dict(zip(valid_rows.tolist(), cvd_simulation.pair_results(
+            batch["rgb"][valid_rows, 0], batch["rgb"][valid_rows, 1], vision, severity, metrics, thresholds)))
+        stages["vision"] = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    analyzed_pairs = []
+    for i, element in enumerate(elements):
+        fg_hex = foregrounds[i]
+        bg_hex = backgrounds[i]
+        if not valid[i]:
+            if debug and structured_log.sampled():
+                log.debug("  ⚠️ Error: %s", batch["errors"][i])
+            analyzed_pairs.append(None)
+            continue
+        
+        ratio = ratios[i]
+        wcag = {key: values[i] for key, values in flags.items()}
+        
+        suggestions = []
+        if below_target[i]:
+            suggestions = suggestions_by_pair[(resolved(i, 1), resolved(i, 0))]
+            if len(suggestions) == 0 and debug:
+                log.debug("  ⚠️ No suggestions generated for %s on %s", fg_hex, bg_hex)
+        
+        analyzed_pair = {
+            "text_sample": element,
+            "foreground": fg_hex,
+            "background": bg_hex
+        }
+        if not plain_pairs[i]:
+            # Other syntaxes or alpha: the opaque colors that were evaluated
+            analyzed_pair["foreground_hex"] = resolved(i, 0)
+            analyzed_pair["background_hex"] = resolved(i, 1)
+        analyzed_pair.update({
+            "ratio": round(ratio, 2),
+            "passes_aa_normal": wcag["passes_aa_normal"],
+            "passes_aa_large": wcag["passes_aa_large"],
+            "passes_aaa_normal": wcag["passes_aaa_normal"],
+            "passes_aaa_large": wcag["passes_aaa_large"],
+            "suggestions": suggestions
+        })
+        if scores:
+            # Other metrics go after the WCAG fields, before the suggestions
+            suggestions = analyzed_pair.pop("suggestions")
+            for key, values in scores.items():
+                analyzed_pair[key] = values[i]
+            analyzed_pair.update((key, value) for key, value in wcag.items() if key not in analyzed_pair)
+            analyzed_pair["suggestions"] = suggestions
+        if vision:
+            analyzed_pair["vision"] = simulated[i]
+        analyzed_pairs.append(analyzed_pair)
+        
+        if debug and structured_log.sampled():
+            status = "✅" if wcag["passes_aa_normal"] else "❌"
+            log.debug("  %s %s: %s on %s = %.2f:1", status, element, fg_hex, bg_hex, ratio)
+    stages["build"] = time.perf_counter() - start
+    
+    if stats is not None:
+        stats["suggestions"] = sum(len(suggestions) for suggestions in suggestions_by_pair.values())
+        stats["stages"] = stages
+    return analyzed_pairs, batch["errors"]
+
+def find_compliant_colors(foreground, background, adjust="foreground", target_ratio=4.5, count=5):
+    """
+    Closest colors (OKLab) to the adjusted color that reach target_ratio on the other one.
+    Colors may use any CSS syntax (see color_parser) and are composited like a pair;
+    raises ValueError naming the color that could not be parsed.
+    """
+    rgba = []
+    for key, value in (("foreground", foreground), ("background", background)):
+        try:
+            rgba.append(color_parser.parse_color(value))
+        except ValueError as e:
+            raise ValueError(f"{key}: {e}")
+    fg_rgb, bg_rgb = (rgb[0] for rgb in color_parser.composite(np.array(rgba[:1]), np.array(rgba[1:])))
+    moving, fixed = (fg_rgb, bg_rgb) if adjust == "foreground" else (bg_rgb, fg_rgb)
+    
+    rgb, distance, ratio = color_index.nearest_compliant(tuple(moving.tolist()), tuple(fixed.tolist()), target_ratio, count)
+    lch = oklab.srgb8_to_oklch(rgb)
+    candidates = [{
+        "hex": oklab.to_hex(rgb[i]),
+        "oklch": oklab.format_oklch(lch[i]),
+        "contrast_ratio": round(float(ratio[i]), 2),
+        "delta_e": round(float(distance[i]), 4)
+    } for i in range(len(rgb))]
+    
+    result = {
+        "foreground": oklab.to_hex(fg_rgb),
+        "background": oklab.to_hex(bg_rgb),
+        "adjust": adjust,
+        "target_ratio": target_ratio,
+        "original_ratio": round(float(contrast_engine.contrast_ratios(fg_rgb, bg_rgb)), 2),
+        "candidates": candidates
+    }
+    for key, value in (("foreground", foreground), ("background", background)):
+        if not color_parser.is_plain_hex(value):
+            # Other syntaxes or alpha: the input as given, next to the opaque color used
+            result[f"{key}_hex"] = result[key]
+            result[key] = normalize_color(value)[0]
+    return result
+
+def analyze_palette(palette_input, include_matrix=False):
+    """
+    Full N x N contrast matrix of a palette, summarized as compliant partners per color.
+    Colors may use any CSS syntax (see color_parser); alpha is composited over white.
+    """
+    values = []
+    names = []
+    for item in palette_input:
+        if isinstance(item, dict):
+            values.append(item.get("color", ""))
+            names.append(item.get("name"))
+        else:
+            values.append(item)
+            names.append(None)
+    parsed, valid, parse_errors = color_parser.parse_colors(values)
+    errors = [{"index": i, "color": values[i], "error": error} for i, error in sorted(parse_errors.items())]
+    rows = np.flatnonzero(valid)
+    rgb = parsed[rows]
+    luminance = contrast_engine.relative_luminance(rgb).tolist()
+    colors = []
+    for row, i in enumerate(rows.tolist()):
+        color = {"color": oklab.to_hex(parsed[i]), "name": names[i], "luminance": round(luminance[row], 4)}
+        if not color_parser.is_plain_hex(values[i]):
+            color["color_hex"] = color["color"]
+            color["color"] = normalize_color(values[i])[0]
+        colors.append(color)
+    
+    ratios = contrast_engine.contrast_matrix(rgb)
+    levels = {
+        key.replace("passes_", ""): ratios >= threshold
+        for key, threshold in contrast_engine.WCAG_THRESHOLDS.items()
+    }
+    for passes in levels.values():
+        np.fill_diagonal(passes, False)
+    
+    partners = [
+        {level: np.flatnonzero(passes[i]).tolist() for level, passes in levels.items()}
+        for i in range(len(colors))
+    ]
+    result = {
+        "total_colors": len(colors),
+        "colors": colors,
+        "partners": partners,
+        "pair_counts": {level: int(np.triu(passes).sum()) for level, passes in levels.items()},
+        "errors": errors
+    }
+    if include_matrix:
+        result["ratios"] = np.round(ratios, 2).tolist()
+    return result
@@ -0,0 +1,143 @@
+"""
+Process-wide color cache.
+
+Real traffic reuses the same brand colors over and over, so parsed RGB,
+relative luminance and OKLCH coordinates are kept in a bounded LRU keyed
+by the normalized hex value (#RRGGBB). Size is set with COLOR_CACHE_SIZE.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import oklab
+from contrast_engine import LINEAR_LUT
+
+_LINEAR = LINEAR_LUT.tolist()
+_HEX_DIGITS = frozenset("0123456789ABCDEF")
+
+
+class LRUCache:
+    """Thread-safe LRU mapping with hit, miss and eviction counters"""
+
+    def __init__(self, maxsize):
+        self.maxsize = max(1, int(maxsize))
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class ColorEntry:
+    """Cached data for one color; OKLCH is only converted when first needed"""
+
+    __slots__ = ("hex", "rgb", "luminance", "_oklch")
+
+    def __init__(self, hex_color, rgb):
+        self.hex = hex_color
+        self.rgb = rgb
+        r, g, b = rgb
+        self.luminance = 0.2126 * _LINEAR[r] + 0.7152 * _LINEAR[g] + 0.0722 * _LINEAR[b]
+        self._oklch = None
+
+    @property
+    def oklch(self):
+        """(L, C, H) coordinates; H is NaN for achromatic colors"""
+        if self._oklch is None:
+            self._oklch = tuple(oklab.srgb8_to_oklch(np.array(self.rgb, dtype=np.uint8)).tolist())
+        return self._oklch
+
+
+COLOR_CACHE = LRUCache(int(os.getenv("COLOR_CACHE_SIZE", "4096")))
+
+
+def normalize_hex(hex_color):
+    """Normalize #RGB / #RRGGBB (with or without '#') to #RRGGBB, or None"""
+    value = hex_color.strip().lstrip('#').upper()
+    if len(value) == 3:
+        value = ''.join([c*2 for c in value])
+    if len(value) != 6 or not _HEX_DIGITS.issuperset(value):
+        return None
+    return '#' + value
+
+
+def get_color(hex_color):
+    """
+    Return the cached ColorEntry for a #RGB / #RRGGBB color. Anything else
+    raises ValueError: other syntaxes and alpha go through color_parser.
+    """
+    key = normalize_hex(hex_color)
+    if key is None:
+        raise ValueError(f"Invalid hex color '{hex_color}'")
+    entry = COLOR_CACHE.get(key)
+    if entry is None:
+        entry = ColorEntry(key, tuple(int(key[i:i + 2], 16) for i in (1, 3, 5)))
+        COLOR_CACHE.put(key, entry)
+    return entry
+
+
+def fill_oklch(entries):
+    """Convert every entry still missing OKLCH coordinates in one vectorized pass"""
+    missing = [e for e in entries if e._oklch is None]
+    if missing:
+        coords = oklab.srgb8_to_oklch(np.array([e.rgb for e in missing], dtype=np.uint8)).tolist()
+        for entry, lch in zip(missing, coords):
+            entry._oklch = tuple(lch)
+
+
+def cached_rgb(hex_color):
+    """Parsed RGB tuple of a hex color, served from the cache"""
+    return get_color(hex_color).rgb
+
+
+def contrast_ratio(hex1, hex2):
+    """Contrast ratio between two hex colors using cached luminance"""
+    l1 = get_color(hex1).luminance
+    l2 = get_color(hex2).luminance
+    lighter = max(l1, l2)
+    darker = min(l1, l2)
+    return (lighter + 0.05) / (darker + 0.05)
+
+
+def stats():
+    return COLOR_CACHE.stats()
@@ -0,0 +1,251 @@
+"""
+Nearest-compliant-color search over the whole 8-bit sRGB cube.
+
+All 16,777,216 colors are stored once, sorted by WCAG relative luminance,
+as 9-byte records (RGB + OKLab quantized to int16) in a .npy file that is
+memory-mapped at query time. The sorted array is cut into luminance slabs
+and each slab into hue sectors and chroma bands, so every equal-count
+bucket covers a compact OKLab region; buckets keep their luminance range
+and OKLab bounding box.
+
+For a query (color X on background Y, target ratio) the compliant colors
+are exactly those whose luminance is below or above two thresholds, so
+only buckets on the compliant side are considered. Buckets are visited in
+order of the OKLab distance from X to their bounding box and the search
+stops as soon as that lower bound exceeds the k-th best distance found,
+so a query reads a few hundred thousand records instead of the gamut.
+
+Build the index at deploy time with `python color_index.py`; the server
+builds it on first use if COLOR_INDEX_DIR (default data/color_index next
+to this file) is empty. Builds run under an exclusive file lock in a
+temporary directory and are moved into place with os.replace, so worker
+processes racing on the first query build once and a mapped index is
+never truncated.
+"""
+import contextlib
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # not on Windows: builds are then only serialized within a process
+    fcntl = None
+
+import oklab
+import structured_log
+from contrast_engine import LINEAR_LUT, relative_luminance
+
+log = structured_log.get_logger("color_index")
+
+BUCKET_SIZE = 4096
+N_COLORS = 1 << 24
+
+# Each luminance slab is split into HUE_SECTORS x CHROMA_BANDS buckets
+HUE_SECTORS = 4
+CHROMA_BANDS = 4
+SLAB_SIZE = BUCKET_SIZE * HUE_SECTORS * CHROMA_BANDS
+
+# int16 quantization of OKLab: L in [0, 1], a/b in [-0.5, 0.5]
+_L_SCALE = 32767.0
+_AB_SCALE = 65534.0
+
+RECORD = np.dtype([("rgb", "u1", 3), ("lab", "<i2", 3)])
+BUCKET = np.dtype([
+    ("y_min", "<f8"), ("y_max", "<f8"),
+    ("lab_min", "<f4", 3), ("lab_max", "<f4", 3),
+])
+
+DEFAULT_DIR = Path(__file__).parent / "data" / "color_index"
+INDEX_DIR = Path(os.getenv("COLOR_INDEX_DIR", str(DEFAULT_DIR)))
+
+# Buckets scanned per vectorized step
+_SCAN_GROUP = 8
+
+# Colors converted per step while building
+_BUILD_CHUNK = 1 << 20
+
+_index = None
+_lock = threading.Lock()
+
+
+def _unpack(codes):
+    """24-bit integers to (n, 3) uint8 RGB"""
+    codes = codes.astype(np.uint32)
+    return np.stack([(codes >> 16) & 255, (codes >> 8) & 255, codes & 255], axis=-1).astype(np.uint8)
+
+
+def _dequantize(lab):
+    lab = lab.astype(np.float64)
+    lab[..., 0] /= _L_SCALE
+    lab[..., 1:] /= _AB_SCALE
+    return lab
+
+
+@contextlib.contextmanager
+def _build_lock(directory):
+    """Exclusive lock shared by every process building into `directory`"""
+    with open(directory / ".build.lock", "w") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def build(directory=INDEX_DIR, chunk=_BUILD_CHUNK):
+    """Compute records.npy and buckets.npy in a temporary directory and move them into place"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    with _build_lock(directory):
+        _build_into(directory, chunk)
+
+
+def _build_into(directory, chunk):
+    # Same filesystem as the target so os.replace is atomic; buckets.npy,
+    # which load() checks for, is moved last
+    staging = Path(tempfile.mkdtemp(prefix=".build-", dir=directory))
+    try:
+        _write(staging, chunk)
+        os.replace(staging / "records.npy", directory / "records.npy")
+        os.replace(staging / "buckets.npy", directory / "buckets.npy")
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def _write(directory, chunk):
+    luminance = np.empty(N_COLORS, dtype=np.float32)
+    for start in range(0, N_COLORS, chunk):
+        codes = np.arange(start, start + chunk)
+        luminance[start:start + chunk] = relative_luminance(_unpack(codes))
+    order = np.argsort(luminance, kind="stable")
+    del luminance
+
+    records = np.lib.format.open_memmap(directory / "records.npy", mode="w+",
+                                        dtype=RECORD, shape=(N_COLORS,))
+    buckets = np.zeros(N_COLORS // BUCKET_SIZE, dtype=BUCKET)
+    per_chunk = chunk // BUCKET_SIZE
+    for start in range(0, N_COLORS, chunk):
+        rgb = _unpack(order[start:start + chunk])
+        lab = oklab.srgb8_to_oklab(rgb)
+
+        # Within each luminance slab, order by hue sector then chroma band
+        slabs = lab.reshape(-1, SLAB_SIZE, 3)
+        hue = np.arctan2(slabs[..., 2], slabs[..., 1])
+        by_hue = np.argsort(hue, axis=1, kind="stable").reshape(len(slabs), HUE_SECTORS, -1)
+        sector_lab = np.take_along_axis(slabs, by_hue.reshape(len(slabs), -1, 1), axis=1)
+        chroma = np.hypot(sector_lab[..., 1], sector_lab[..., 2]).reshape(by_hue.shape)
+        by_chroma = np.argsort(chroma, axis=2, kind="stable")
+        within = np.take_along_axis(by_hue, by_chroma, axis=2).reshape(len(slabs), -1)
+        within += (np.arange(len(slabs)) * SLAB_SIZE)[:, None]
+        rgb = rgb[within.reshape(-1)]
+        lab = lab[within.reshape(-1)]
+        records["rgb"][start:start + chunk] = rgb
+        records["lab"][start:start + chunk] = np.round(
+            lab * [_L_SCALE, _AB_SCALE, _AB_SCALE]).astype(np.int16)
+
+        y = relative_luminance(rgb).reshape(per_chunk, BUCKET_SIZE)
+        lab = lab.reshape(per_chunk, BUCKET_SIZE, 3)
+        b = slice(start // BUCKET_SIZE, start // BUCKET_SIZE + per_chunk)
+        buckets["y_min"][b] = y.min(axis=1)
+        buckets["y_max"][b] = y.max(axis=1)
+        buckets["lab_min"][b] = lab.min(axis=1)
+        buckets["lab_max"][b] = lab.max(axis=1)
+    records.flush()
+    del records
+    np.save(directory / "buckets.npy", buckets)
+
+
+def load(directory=INDEX_DIR):
+    """Memory-map the index, building it first if it does not exist"""
+    global _index
+    if _index is None:
+        with _lock:
+            if _index is None:
+                directory = Path(directory)
+                if not (directory / "buckets.npy").exists():
+                    directory.mkdir(parents=True, exist_ok=True)
+                    with _build_lock(directory):
+                        # Another process may have built it while we waited
+                        if not (directory / "buckets.npy").exists():
+                            log.warning("⚠️ Color index not found in %s, building it now...", directory)
+                            _build_into(directory, _BUILD_CHUNK)
+                _index = (
+                    np.load(directory / "records.npy", mmap_mode="r"),
+                    np.load(directory / "buckets.npy"),
+                )
+    return _index
+
+
+def compliant_luminance(bg_luminance, target):
+    """Luminance bounds (dark_max, light_min) that reach `target` on a background"""
+    dark_max = (bg_luminance + 0.05) / target - 0.05
+    light_min = target * (bg_luminance + 0.05) - 0.05
+    return dark_max, light_min
+
+
+def nearest_compliant(color_rgb, other_rgb, target, k=5):
+    """
+    The k colors closest to `color_rgb` (OKLab distance) that reach `target`
+    against `other_rgb`. Returns (rgb (k, 3) uint8, distance, ratio) sorted
+    by distance; fewer than k rows if the target is unreachable.
+    """
+    records, buckets = load()
+    query = oklab.srgb8_to_oklab(np.array(color_rgb, dtype=np.uint8))
+    other_y = float(relative_luminance(np.array(other_rgb, dtype=np.uint8)))
+    dark_max, light_min = compliant_luminance(other_y, target)
+
+    candidates = np.flatnonzero((buckets["y_min"] <= dark_max) | (buckets["y_max"] >= light_min))
+    if len(candidates) == 0:
+        return np.zeros((0, 3), dtype=np.uint8), np.zeros(0), np.zeros(0)
+
+    # Distance from the query to each candidate bucket's bounding box
+    lo = buckets["lab_min"][candidates].astype(np.float64)
+    hi = buckets["lab_max"][candidates].astype(np.float64)
+    gap = np.maximum(0.0, np.maximum(lo - query, query - hi))
+    bounds = np.linalg.norm(gap, axis=1)
+    visit = np.argsort(bounds, kind="stable")
+
+    best_rgb = np.zeros((0, 3), dtype=np.uint8)
+    best_dist = np.zeros(0)
+    for step in range(0, len(visit), _SCAN_GROUP):
+        group = visit[step:step + _SCAN_GROUP]
+        if len(best_dist) >= k and bounds[group[0]] > best_dist[-1]:
+            break
+        rows = np.concatenate([
+            np.arange(b * BUCKET_SIZE, (b + 1) * BUCKET_SIZE) for b in candidates[group]
+        ])
+        chunk = records[rows]
+        rgb = chunk["rgb"]
+        lin = LINEAR_LUT[rgb]
+        y = 0.2126 * lin[:, 0] + 0.7152 * lin[:, 1] + 0.0722 * lin[:, 2]
+        ratio = (np.maximum(y, other_y) + 0.05) / (np.minimum(y, other_y) + 0.05)
+        ok = ratio >= target
+        if not ok.any():
+            continue
+        dist = np.linalg.norm(_dequantize(chunk["lab"][ok]) - query, axis=1)
+        merged_rgb = np.concatenate([best_rgb, rgb[ok]])
+        merged_dist = np.concatenate([best_dist, dist])
+        top = np.argsort(merged_dist, kind="stable")[:k]
+        best_rgb = merged_rgb[top]
+        best_dist = merged_dist[top]
+
+    # Report exact distances and ratios for the winners
+    exact = np.linalg.norm(oklab.srgb8_to_oklab(best_rgb) - query, axis=1)
+    y = relative_luminance(best_rgb)
+    ratio = (np.maximum(y, other_y) + 0.05) / (np.minimum(y, other_y) + 0.05)
+    order = np.argsort(exact, kind="stable")
+    return best_rgb[order], exact[order], ratio[order]
+
+
+if __name__ == "__main__":
+    target_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else INDEX_DIR
+    build(target_dir)
+    print(f"✅ Color index written to {target_dir}")
@@ -0,0 +1,259 @@
+"""
+Multi-format CSS color parser.
+
+Pairs used to go through a hex-only parser, so anything but #RGB / #RRGGBB
+(rgb(), hsl(), oklch(), named colors, #RRGGBBAA) failed. This parser
+keeps fast paths for what real traffic sends and only hands exotic
+input to coloraide:
+
+- hex: #RGB, #RGBA, #RRGGBB, #RRGGBBAA (the '#' is optional), decoded
+  through a digit table.
+- rgb()/rgba(), hsl()/hsla() and oklch(): one compiled regex for the
+  function, one for each component; legacy comma syntax and modern
+  space / slash-alpha syntax, percentages and angle units.
+- CSS named colors (coloraide's table) and transparent: a dict lookup.
+- anything else (lab(), hwb(), color(display-p3 ...), ...): coloraide,
+  gamut-fitted to sRGB.
+
+Colors parse to (r, g, b, alpha) with channels as 0-255 floats. Pairs
+are then flattened to opaque 8-bit sRGB: the background is composited
+over white (the page canvas) and the foreground over the result, in
+gamma-encoded sRGB like browsers do. Parsed strings are kept in an LRU
+(COLOR_PARSE_CACHE_SIZE entries).
+"""
+import math
+import os
+import re
+
+import numpy as np
+from coloraide import Color
+from coloraide.css.color_names import name2val_map
+
+import oklab
+from color_cache import LRUCache
+
+# Canvas the background is composited over
+CANVAS = (255.0, 255.0, 255.0)
+
+PARSE_CACHE = LRUCache(int(os.getenv("COLOR_PARSE_CACHE_SIZE", "4096")))
+
+_HEX_VALUES = {c: int(c, 16) for c in "0123456789abcdefABCDEF"}
+HEX_PATTERN = re.compile(r"^#?(?:[0-9a-fA-F]{3,4}|[0-9a-fA-F]{6}|[0-9a-fA-F]{8})$")
+
+_NAMED = {name: (r, g, b, a / 255.0) for name, (r, g, b, a) in name2val_map.items()}
+_NAMED["transparent"] = (0.0, 0.0, 0.0, 0.0)
+
+_FUNCTION = re.compile(r"^(rgba?|hsla?|oklch)\(\s*(.*?)\s*\)$", re.IGNORECASE)
+_COMPONENT = re.compile(r"^([+-]?(?:\d+\.?\d*|\.\d+)(?:e[+-]?\d+)?)(%|deg|grad|rad|turn)?$", re.IGNORECASE)
+
+# Degrees per angle unit (a bare number is in degrees)
+_ANGLE_UNITS = {None: 1.0, "deg": 1.0, "grad": 0.9, "rad": 180.0 / math.pi, "turn": 360.0}
+
+# OKLCH chroma that 100% stands for (CSS Color 4)
+_OKLCH_CHROMA_PERCENT = 0.4
+
+
+def _clamp(value, low, high):
+    return min(max(value, low), high)
+
+
+def _parse_hex(text):
+    value = text[1:] if text.startswith("#") else text
+    try:
+        digits = [_HEX_VALUES[c] for c in value]
+    except KeyError:
+        return None
+    if len(digits) in (3, 4):
+        channels = [d * 17 for d in digits]
+    elif len(digits) in (6, 8):
+        channels = [digits[i] * 16 + digits[i + 1] for i in range(0, len(digits), 2)]
+    else:
+        return None
+    alpha = channels[3] / 255.0 if len(channels) == 4 else 1.0
+    return float(channels[0]), float(channels[1]), float(channels[2]), alpha
+
+
+def _components(body):
+    """Three color components and the alpha component (or None), as (number, unit) or None for 'none'"""
+    if "," in body:
+        parts = [part.strip() for part in body.split(",")]
+        alpha = parts.pop() if len(parts) == 4 else None
+    else:
+        main, slash, alpha = body.partition("/")
+        parts = main.split()
+        alpha = alpha.strip() if slash else None
+    if len(parts) != 3:
+        raise ValueError("expected 3 components")
+    values = []
+    for part in parts + [alpha]:
+        if part is None or part.lower() == "none":
+            values.append(None)
+            continue
+        match = _COMPONENT.match(part)
+        if match is None:
+            raise ValueError(f"invalid component '{part}'")
+        values.append((float(match.group(1)), (match.group(2) or "").lower() or None))
+    return values[:3], values[3]
+
+
+def _number(component, percent_scale, default=0.0):
+    """Component value; percentages are scaled so that 100% == percent_scale"""
+    if component is None:
+        return default
+    value, unit = component
+    if unit == "%":
+        return value * percent_scale / 100.0
+    if unit is not None:
+        raise ValueError(f"unexpected unit '{unit}'")
+    return value
+
+
+def _hue(component):
+    if component is None:
+        return 0.0
+    value, unit = component
+    if unit == "%":
+        raise ValueError("hue cannot be a percentage")
+    return (value * _ANGLE_UNITS[unit]) % 360.0
+
+
+def _alpha(component):
+    if component is None:
+        return 1.0
+    return _clamp(_number(component, 1.0), 0.0, 1.0)
+
+
+def _hsl_to_rgb(hue, saturation, lightness):
+    """CSS Color 4 hsl() conversion; saturation and lightness in 0-1"""
+    def channel(n):
+        k = (n + hue / 30.0) % 12
+        a = saturation * min(lightness, 1.0 - lightness)
+        return lightness - a * max(-1.0, min(k - 3.0, 9.0 - k, 1.0))
+    return channel(0), channel(8), channel(4)
+
+
+def _parse_function(name, body):
+    (c1, c2, c3), alpha = _components(body)
+    name = name.lower()
+    if name in ("rgb", "rgba"):
+        rgb = [_clamp(_number(c, 255.0), 0.0, 255.0) for c in (c1, c2, c3)]
+        return rgb[0], rgb[1], rgb[2], _alpha(alpha)
+    if name in ("hsl", "hsla"):
+        saturation = _clamp(_number(c2, 100.0), 0.0, 100.0) / 100.0
+        lightness = _clamp(_number(c3, 100.0), 0.0, 100.0) / 100.0
+        r, g, b = _hsl_to_rgb(_hue(c1), saturation, lightness)
+        return r * 255.0, g * 255.0, b * 255.0, _alpha(alpha)
+    # oklch(): gamut-fitted by chroma reduction, like the suggestions
+    lch = np.array([_number(c1, 1.0), max(0.0, _number(c2, _OKLCH_CHROMA_PERCENT)), _hue(c3)])
+    lin = oklab.oklab_to_linear(oklab.oklch_to_oklab(oklab.fit_oklch(lch)))
+    r, g, b = (oklab.linear_to_srgb(np.clip(lin, 0.0, 1.0)) * 255.0).tolist()
+    return r, g, b, _alpha(alpha)
+
+
+def _parse_coloraide(text):
+    try:
+        color = Color(text)
+    except ValueError:
+        raise ValueError(f"Unrecognized color '{text}'")
+    color = color.convert("srgb")
+    if not color.in_gamut():
+        color.fit()
+    r, g, b = (0.0 if math.isnan(c) else _clamp(c, 0.0, 1.0) * 255.0 for c in color[:3])
+    alpha = color.alpha()
+    return r, g, b, 1.0 if math.isnan(alpha) else _clamp(alpha, 0.0, 1.0)
+
+
+def parse_color(text):
+    """(r, g, b, alpha) of a CSS color string; channels are 0-255 floats, alpha 0-1"""
+    if not isinstance(text, str):
+        raise ValueError(f"Color must be a string, got {type(text).__name__}")
+    cached = PARSE_CACHE.get(text)
+    if cached is not None:
+        return cached
+    value = text.strip()
+    color = _parse_hex(value) if HEX_PATTERN.match(value) else None
+    if color is None:
+        color = _NAMED.get(value.lower())
+    if color is None:
+        match = _FUNCTION.match(value)
+        if match is not None:
+            try:
+                color = _parse_function(match.group(1), match.group(2))
+            except ValueError as e:
+                raise ValueError(f"Invalid color '{text}': {e}")
+        else:
+            color = _parse_coloraide(value)
+    PARSE_CACHE.put(text, color)
+    return color
+
+
+def is_plain_hex(text):
+    """True for opaque #RGB / #RRGGBB values (with or without '#'), which resolve to themselves"""
+    value = text.strip()
+    return bool(HEX_PATTERN.match(value)) and len(value.lstrip("#")) in (3, 6)
+
+
+def composite(fg_rgba, bg_rgba, canvas=CANVAS):
+    """
+    Opaque 8-bit sRGB of (..., 4) fg/bg arrays: the background over the
+    canvas, then the foreground over the result. Returns two (..., 3) uint8 arrays.
+    """
+    canvas = np.asarray(canvas, dtype=np.float64)
+    bg_alpha = bg_rgba[..., 3:]
+    bg = bg_rgba[..., :3] * bg_alpha + canvas * (1.0 - bg_alpha)
+    fg_alpha = fg_rgba[..., 3:]
+    fg = fg_rgba[..., :3] * fg_alpha + bg * (1.0 - fg_alpha)
+    return (np.floor(fg + 0.5).astype(np.uint8), np.floor(bg + 0.5).astype(np.uint8))
+
+
+def parse_pairs(foregrounds, backgrounds):
+    """
+    Parse fg/bg color strings (any CSS syntax) into an (n, 2, 3) uint8 array.
+
+    Returns (rgb, valid, errors) with rgb the fg/bg colors after alpha
+    compositing; rows that could not be parsed are left at zero, flagged
+    False in `valid` and their message is stored in `errors` (index -> message).
+    Each distinct string is parsed once per batch.
+    """
+    n = len(foregrounds)
+    table = {}
+    values = []
+    index = np.zeros((n, 2), dtype=np.int64)
+    valid = np.ones(n, dtype=bool)
+    errors = {}
+    for i, pair in enumerate(zip(foregrounds, backgrounds)):
+        for j, color in enumerate(pair):
+            k = table.get(color)
+            if k is None:
+                try:
+                    values.append(parse_color(color))
+                except ValueError as e:
+                    values.append(e)
+                k = table[color] = len(values) - 1
+            value = values[k]
+            if isinstance(value, Exception):
+                valid[i] = False
+                errors.setdefault(i, str(value))
+            else:
+                index[i, j] = k
+    rgba = np.array([(0.0, 0.0, 0.0, 1.0) if isinstance(v, Exception) else v for v in values],
+                    dtype=np.float64).reshape(-1, 4)
+    rgb = np.zeros((n, 2, 3), dtype=np.uint8)
+    if n and len(rgba):
+        fg, bg = composite(rgba[index[:, 0]], rgba[index[:, 1]])
+        rgb[:, 0], rgb[:, 1] = fg, bg
+        rgb[~valid] = 0
+    return rgb, valid, errors
+
+
+def parse_colors(colors):
+    """
+    Parse color strings (any CSS syntax) into an (n, 3) uint8 array, each
+    composited over the canvas. Returns (rgb, valid, errors) like parse_pairs.
+    """
+    rgb, valid, errors = parse_pairs(["transparent"] * len(colors), colors)
+    return rgb[:, 1], valid, errors
+
+
+def stats():
+    return PARSE_CACHE.stats()
@@ -0,0 +1,121 @@
+"""
+Compact columnar encoding of check_color_accessibility results.
+
+The default result is one dict per pair that repeats every key and the
+full OKLCH strings of each suggestion. "compact-v1" stores the same data
+column by column: colors and OKLCH strings live once in deduplicated
+tables and are referenced by index, the passes_* flags are packed into
+one integer per pair (bit i = flag_bits[i]: the four WCAG flags, then
+those of any other selected metric), and suggestions are flat columns
+pointing back to their pair. Other metric scores (e.g. apca_lc) get a
+column of their own next to ratio. Resolved foreground_hex /
+background_hex colors (inputs that are not plain hex) are color-index
+columns, null for the other pairs. Simulated color-vision results, when
+present, are one set of foreground/background/score/flags columns per
+deficiency under pairs["vision"]. Nothing is lost: the widget's
+expandCompact() rebuilds the default structure.
+"""
+import contrast_metrics
+import contrast_solver
+
+FORMAT = "compact-v1"
+
+FLAG_BITS = ("aa_normal", "aa_large", "aaa_normal", "aaa_large")
+
+SUGGESTION_TYPES = contrast_solver.KINDS
+
+
+class _Table:
+    """Values in first-seen order with their index"""
+
+    def __init__(self):
+        self.index = {}
+        self.values = []
+
+    def __call__(self, value):
+        i = self.index.get(value)
+        if i is None:
+            i = self.index[value] = len(self.values)
+            self.values.append(value)
+        return i
+
+
+def pack_flags(pair, flag_bits=FLAG_BITS):
+    """Bitmask of the passes_* flags of one analyzed pair"""
+    flags = 0
+    for bit, name in enumerate(flag_bits):
+        if pair[f"passes_{name}"]:
+            flags |= 1 << bit
+    return flags
+
+
+def to_compact(result_data):
+    """Encode a check_color_accessibility result as compact-v1"""
+    colors = _Table()
+    oklch = _Table()
+    types = {name: i for i, name in enumerate(SUGGESTION_TYPES)}
+    selection = result_data.get("metrics") or {}
+    metrics = selection.get("selected", contrast_metrics.DEFAULT_METRICS)
+    flag_bits = [flag.replace("passes_", "", 1) for flag in contrast_metrics.flag_names(metrics)]
+    scores = [key for key in contrast_metrics.score_keys(metrics) if key != "ratio"]
+    # Suggestions carry the score of the metric they were solved for (new_apca_lc, ...)
+    target = contrast_metrics.get_metric(selection.get("target_metric"))
+    new_score = [] if target.key == "ratio" else [target.key]
+
+    pairs = {"text_sample": [], "foreground": [], "background": [], "ratio": [], **{key: [] for key in scores}, "flags": []}
+    deficiencies = (result_data.get("vision") or {}).get("deficiencies", [])
+    vision = {
+        name: {"foreground": [], "background": [], "ratio": [], **{key: [] for key in scores}, "flags": []}
+        for name in deficiencies
+    }
+    suggestions = {
+        "pair": [], "type": [], "background": [], "foreground": [],
+        "background_oklch": [], "foreground_oklch": [], "ratio": [], **{key: [] for key in new_score}, "delta_e": [],
+    }
+    resolved = {"foreground_hex": [], "background_hex": []}
+    for i, pair in enumerate(result_data["color_pairs"]):
+        pairs["text_sample"].append(pair["text_sample"])
+        pairs["foreground"].append(colors(pair["foreground"]))
+        pairs["background"].append(colors(pair["background"]))
+        for key, column in resolved.items():
+            column.append(colors(pair[key]) if key in pair else None)
+        pairs["ratio"].append(pair["ratio"])
+        for key in scores:
+            pairs[key].append(pair[key])
+        pairs["flags"].append(pack_flags(pair, flag_bits))
+        for name, columns in vision.items():
+            simulated = pair["vision"][name]
+            columns["foreground"].append(colors(simulated["foreground"]))
+            columns["background"].append(colors(simulated["background"]))
+            columns["ratio"].append(simulated["ratio"])
+            for key in scores:
+                columns[key].append(simulated[key])
+            columns["flags"].append(pack_flags(simulated, flag_bits))
+        for s in pair["suggestions"]:
+            suggestions["pair"].append(i)
+            suggestions["type"].append(types[s["type"]])
+            suggestions["background"].append(colors(s["preview_hex_bg"]))
+            suggestions["foreground"].append(colors(s["preview_hex_fg"]))
+            suggestions["background_oklch"].append(oklch(s["background_oklch"]))
+            suggestions["foreground_oklch"].append(oklch(s["foreground_oklch"]))
+            suggestions["ratio"].append(s["new_contrast_ratio"])
+            for key in new_score:
+                suggestions[key].append(s[f"new_{key}"])
+            suggestions["delta_e"].append(s["delta_e"])
+
+    if any(index is not None for index in resolved["foreground_hex"]):
+        pairs.update(resolved)
+    if vision:
+        pairs["vision"] = vision
+
+    compact = {key: value for key, value in result_data.items() if key != "color_pairs"}
+    compact.update({
+        "format": FORMAT,
+        "flag_bits": flag_bits,
+        "suggestion_types": list(SUGGESTION_TYPES),
+        "colors": colors.values,
+        "oklch": oklch.values,
+        "pairs": pairs,
+        "suggestions": suggestions,
+    })
+    return compact
@@ -0,0 +1,61 @@
+"""
+Vectorized WCAG contrast engine.
+
+Array counterpart of calculate_luminance / calculate_contrast_ratio in
+color_audit: channels of uint8 colors are linearized through a
+precomputed 256-entry table and luminance and ratios are computed as
+array operations, bit-for-bit identical to the scalar functions. Batch
+analysis of pairs lives in contrast_metrics (scores and flags) and
+color_parser (parsing).
+"""
+import numpy as np
+
+# WCAG thresholds (same values as evaluate_wcag)
+WCAG_THRESHOLDS = {
+    "passes_aa_normal": 4.5,
+    "passes_aa_large": 3.0,
+    "passes_aaa_normal": 7.0,
+    "passes_aaa_large": 4.5,
+}
+
+
+def _linearize(c):
+    """Same normalization as calculate_luminance, evaluated in Python floats"""
+    c = c / 255.0
+    return c / 12.92 if c <= 0.03928 else ((c + 0.055) / 1.055) ** 2.4
+
+
+# Linearized sRGB channel value for every possible 8-bit input
+LINEAR_LUT = np.array([_linearize(c) for c in range(256)], dtype=np.float64)
+
+
+def relative_luminance(rgb):
+    """Relative luminance of a (..., 3) uint8 array"""
+    lin = LINEAR_LUT[rgb]
+    return 0.2126 * lin[..., 0] + 0.7152 * lin[..., 1] + 0.0722 * lin[..., 2]
+
+
+def contrast_ratios(fg_rgb, bg_rgb):
+    """Contrast ratio between two (..., 3) uint8 arrays"""
+    l1 = relative_luminance(fg_rgb)
+    l2 = relative_luminance(bg_rgb)
+    lighter = np.maximum(l1, l2)
+    darker = np.minimum(l1, l2)
+    return (lighter + 0.05) / (darker + 0.05)
+
+
+def pack_rgb(rgb):
+    """
+    Pack (..., 3) uint8 colors into 24-bit 0xRRGGBB integers, one per color:
+    a cheap key for np.unique and dict lookups over many colors.
+    """
+    rgb = rgb.astype(np.int64)
+    return (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+
+
+def contrast_matrix(rgb):
+    """N x N contrast ratios between every pair of an (n, 3) uint8 palette"""
+    lum = relative_luminance(rgb)
+    lighter = np.maximum(lum[:, None], lum[None, :])
+    darker = np.minimum(lum[:, None], lum[None, :])
+    return (lighter + 0.05) / (darker + 0.05)
@@ -0,0 +1,268 @@
+"""
+OCR-free low-contrast heatmap for very large screenshots.
+
+Full-page captures (1440x20000 px and more) are too slow for OCR. This
+mode looks for text-like edges whose contrast is below the target
+instead of reading the text:
+
+1. Luminance per pixel (the calculate_luminance formula, through
+   contrast_engine.LINEAR_LUT), then the min and max luminance in a
+   WINDOW x WINDOW neighbourhood (separable sliding min/max). The local
+   contrast of a pixel is the WCAG ratio of that max and min.
+2. Pixels with a visible edge (ratio >= MIN_VISIBLE_RATIO) are counted
+   per CELL x CELL cell as low (below the target) or high (at or above).
+   Low pixels are counted again as "text-like" when they sit at one end
+   of their window's range (text on a flat background is two colors plus
+   anti-aliasing, photos and textures spread over the range) and see
+   contrast both along the row and along the column (glyphs have edges
+   in every direction, the border of a card or banner in only one).
+3. Cells where low edges dominate are joined into regions; a region is
+   kept if low edges also dominate its bounding box (this drops the
+   faint halo around high-contrast text) and most of them are text-like,
+   and regions are ranked by how much low-contrast edge they hold and
+   how far below the target it is.
+4. The top regions are cropped and get fg/bg colors from the same
+   estimator as the OCR mode, then the usual contrast analysis.
+
+The image is walked in bands of TILE_ROWS rows (plus a halo of WINDOW/2
+rows), so the working set is a few bands of float32 luminance whatever
+the image height; bands are processed by HEATMAP_THREADS threads (NumPy
+releases the GIL). Pillow decodes compressed formats in one go but
+converts to RGB only band by band, and memory-maps uncompressed ones.
+
+Configuration (environment variables):
+  HEATMAP_MAX_PIXELS  largest accepted image (default 120 Mpx)
+  HEATMAP_TILE_ROWS   rows per band (default 128)
+  HEATMAP_THREADS     bands processed at once (default: CPU count, max 4)
+"""
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import image_audit
+from color_audit import analyze_pairs_with_errors
+from contrast_engine import LINEAR_LUT
+
+MAX_PIXELS = int(os.getenv("HEATMAP_MAX_PIXELS", str(120_000_000)))
+WINDOW = 7
+CELL = 8
+# Rows per band, a multiple of CELL so cells never straddle two bands
+TILE_ROWS = max(CELL, int(os.getenv("HEATMAP_TILE_ROWS", "128")) // CELL * CELL)
+THREADS = max(1, int(os.getenv("HEATMAP_THREADS", str(min(4, os.cpu_count() or 1)))))
+
+# Below this local ratio nothing is readable (flat areas, gradients, noise)
+MIN_VISIBLE_RATIO = 1.25
+# A cell needs this many low-contrast edge pixels to count
+MIN_CELL_PIXELS = CELL * CELL // 8
+# "At one end of the range": within this fraction of the window's min or max
+EXTREME_FRACTION = 0.15
+# Shares of the low pixels of a region that must be bimodal, and that
+# must see contrast along rows and (separately) along columns
+MIN_BIMODAL_SHARE = 0.6
+MIN_DIRECTION_SHARE = 0.2
+
+# Weighted channel tables: luminance = R[r] + G[g] + B[b]
+_LUMA_LUT = np.stack([0.2126 * LINEAR_LUT, 0.7152 * LINEAR_LUT, 0.0722 * LINEAR_LUT]).astype(np.float32)
+
+
+def luminance(rgb):
+    """float32 relative luminance of an (h, w, 3) uint8 array"""
+    return _LUMA_LUT[0][rgb[..., 0]] + _LUMA_LUT[1][rgb[..., 1]] + _LUMA_LUT[2][rgb[..., 2]]
+
+
+def _sliding(values, window, axis, size, op):
+    """Running op (np.minimum or np.maximum) over `window` entries along one axis"""
+    take = (lambda k: values[k:k + size]) if axis == 0 else (lambda k: values[:, k:k + size])
+    out = take(0).copy()
+    for k in range(1, window):
+        op(out, take(k), out=out)
+    return out
+
+
+def window_extrema(lum, window=WINDOW):
+    """
+    Min and max of every window x window neighbourhood (edges replicated),
+    plus the row-only and column-only ratios of the same window.
+    """
+    r = window // 2
+    h, w = lum.shape
+    padded = np.pad(lum, r, mode="edge")
+    row_low = _sliding(padded, window, 1, w, np.minimum)
+    row_high = _sliding(padded, window, 1, w, np.maximum)
+    low = _sliding(row_low, window, 0, h, np.minimum)
+    high = _sliding(row_high, window, 0, h, np.maximum)
+    column = padded[:, r:r + w]
+    col_ratio = ((_sliding(column, window, 0, h, np.maximum) + 0.05)
+                 / (_sliding(column, window, 0, h, np.minimum) + 0.05))
+    row_ratio = (row_high[r:r + h] + 0.05) / (row_low[r:r + h] + 0.05)
+    return low, high, row_ratio, col_ratio
+
+
+def _cell_sums(values, cell=CELL, dtype=np.int32):
+    """Sum over cell x cell blocks of an (h, w) array; h is a multiple of cell"""
+    h, w = values.shape
+    pad = -w % cell
+    if pad:
+        values = np.pad(values, ((0, 0), (0, pad)))
+    # Rows first (contiguous adds), then columns: much faster than one 4-D sum
+    rows = values.reshape(h // cell, cell, -1).sum(axis=1, dtype=dtype)
+    return rows.reshape(h // cell, -1, cell).sum(axis=2, dtype=dtype)
+
+
+def _band(image, top, bottom, target_ratio):
+    """Per-cell low/high/text-like edge counts and low-ratio sums for rows [top, bottom)"""
+    r = WINDOW // 2
+    start, stop = max(0, top - r), min(image.height, bottom + r)
+    rgb = np.asarray(image_audit.to_rgb(image.crop((0, start, image.width, stop))))
+    lum = luminance(rgb)
+    low, high, row_ratio, col_ratio = window_extrema(lum)
+    rows = slice(top - start, top - start + (bottom - top))
+    lum, low, high = lum[rows], low[rows], high[rows]
+    ratio = (high + 0.05) / (low + 0.05)
+    margin = EXTREME_FRACTION * (high - low)
+    flags = [(lum - low <= margin) | (high - lum <= margin),
+             row_ratio[rows] >= MIN_VISIBLE_RATIO,
+             col_ratio[rows] >= MIN_VISIBLE_RATIO]
+
+    # The last band may be shorter than a cell: pad with flat (ratio 1) rows
+    extra = -ratio.shape[0] % CELL
+    if extra:
+        ratio = np.pad(ratio, ((0, extra), (0, 0)), constant_values=1.0)
+        flags = [np.pad(flag, ((0, extra), (0, 0))) for flag in flags]
+    visible = ratio >= MIN_VISIBLE_RATIO
+    is_low = visible & (ratio < target_ratio)
+    return (_cell_sums(is_low),
+            _cell_sums(visible & ~is_low),
+            *[_cell_sums(is_low & flag) for flag in flags],
+            _cell_sums(np.where(is_low, ratio, 0), dtype=np.float64))
+
+
+def contrast_cells(image, target_ratio=4.5, threads=THREADS):
+    """Low / high / text-like edge counts and low ratio sums per cell for the whole image"""
+    image.load()
+    bands = [(top, min(image.height, top + TILE_ROWS)) for top in range(0, image.height, TILE_ROWS)]
+    if threads > 1 and len(bands) > 1:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            parts = list(executor.map(lambda band: _band(image, *band, target_ratio), bands))
+    else:
+        parts = [_band(image, top, bottom, target_ratio) for top, bottom in bands]
+    return tuple(np.concatenate([part[k] for part in parts]) for k in range(6))
+
+
+def find_regions(low, high, bimodal, row_edges, col_edges, ratio_sum, target_ratio=4.5):
+    """
+    Ranked low-contrast regions from per-cell counts: dicts with the cell
+    bounding box, low and high edge pixels and the mean low local ratio.
+    """
+    flagged = (low >= MIN_CELL_PIXELS) & (low >= high)
+    # Bridge letter and word gaps along the line
+    bridged = flagged.copy()
+    bridged[:, 1:] |= flagged[:, :-1]
+    bridged[:, :-1] |= flagged[:, 1:]
+
+    rows, cols = bridged.shape
+    seen = np.zeros_like(bridged)
+    regions = []
+    for y, x in zip(*np.nonzero(bridged)):
+        if seen[y, x]:
+            continue
+        seen[y, x] = True
+        queue = deque([(y, x)])
+        y0, x0, y1, x1 = y, x, y, x
+        while queue:
+            cy, cx = queue.popleft()
+            y0, x0, y1, x1 = min(y0, cy), min(x0, cx), max(y1, cy), max(x1, cx)
+            for ny in (cy - 1, cy, cy + 1):
+                for nx in (cx - 1, cx, cx + 1):
+                    if 0 <= ny < rows and 0 <= nx < cols and bridged[ny, nx] and not seen[ny, nx]:
+                        seen[ny, nx] = True
+                        queue.append((ny, nx))
+        box = (slice(y0, y1 + 1), slice(x0, x1 + 1))
+        low_pixels = int(low[box].sum())
+        high_pixels = int(high[box].sum())
+        # Halos of high-contrast text are surrounded by high edges
+        if low_pixels < MIN_CELL_PIXELS or low_pixels < high_pixels:
+            continue
+        # Textures are not two-colored; surface borders run in one direction
+        if (bimodal[box].sum() < MIN_BIMODAL_SHARE * low_pixels
+                or min(row_edges[box].sum(), col_edges[box].sum()) < MIN_DIRECTION_SHARE * low_pixels):
+            continue
+        local_ratio = float(ratio_sum[box].sum()) / low_pixels
+        regions.append({
+            "cells": (int(x0), int(y0), int(x1) + 1, int(y1) + 1),
+            "low_pixels": low_pixels,
+            "high_pixels": high_pixels,
+            "local_ratio": local_ratio,
+            "score": low_pixels * (1 - local_ratio / target_ratio),
+        })
+    regions.sort(key=lambda region: region["score"], reverse=True)
+    return regions
+
+
+def sample_region_colors(image, boxes):
+    """fg/bg RGB ((n, 3) uint8) for [x, y, w, h] pixel boxes, one small crop each"""
+    fg = np.zeros((len(boxes), 3), dtype=np.uint8)
+    bg = np.zeros((len(boxes), 3), dtype=np.uint8)
+    for i, (x, y, w, h) in enumerate(boxes):
+        pad = max(2, h // 4)
+        left, top = max(0, x - pad), max(0, y - pad)
+        crop = image_audit.to_rgb(image.crop((left, top, min(image.width, x + w + pad),
+                                              min(image.height, y + h + pad))))
+        # Regions span whole lines: sample (nearly) every pixel, not a word-sized grid
+        region_fg, region_bg = image_audit.estimate_box_colors(
+            np.asarray(crop), [[x - left, y - top, w, h]], grid=(min(h, 64), min(w, 512)))
+        fg[i], bg[i] = region_fg[0], region_bg[0]
+    return fg, bg
+
+
+def analyze_heatmap(image_data=None, image_url=None, target_ratio=4.5, max_regions=50):
+    """Heatmap audit: local-contrast map, ranked regions, sampled colors, contrast analysis"""
+    timings = {}
+    start = time.perf_counter()
+    image = image_audit.open_image(image_audit.load_image_bytes(image_data, image_url), MAX_PIXELS)
+    timings["decode"] = time.perf_counter() - start
+
+    tick = time.perf_counter()
+    try:
+        cells = contrast_cells(image, target_ratio)
+    except OSError as e:
+        raise ValueError(f"Invalid image: {e}")
+    timings["map"] = time.perf_counter() - tick
+
+    tick = time.perf_counter()
+    regions = find_regions(*cells, target_ratio)
+    top_regions = regions[:max_regions]
+    boxes = []
+    for region in top_regions:
+        x0, y0, x1, y1 = region["cells"]
+        x, y = x0 * CELL, y0 * CELL
+        boxes.append([x, y, min(image.width, x1 * CELL) - x, min(image.height, y1 * CELL) - y])
+    timings["regions"] = time.perf_counter() - tick
+
+    tick = time.perf_counter()
+    analyzed = []
+    if boxes:
+        fg, bg = sample_region_colors(image, boxes)
+        pairs = [{"foreground": f, "background": b, "element": f"Región {rank}"}
+                 for rank, (f, b) in enumerate(zip(image_audit.to_hex(fg), image_audit.to_hex(bg)), 1)]
+        analyzed, _ = analyze_pairs_with_errors(pairs, target_ratio, verbose=False)
+        for pair, box, region in zip(analyzed, boxes, top_regions):
+            pair["bbox"] = box
+            pair["local_ratio"] = round(region["local_ratio"], 2)
+            pair["low_contrast_pixels"] = region["low_pixels"]
+    timings["analysis"] = time.perf_counter() - tick
+
+    passed = sum(1 for p in analyzed if p["passes_aa_normal"])
+    return {
+        "mode": "heatmap",
+        "total_pairs": len(analyzed),
+        "passed_pairs": passed,
+        "failed_pairs": len(analyzed) - passed,
+        "target_ratio": target_ratio,
+        "image": {"width": image.width, "height": image.height, "regions": len(regions)},
+        "timings_ms": {stage: round(seconds * 1000, 1) for stage, seconds in timings.items()},
+        "color_pairs": analyzed,
+    }
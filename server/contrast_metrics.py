@@ -0,0 +1,264 @@
+"""
+Pluggable contrast metrics: WCAG 2.x and APCA computed in one sweep.
+
+A metric turns an 8-bit sRGB color into a luminance through a 256-entry
+table per channel (pre-weighted, so the luminance is three lookups and
+two additions), then scores text/background luminance pairs and
+compares the score against named levels. The batch engine parses and
+deduplicates colors once for every selected metric; metrics sharing a
+table share the lookup.
+
+- wcag2: WCAG 2.x contrast ratio, bit-for-bit identical to contrast_engine
+  (and so to calculate_contrast_ratio / evaluate_wcag).
+- apca: APCA 0.0.98G-4g lightness contrast Lc. Signed by polarity
+  (positive for dark text on light, negative for light text on dark);
+  levels compare |Lc|.
+
+Levels can be overridden per request (`thresholds`), and
+contrast_solver can target any metric. A new metric subclasses
+ContrastMetric and must implement contrast(); one that doesn't cannot be
+instantiated, so it fails when METRICS is built at import.
+"""
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+import color_parser
+import contrast_engine
+
+
+class ContrastMetric(ABC):
+    """
+    A contrast metric: `luminance(rgb)` from pre-weighted channel tables,
+    `contrast(text_lum, bg_lum)` for pairs, and pass/fail `levels`
+    ({flag: threshold}) compared against `magnitude(score)`.
+    """
+
+    def __init__(self, name, key, table, levels, targets, target_range, digits):
+        self.name = name
+        self.key = key
+        self.table = table
+        self.levels = levels
+        self.targets = targets
+        self.target_range = target_range
+        self.digits = digits
+
+    def luminance(self, rgb):
+        rgb = np.asarray(rgb, dtype=np.uint8)
+        return self.table[0][rgb[..., 0]] + self.table[1][rgb[..., 1]] + self.table[2][rgb[..., 2]]
+
+    @abstractmethod
+    def contrast(self, text_lum, bg_lum):
+        """Score of text/background luminance arrays, in the metric's own scale"""
+
+    def magnitude(self, score):
+        return score
+
+    def resolve_target(self, target):
+        """Named target (e.g. 'AA', 'BODY') or number, checked against target_range"""
+        if target is None:
+            return next(iter(self.targets.values()))
+        if isinstance(target, str):
+            key = target.strip().upper().replace(" ", "_")
+            if key in self.targets:
+                return self.targets[key]
+            try:
+                target = float(key)
+            except ValueError:
+                raise ValueError(f"Unknown {self.name} target '{target}', expected a number or one of {', '.join(self.targets)}")
+        target = float(target)
+        low, high = self.target_range
+        if not low <= target <= high:
+            raise ValueError(f"{self.name} target must be between {low} and {high}, got {target}")
+        return target
+
+
+class WCAG2(ContrastMetric):
+    def contrast(self, text_lum, bg_lum):
+        lighter = np.maximum(text_lum, bg_lum)
+        darker = np.minimum(text_lum, bg_lum)
+        return (lighter + 0.05) / (darker + 0.05)
+
+
+class APCA(ContrastMetric):
+    # APCA 0.0.98G-4g constants
+    NORM_BG, NORM_TXT, REV_TXT, REV_BG = 0.56, 0.57, 0.62, 0.65
+    BLK_THRS, BLK_CLMP = 0.022, 1.414
+    SCALE_BOW = SCALE_WOB = 1.14
+    LO_BOW_OFFSET = LO_WOB_OFFSET = 0.027
+    DELTA_Y_MIN, LO_CLIP = 0.0005, 0.1
+
+    def _clamp_black(self, y):
+        return np.where(y > self.BLK_THRS, y, y + np.abs(self.BLK_THRS - y) ** self.BLK_CLMP)
+
+    def contrast(self, text_lum, bg_lum):
+        txt = self._clamp_black(np.asarray(text_lum, dtype=np.float64))
+        bg = self._clamp_black(np.asarray(bg_lum, dtype=np.float64))
+        normal = bg > txt
+        # Normal polarity (dark text on light) and reverse, both evaluated then selected
+        sapc = np.where(
+            normal,
+            (bg ** self.NORM_BG - txt ** self.NORM_TXT) * self.SCALE_BOW,
+            (bg ** self.REV_BG - txt ** self.REV_TXT) * self.SCALE_WOB,
+        )
+        out = np.where(
+            normal,
+            np.where(sapc < self.LO_CLIP, 0.0, sapc - self.LO_BOW_OFFSET),
+            np.where(sapc > -self.LO_CLIP, 0.0, sapc + self.LO_WOB_OFFSET),
+        )
+        return np.where(np.abs(bg - txt) < self.DELTA_Y_MIN, 0.0, out * 100.0)
+
+    def magnitude(self, score):
+        return np.abs(score)
+
+
+def _weighted(lut, weights):
+    return np.stack([w * lut for w in weights])
+
+
+_APCA_LUT = (np.arange(256) / 255.0) ** 2.4
+
+METRICS = {
+    "wcag2": WCAG2(
+        "wcag2", "ratio",
+        _weighted(contrast_engine.LINEAR_LUT, (0.2126, 0.7152, 0.0722)),
+        levels=dict(contrast_engine.WCAG_THRESHOLDS),
+        targets={"AA": 4.5, "AAA": 7.0, "AA_LARGE": 3.0, "AAA_LARGE": 4.5},
+        target_range=(1.0, 21.0),
+        digits=2,
+    ),
+    "apca": APCA(
+        "apca", "apca_lc",
+        _weighted(_APCA_LUT, (0.2126729, 0.7151522, 0.0721750)),
+        # APCA readability levels (|Lc|): body text, other content text, large/bold text, spot text
+        levels={
+            "passes_apca_body": 75.0,
+            "passes_apca_content": 60.0,
+            "passes_apca_large": 45.0,
+            "passes_apca_spot": 30.0,
+        },
+        targets={"BODY": 75.0, "CONTENT": 60.0, "LARGE": 45.0, "SPOT": 30.0},
+        target_range=(0.0, 108.0),
+        digits=1,
+    ),
+}
+
+DEFAULT_METRICS = ("wcag2",)
+
+
+def get_metric(name):
+    metric = METRICS.get(name or "wcag2")
+    if metric is None:
+        raise ValueError(f"Unknown metric '{name}', expected one of {', '.join(METRICS)}")
+    return metric
+
+
+def resolve_metrics(value, target_metric="wcag2"):
+    """
+    Metric names from a tool argument (list or comma-separated string).
+    wcag2 always comes first (the result schema is built on it) and the
+    target metric is always included.
+    """
+    if value is None:
+        value = []
+    elif isinstance(value, str):
+        value = [name.strip() for name in value.split(",") if name.strip()]
+    names = list(DEFAULT_METRICS)
+    for name in [*value, target_metric]:
+        get_metric(name)
+        if name not in names:
+            names.append(name)
+    return tuple(names)
+
+
+def resolve_thresholds(metrics, overrides=None):
+    """{flag: threshold} for the selected metrics, with per-request overrides by flag name"""
+    thresholds = {}
+    for name in metrics:
+        thresholds.update(METRICS[name].levels)
+    for flag, value in (overrides or {}).items():
+        key = flag if flag.startswith("passes_") else f"passes_{flag}"
+        if key not in thresholds:
+            raise ValueError(f"Unknown threshold '{flag}', expected one of "
+                             f"{', '.join(k.replace('passes_', '') for k in thresholds)}")
+        thresholds[key] = float(value)
+    return thresholds
+
+
+def evaluate(fg_rgb, bg_rgb, metrics=DEFAULT_METRICS, thresholds=None):
+    """
+    Scores and flags of (..., 3) uint8 fg/bg arrays for every selected metric.
+
+    Returns {metric.key: scores, flag: bool array} with one entry per
+    metric and per level. Colors are looked up once per distinct table.
+    """
+    thresholds = thresholds or resolve_thresholds(metrics)
+    result = {}
+    luminance = {}
+    for name in metrics:
+        metric = METRICS[name]
+        table_id = id(metric.table)
+        if table_id not in luminance:
+            luminance[table_id] = (metric.luminance(fg_rgb), metric.luminance(bg_rgb))
+        fg_lum, bg_lum = luminance[table_id]
+        score = metric.contrast(fg_lum, bg_lum)
+        result[metric.key] = score
+        magnitude = metric.magnitude(score)
+        for flag in metric.levels:
+            result[flag] = magnitude >= thresholds[flag]
+    return result
+
+
+def flag_names(metrics=DEFAULT_METRICS):
+    """passes_* flags reported for a metric selection, in order"""
+    return [flag for name in metrics for flag in METRICS[name].levels]
+
+
+def score_keys(metrics=DEFAULT_METRICS):
+    """{result key: rounding digits} of the scores reported for a metric selection"""
+    return {METRICS[name].key: METRICS[name].digits for name in metrics}
+
+
+def analyze_batch(foregrounds, backgrounds, parse_pairs=color_parser.parse_pairs, metrics=DEFAULT_METRICS,
+                  thresholds=None):
+    """
+    Scores and flags of a batch of color pairs for any set of metrics: pairs
+    are parsed once with `parse_pairs` (color_parser.parse_pairs by default),
+    duplicate pairs are evaluated once, and every metric is computed in the same pass.
+    Returns `rgb`, `valid`, `errors`, one score array per metric key and one
+    boolean array per flag.
+    """
+    rgb, valid, errors = parse_pairs(foregrounds, backgrounds)
+    n = len(valid)
+    result = {"rgb": rgb, "valid": valid, "errors": errors}
+    unique_rgb = np.zeros((0, 2, 3), dtype=np.uint8)
+    inverse = np.zeros(0, dtype=np.int64)
+    if valid.any():
+        keys = (contrast_engine.pack_rgb(rgb[valid, 0]) << 24) | contrast_engine.pack_rgb(rgb[valid, 1])
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        unique_rgb = rgb[valid][first]
+    scores = evaluate(unique_rgb[:, 0], unique_rgb[:, 1], metrics, thresholds)
+    for key, values in scores.items():
+        full = np.zeros(n, dtype=values.dtype)
+        full[valid] = values[inverse.reshape(-1)]
+        result[key] = full
+    return result
+
+
+def count_passes(analyzed_pairs, metrics=DEFAULT_METRICS):
+    """{flag: pairs passing} over analyzed pairs (None entries skipped)"""
+    return {
+        flag: sum(1 for pair in analyzed_pairs if pair is not None and pair[flag])
+        for flag in flag_names(metrics)
+    }
+
+
+def summarize(analyzed_pairs, metrics=DEFAULT_METRICS, thresholds=None, target_metric="wcag2", passed_pairs=None):
+    """Result-level metrics block: selection, effective thresholds and pairs passing each level"""
+    thresholds = thresholds or resolve_thresholds(metrics)
+    return {
+        "selected": list(metrics),
+        "target_metric": target_metric,
+        "thresholds": {flag: thresholds[flag] for flag in flag_names(metrics)},
+        "passed_pairs": passed_pairs if passed_pairs is not None else count_passes(analyzed_pairs, metrics)
+    }
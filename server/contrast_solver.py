@@ -0,0 +1,164 @@
+"""
+Minimal-change contrast solver.
+
+With hue and chroma held, luminance grows monotonically with OKLCH
+lightness, so the smallest lightness change that reaches a target
+contrast can be found by bisection. Every problem of a batch (one pair
+moved in one direction) is bisected together: one feasibility check at
+the end of the range plus a fixed number of halvings, i.e. a bounded
+number of vectorized evaluations regardless of batch size. The target is
+expressed in any contrast_metrics metric (WCAG 2.x ratio by default, or
+APCA |Lc|).
+"""
+import numpy as np
+
+import contrast_metrics
+import gamut_lut
+import oklab
+
+# Named WCAG targets accepted by the tools (ratio for normal / large text)
+TARGETS = contrast_metrics.METRICS["wcag2"].targets
+
+# Halvings of the lightness range; 2**-12 is well below one 8-bit step
+ITERATIONS = 12
+
+# Suggestion kinds reported to clients
+KINDS = ("lighten_bg", "darken_bg", "adjust_fg", "adjust_both")
+
+# Bisection problems per pair: (name, bg direction, fg direction)
+_PROBLEMS = (
+    ("lighten_bg", 1.0, 0.0),
+    ("darken_bg", -1.0, 0.0),
+    ("fg_lighter", 0.0, 1.0),
+    ("fg_darker", 0.0, -1.0),
+    ("bg_lighter_fg_darker", 1.0, -1.0),
+    ("bg_darker_fg_lighter", -1.0, 1.0),
+)
+
+# Kinds that keep the cheapest feasible of several problems
+_ALTERNATIVES = {
+    "lighten_bg": ("lighten_bg",),
+    "darken_bg": ("darken_bg",),
+    "adjust_fg": ("fg_lighter", "fg_darker"),
+    "adjust_both": ("bg_lighter_fg_darker", "bg_darker_fg_lighter"),
+}
+
+
+def resolve_target(target, metric="wcag2"):
+    """Turn a named target ('AA', 'AAA', ... or 'BODY', 'CONTENT', ... for APCA) or a number into a value of the metric"""
+    return contrast_metrics.get_metric(metric).resolve_target(target)
+
+
+def _move(lch, rgb, lum, direction, amount, luminance):
+    """Shift lightness by direction * amount (clamped) and fit into sRGB"""
+    moved = lch.copy()
+    rgb = rgb.copy()
+    lum = lum.copy()
+    rows = direction != 0
+    if rows.any():
+        shifted = lch[rows].copy()
+        shifted[:, 0] = np.clip(shifted[:, 0] + direction[rows] * amount[rows], 0.0, 1.0)
+        shifted = gamut_lut.fit(shifted)
+        moved[rows] = shifted
+        rgb[rows] = oklab.oklch_to_srgb8(shifted, fit=False)
+        lum[rows] = luminance(rgb[rows])
+    return moved, rgb, lum
+
+
+def solve(bg_rgb, fg_rgb, bg_lch, fg_lch, bg_dir, fg_dir, target, iterations=ITERATIONS, metric="wcag2"):
+    """
+    Find the smallest lightness shift reaching `target` for each problem.
+
+    bg_dir / fg_dir are arrays of -1, 0 or +1 saying how each color moves.
+    Returns a dict with `feasible`, the fitted `bg_lch` / `fg_lch`, their
+    8-bit `bg_rgb` / `fg_rgb` and the achieved `ratio` (the metric's
+    magnitude, e.g. |Lc| for APCA). Rows that are not feasible hold the
+    end-of-range colors.
+    """
+    metric = contrast_metrics.get_metric(metric)
+    bg_rgb = np.asarray(bg_rgb, dtype=np.uint8)
+    fg_rgb = np.asarray(fg_rgb, dtype=np.uint8)
+    bg_dir = np.asarray(bg_dir, dtype=np.float64)
+    fg_dir = np.asarray(fg_dir, dtype=np.float64)
+    target = np.broadcast_to(np.asarray(target, dtype=np.float64), bg_dir.shape)
+    bg_lum = metric.luminance(bg_rgb)
+    fg_lum = metric.luminance(fg_rgb)
+
+    def evaluate(amount):
+        bg = _move(bg_lch, bg_rgb, bg_lum, bg_dir, amount, metric.luminance)
+        fg = _move(fg_lch, fg_rgb, fg_lum, fg_dir, amount, metric.luminance)
+        return bg, fg, metric.magnitude(metric.contrast(fg[2], bg[2]))
+
+    # The far end of the range decides feasibility and seeds the answer
+    best_bg, best_fg, best_ratio = evaluate(np.ones(len(bg_dir)))
+    feasible = best_ratio >= target
+
+    low = np.zeros(len(bg_dir))
+    high = np.ones(len(bg_dir))
+    for _ in range(iterations):
+        mid = (low + high) / 2
+        bg, fg, ratio = evaluate(mid)
+        ok = ratio >= target
+        low = np.where(ok, low, mid)
+        high = np.where(ok, mid, high)
+        keep = ok[:, None]
+        best_bg = tuple(np.where(keep, new, old) for new, old in zip(bg[:2], best_bg[:2]))
+        best_fg = tuple(np.where(keep, new, old) for new, old in zip(fg[:2], best_fg[:2]))
+        best_ratio = np.where(ok, ratio, best_ratio)
+
+    return {
+        "feasible": feasible,
+        "bg_lch": best_bg[0],
+        "bg_rgb": best_bg[1].astype(np.uint8),
+        "fg_lch": best_fg[0],
+        "fg_rgb": best_fg[1].astype(np.uint8),
+        "ratio": best_ratio,
+    }
+
+
+def delta_e(rgb1, rgb2):
+    """OKLab Euclidean distance between two (..., 3) uint8 arrays"""
+    return np.linalg.norm(oklab.srgb8_to_oklab(rgb1) - oklab.srgb8_to_oklab(rgb2), axis=-1)
+
+
+def solve_pairs(bg_rgb, fg_rgb, bg_lch, fg_lch, target, metric="wcag2"):
+    """
+    Solve every suggestion kind for n failing pairs at once.
+
+    Returns {kind: solve() result plus `delta_e`}, each with n rows.
+    `adjust_fg` and `adjust_both` try both directions and keep the feasible
+    fix with the smallest total OKLab ΔE. A fix that lands on the same
+    colors as an earlier kind (e.g. `adjust_both` on a white background,
+    which can only move the foreground) is marked not feasible.
+    """
+    n = len(bg_rgb)
+    m = len(_PROBLEMS)
+    solved = solve(
+        np.tile(bg_rgb, (m, 1)), np.tile(fg_rgb, (m, 1)),
+        np.tile(bg_lch, (m, 1)), np.tile(fg_lch, (m, 1)),
+        np.repeat([p[1] for p in _PROBLEMS], n), np.repeat([p[2] for p in _PROBLEMS], n),
+        target, metric=metric,
+    )
+    solved["delta_e"] = (delta_e(solved["bg_rgb"], np.tile(bg_rgb, (m, 1)))
+                         + delta_e(solved["fg_rgb"], np.tile(fg_rgb, (m, 1))))
+
+    by_problem = {}
+    for i, (name, _, _) in enumerate(_PROBLEMS):
+        rows = slice(i * n, (i + 1) * n)
+        by_problem[name] = {key: value[rows] for key, value in solved.items()}
+
+    results = {}
+    for kind in KINDS:
+        options = [by_problem[name] for name in _ALTERNATIVES[kind]]
+        best = dict(options[0])
+        for option in options[1:]:
+            better = option["feasible"] & (~best["feasible"] | (option["delta_e"] < best["delta_e"]))
+            for key in best:
+                mask = better[:, None] if best[key].ndim == 2 else better
+                best[key] = np.where(mask, option[key], best[key])
+        for earlier in results.values():
+            same = ((best["bg_rgb"] == earlier["bg_rgb"]).all(axis=1)
+                    & (best["fg_rgb"] == earlier["fg_rgb"]).all(axis=1))
+            best["feasible"] = best["feasible"] & ~(same & earlier["feasible"])
+        results[kind] = best
+    return results
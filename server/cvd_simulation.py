@@ -0,0 +1,164 @@
+"""
+Vectorized color-vision-deficiency (CVD) simulation.
+
+Each deficiency is a 3x3 matrix applied in linear RGB. Protanopia,
+deuteranopia and tritanopia use the Machado, Oliveira & Fernandes (2009)
+matrices, tabulated by coloraide for severities 0.0-1.0 in steps of 0.1
+and interpolated in between exactly like coloraide's machado filter, so
+lower severities model protanomaly, deuteranomaly and tritanomaly.
+Achromatopsia replaces every channel with the relative luminance; lower
+severities blend it with the identity (achromatomaly).
+
+All deficiencies are simulated in one batched matmul over the distinct
+colors of a batch, the results are re-encoded to 8-bit sRGB and the
+scores and flags of every selected metric are recomputed with
+contrast_metrics, so a simulated ratio is exactly what a re-check of the
+simulated hex colors would give.
+"""
+import numpy as np
+from coloraide.filters.cvd import MACHADO_DEUTAN, MACHADO_PROTAN, MACHADO_TRITAN
+
+import contrast_engine
+import contrast_metrics
+import oklab
+
+
+def _table(matrices):
+    return np.array([matrices[step] for step in range(11)], dtype=np.float64)
+
+
+# Every channel replaced by the WCAG relative luminance
+_ACHROMATOPSIA = np.array([[0.2126, 0.7152, 0.0722]] * 3)
+
+# (11, 3, 3) matrices per deficiency, index = severity * 10
+_TABLES = {
+    "protanopia": _table(MACHADO_PROTAN),
+    "deuteranopia": _table(MACHADO_DEUTAN),
+    "tritanopia": _table(MACHADO_TRITAN),
+    "achromatopsia": np.eye(3) + np.linspace(0.0, 1.0, 11)[:, None, None] * (_ACHROMATOPSIA - np.eye(3)),
+}
+
+DEFICIENCIES = tuple(_TABLES)
+
+# Linear values halfway between consecutive 8-bit sRGB codes: encoding is a binary search
+_ENCODE_THRESHOLDS = oklab.srgb_to_linear((np.arange(255) + 0.5) / 255.0)
+
+
+def resolve_deficiencies(value):
+    """Deficiency names from a tool argument: True/None (all), False (none) or a list of names"""
+    if value is None or value is True:
+        return DEFICIENCIES
+    if value is False:
+        return ()
+    if isinstance(value, str):
+        value = [value]
+    names = []
+    for name in value:
+        if name not in _TABLES:
+            raise ValueError(f"Unknown deficiency '{name}', expected one of {', '.join(DEFICIENCIES)}")
+        if name not in names:
+            names.append(name)
+    return tuple(names)
+
+
+def parse_deficiencies(text):
+    """Deficiency names from a query string / CLI value: 'all', 'none' or comma-separated names"""
+    text = (text or "").strip().lower()
+    if text in ("", "none", "false", "0"):
+        return ()
+    if text in ("all", "true", "1"):
+        return DEFICIENCIES
+    return resolve_deficiencies([name.strip() for name in text.split(",") if name.strip()])
+
+
+def resolve_severity(value):
+    """Severity in [0, 1] (1 = full dichromacy / achromatopsia)"""
+    severity = 1.0 if value is None else float(value)
+    if not 0.0 <= severity <= 1.0:
+        raise ValueError(f"Severity must be between 0 and 1, got {severity}")
+    return severity
+
+
+def simulation_matrices(deficiencies=DEFICIENCIES, severity=1.0):
+    """(d, 3, 3) linear RGB matrices, interpolated between the tabulated severities"""
+    step = severity * 10
+    low = min(int(step), 9)
+    weight = step - low
+    tables = np.array([_TABLES[name] for name in deficiencies], dtype=np.float64).reshape(-1, 11, 3, 3)
+    return (1.0 - weight) * tables[:, low] + weight * tables[:, low + 1]
+
+
+def simulate(rgb, deficiencies=DEFICIENCIES, severity=1.0):
+    """(d, ..., 3) uint8 sRGB of a (..., 3) uint8 array as seen with each deficiency"""
+    lin = contrast_engine.LINEAR_LUT[np.asarray(rgb, dtype=np.uint8)]
+    simulated = np.einsum("dij,...j->d...i", simulation_matrices(deficiencies, severity), lin)
+    # Same as rounding linear_to_srgb() * 255, without a pow per channel
+    return np.searchsorted(_ENCODE_THRESHOLDS, simulated, side="right").astype(np.uint8)
+
+
+def simulate_pairs(fg_rgb, bg_rgb, deficiencies=DEFICIENCIES, severity=1.0,
+                   metrics=contrast_metrics.DEFAULT_METRICS, thresholds=None):
+    """
+    Simulated colors, scores and flags of (n, 3) fg/bg uint8 arrays.
+
+    Every distinct color is simulated once. Returns a dict with `fg_rgb`
+    and `bg_rgb` of shape (d, n, 3), plus one (d, n) array per metric
+    score (`ratio`, `apca_lc`, ...) and per passes_* flag.
+    """
+    colors = np.concatenate([fg_rgb, bg_rgb]).reshape(-1, 3)
+    _, first, inverse = np.unique(contrast_engine.pack_rgb(colors), return_index=True, return_inverse=True)
+    simulated = simulate(colors[first], deficiencies, severity)[:, inverse.reshape(-1)]
+    n = len(fg_rgb)
+    sim_fg, sim_bg = simulated[:, :n], simulated[:, n:]
+    result = {"fg_rgb": sim_fg, "bg_rgb": sim_bg}
+    result.update(contrast_metrics.evaluate(sim_fg, sim_bg, metrics, thresholds))
+    return result
+
+
+def _hex_table(rgb):
+    """'#RRGGBB' strings of a (..., 3) uint8 array, formatted once per distinct color"""
+    packed = contrast_engine.pack_rgb(rgb)
+    unique, inverse = np.unique(packed, return_inverse=True)
+    names = np.array([f"#{value:06X}" for value in unique.tolist()], dtype=object)
+    return names[inverse.reshape(packed.shape)]
+
+
+def pair_results(fg_rgb, bg_rgb, deficiencies=DEFICIENCIES, severity=1.0,
+                 metrics=contrast_metrics.DEFAULT_METRICS, thresholds=None):
+    """Per-pair {deficiency: {foreground, background, ratio, passes_*}} dicts for (n, 3) arrays"""
+    n = len(fg_rgb)
+    if not deficiencies or n == 0:
+        return [{} for _ in range(n)]
+    sim = simulate_pairs(fg_rgb, bg_rgb, deficiencies, severity, metrics, thresholds)
+    fg_hex = _hex_table(sim["fg_rgb"]).tolist()
+    bg_hex = _hex_table(sim["bg_rgb"]).tolist()
+    columns = {key: np.round(sim[key], digits).tolist() for key, digits in contrast_metrics.score_keys(metrics).items()}
+    columns.update((key, sim[key].tolist()) for key in contrast_metrics.flag_names(metrics))
+    return [
+        {
+            name: {
+                "foreground": fg_hex[d][i],
+                "background": bg_hex[d][i],
+                **{key: values[d][i] for key, values in columns.items()}
+            }
+            for d, name in enumerate(deficiencies)
+        }
+        for i in range(n)
+    ]
+
+
+def count_failures(analyzed_pairs, deficiencies=DEFICIENCIES):
+    """{deficiency: pairs failing AA normal text} over analyzed pairs (None entries skipped)"""
+    return {
+        name: sum(1 for pair in analyzed_pairs if pair is not None and not pair["vision"][name]["passes_aa_normal"])
+        for name in deficiencies
+    }
+
+
+def summarize(analyzed_pairs, deficiencies=DEFICIENCIES, severity=1.0, failed_pairs=None):
+    """Result-level vision block: which deficiencies were simulated and how many pairs fail AA under each"""
+    return {
+        "deficiencies": list(deficiencies),
+        "severity": severity,
+        "failed_pairs": failed_pairs if failed_pairs is not None else count_failures(analyzed_pairs, deficiencies)
+    }
@@ -0,0 +1,354 @@
+"""
+Contrast audit of the text in an image (screenshot, mockup, web page).
+
+The image is decoded once into an (H, W, 3) array and Tesseract is run
+once over the whole image to get every word box. Colors are then
+estimated for all boxes at the same time instead of cropping each region:
+
+- a summed-area table of the image gives the mean color of the ring just
+  outside every box in O(1) per box (the background reference);
+- a fixed grid of samples inside every box is split by distance to that
+  reference: far samples are the glyphs (foreground), near ones the
+  background seen through the text. Per-channel medians of each group
+  make the estimate robust to anti-aliasing and to neighbours that leak
+  into the ring.
+
+The resulting pairs go through the same analysis as
+check_color_accessibility.
+
+Configuration (environment variables):
+  OCR_LANG            Tesseract languages (default "eng+spa", falls back to "eng")
+  IMAGE_MAX_BYTES     largest accepted encoded image (default 20 MB)
+  IMAGE_MAX_PIXELS    largest accepted decoded image (default 16.7 Mpx)
+  IMAGE_FETCH_TIMEOUT seconds to download image_url (default 10)
+
+image_url is only fetched from public addresses: the host is resolved,
+every address must be global unicast (no loopback, private, link-local,
+shared, reserved or multicast ranges), and the connection goes to that
+checked address, so DNS cannot change the answer in between. Redirects
+are followed by hand, each hop checked the same way.
+"""
+import base64
+import binascii
+import io
+import ipaddress
+import os
+import socket
+import time
+import warnings
+from urllib.parse import urljoin, urlsplit
+
+import numpy as np
+from PIL import Image
+
+from color_audit import analyze_pairs_with_errors
+
+try:
+    import pytesseract
+except ImportError:  # OCR is optional; the rest of the server works without it
+    pytesseract = None
+
+OCR_LANG = os.getenv("OCR_LANG", "eng+spa")
+MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(20 * 1024 * 1024)))
+# uint32 box sums stay exact while a box holds fewer than 2**32 / 255 pixels
+MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", str(2 ** 24)))
+FETCH_TIMEOUT = float(os.getenv("IMAGE_FETCH_TIMEOUT", "10"))
+MAX_REDIRECTS = 3
+_REDIRECTS = (301, 302, 303, 307, 308)
+
+# Samples per box (rows x columns) for the robust color estimate
+SAMPLE_ROWS = 12
+SAMPLE_COLS = 48
+
+
+def load_image_bytes(image_data=None, image_url=None):
+    """Encoded image bytes from base64 / data URL, or downloaded from an http(s) URL"""
+    if isinstance(image_data, dict):  # {"data": ...} as sent by some MCP clients
+        image_data = image_data.get("data")
+    if image_data:
+        if not isinstance(image_data, str):
+            raise ValueError("image_data must be a base64 string or data URL")
+        if image_data.startswith("data:"):
+            image_data = image_data.split(",", 1)[-1]
+        try:
+            data = base64.b64decode(image_data)
+        except (binascii.Error, ValueError) as e:
+            raise ValueError(f"Invalid base64 image data: {e}")
+    elif image_url:
+        if not isinstance(image_url, str) or not image_url.startswith(("http://", "https://")):
+            raise ValueError("image_url must be an http(s) URL")
+        data = fetch_image(image_url)
+    else:
+        raise ValueError("Either image_data or image_url is required")
+    if len(data) > MAX_BYTES:
+        raise ValueError(f"Image larger than {MAX_BYTES} bytes")
+    return data
+
+
+def is_public_address(address):
+    """True for a global unicast IP address (IPv4-mapped IPv6 judged as IPv4)"""
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if ip.version == 6 and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+def resolve_public(host, port):
+    """An address to connect to for host; ValueError unless every address it resolves to is public"""
+    try:
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError) as e:
+        raise ValueError(f"Could not resolve {host}: {e}")
+    addresses = [info[4][0] for info in infos]
+    if not addresses or not all(is_public_address(address) for address in addresses):
+        raise ValueError("image_url must point to a public address")
+    return addresses[0]
+
+
+def fetch_image(url):
+    """Download an image from a public http(s) URL, checking the address of every redirect hop"""
+    import certifi
+    import urllib3
+
+    for _ in range(MAX_REDIRECTS + 1):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError("image_url must be an http(s) URL")
+        try:
+            port = parts.port or (443 if parts.scheme == "https" else 80)
+        except ValueError as e:
+            raise ValueError(f"Invalid image_url: {e}")
+        address = resolve_public(parts.hostname, port)
+        # Connect to the checked address; TLS still verifies the URL's host name
+        if parts.scheme == "https":
+            pool = urllib3.HTTPSConnectionPool(
+                address, port, timeout=FETCH_TIMEOUT, retries=False, cert_reqs="CERT_REQUIRED",
+                ca_certs=certifi.where(), server_hostname=parts.hostname, assert_hostname=parts.hostname)
+        else:
+            pool = urllib3.HTTPConnectionPool(address, port, timeout=FETCH_TIMEOUT, retries=False)
+        target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        try:
+            response = pool.urlopen("GET", target, headers={"Host": parts.netloc.rsplit("@", 1)[-1]},
+                                    redirect=False, preload_content=False)
+            try:
+                location = response.headers.get("Location")
+                if response.status in _REDIRECTS and location:
+                    url = urljoin(url, location)
+                    continue
+                if response.status >= 400:
+                    raise ValueError(f"Could not download image: HTTP {response.status}")
+                return response.read(MAX_BYTES + 1, decode_content=True)
+            finally:
+                response.release_conn()
+        except urllib3.exceptions.HTTPError as e:
+            raise ValueError(f"Could not download image: {e}")
+        finally:
+            pool.close()
+    raise ValueError(f"Could not download image: more than {MAX_REDIRECTS} redirects")
+
+
+def open_image(data, max_pixels=MAX_PIXELS):
+    """Lazily opened PIL image (header read, pixels not decoded yet)"""
+    try:
+        with warnings.catch_warnings():
+            # The pixel limit is enforced here, not by Pillow's bomb warning
+            warnings.simplefilter("ignore", Image.DecompressionBombWarning)
+            image = Image.open(io.BytesIO(data))
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ValueError(f"Invalid image: {e}")
+    if image.width * image.height > max_pixels:
+        raise ValueError(f"Image larger than {max_pixels} pixels")
+    return image
+
+
+def to_rgb(image):
+    """RGB version of a PIL image, transparency composited over white"""
+    if image.mode in ("RGBA", "LA", "P", "PA"):
+        image = image.convert("RGBA")
+        image = Image.alpha_composite(Image.new("RGBA", image.size, "white"), image)
+    return image.convert("RGB")
+
+
+def decode_image(data):
+    """PIL RGB image (transparency composited over white) and its uint8 array"""
+    image = open_image(data)
+    try:
+        image = to_rgb(image)
+    except OSError as e:
+        raise ValueError(f"Invalid image: {e}")
+    return image, np.asarray(image)
+
+
+def ocr_words(image, min_confidence=60, lang=OCR_LANG):
+    """
+    Word texts, (n, 4) [x, y, w, h] boxes and confidences from a single
+    Tesseract pass over the whole image.
+    """
+    if pytesseract is None:
+        raise RuntimeError("OCR is not available: pytesseract is not installed")
+    try:
+        data = pytesseract.image_to_data(image, lang=lang, output_type=pytesseract.Output.DICT)
+    except pytesseract.TesseractNotFoundError:
+        raise RuntimeError("OCR is not available: the tesseract binary is not installed")
+    except pytesseract.TesseractError:
+        if lang == "eng":
+            raise
+        # Language data for e.g. Spanish may be missing on the host
+        data = pytesseract.image_to_data(image, lang="eng", output_type=pytesseract.Output.DICT)
+
+    texts = np.array([str(t).strip() for t in data["text"]], dtype=object)
+    confidences = np.asarray(data["conf"], dtype=float)
+    boxes = np.stack([np.asarray(data[k], dtype=np.int64)
+                      for k in ("left", "top", "width", "height")], axis=1).reshape(-1, 4)
+    keep = ((texts != "") & (confidences >= min_confidence)
+            & (boxes[:, 2] > 0) & (boxes[:, 3] > 0))
+    return texts[keep].tolist(), boxes[keep], confidences[keep]
+
+
+def summed_area_table(rgb):
+    """
+    (H+1, W+1, 3) integral image. uint32 arithmetic wraps, but box sums
+    computed from it are exact modulo 2**32, i.e. exact for boxes under
+    MAX_PIXELS pixels, at half the memory of int64.
+    """
+    h, w, _ = rgb.shape
+    table = np.zeros((h + 1, w + 1, 3), dtype=np.uint32)
+    table[1:, 1:] = rgb
+    # In-place accumulation avoids the temporaries of cumsum()
+    np.add.accumulate(table, axis=0, out=table)
+    np.add.accumulate(table, axis=1, out=table)
+    return table
+
+
+def _box_sums(table, x0, y0, x1, y1):
+    """Sum of each [x0, x1) x [y0, y1) box, (n, 3) int64"""
+    total = table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0]
+    return total.astype(np.int64)
+
+
+def _masked_median(samples, mask):
+    """Per-channel (lower) median of the masked samples of each box, NaN where none"""
+    values = np.where(mask[:, :, None], samples, np.nan)
+    values.sort(axis=1)  # NaNs sort last
+    count = mask.sum(axis=1)
+    median = values[np.arange(len(values)), np.maximum(count - 1, 0) // 2]
+    median[count == 0] = np.nan
+    return median
+
+
+def _sq_distance(samples, centers):
+    diff = samples - centers[:, None, :]
+    return np.einsum("nsc,nsc->ns", diff, diff)
+
+
+def estimate_box_colors(rgb, boxes, table=None, grid=(SAMPLE_ROWS, SAMPLE_COLS)):
+    """
+    Foreground and background RGB ((n, 3) uint8 each) for [x, y, w, h] text
+    boxes, from the ring around each box (summed-area table) and robust
+    statistics of a (rows, columns) sample grid inside it.
+    """
+    h, w, _ = rgb.shape
+    if table is None:
+        table = summed_area_table(rgb)
+    boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+    x0 = np.clip(boxes[:, 0], 0, w - 1)
+    y0 = np.clip(boxes[:, 1], 0, h - 1)
+    x1 = np.clip(boxes[:, 0] + boxes[:, 2], x0 + 1, w)
+    y1 = np.clip(boxes[:, 1] + boxes[:, 3], y0 + 1, h)
+
+    # Background reference: mean of a ring a quarter of the text height wide
+    pad = np.maximum(2, (y1 - y0) // 4)
+    ex0, ey0 = np.maximum(0, x0 - pad), np.maximum(0, y0 - pad)
+    ex1, ey1 = np.minimum(w, x1 + pad), np.minimum(h, y1 + pad)
+    inner = _box_sums(table, x0, y0, x1, y1)
+    outer = _box_sums(table, ex0, ey0, ex1, ey1)
+    inner_area = (x1 - x0) * (y1 - y0)
+    ring_area = (ex1 - ex0) * (ey1 - ey0) - inner_area
+    # A box covering the whole image has no ring: use its own mean
+    ring_mean = np.where(
+        (ring_area > 0)[:, None],
+        (outer - inner) / np.maximum(ring_area, 1)[:, None],
+        inner / inner_area[:, None],
+    ).astype(np.float32)
+
+    # Sample grid inside every box: (n, rows * columns, 3)
+    fy = (np.arange(grid[0]) + 0.5) / grid[0]
+    fx = (np.arange(grid[1]) + 0.5) / grid[1]
+    ys = (y0[:, None] + fy[None, :] * (y1 - y0)[:, None]).astype(np.int64)
+    xs = (x0[:, None] + fx[None, :] * (x1 - x0)[:, None]).astype(np.int64)
+    samples = rgb[ys[:, :, None], xs[:, None, :]].reshape(len(boxes), -1, 3).astype(np.float32)
+    rows = np.arange(len(boxes))
+
+    # Two-means split of every box at once, seeded with the sample closest
+    # to the ring color (background) and the sample farthest from that one
+    bg_center = samples[rows, _sq_distance(samples, ring_mean).argmin(axis=1)]
+    fg_center = samples[rows, _sq_distance(samples, bg_center).argmax(axis=1)]
+    for _ in range(4):
+        is_fg = _sq_distance(samples, fg_center) < _sq_distance(samples, bg_center)
+        fg_count = is_fg.sum(axis=1, keepdims=True)
+        bg_count = samples.shape[1] - fg_count
+        fg_sum = (samples * is_fg[:, :, None]).sum(axis=1)
+        bg_sum = samples.sum(axis=1) - fg_sum
+        fg_center = np.where(fg_count > 0, fg_sum / np.maximum(fg_count, 1), fg_center)
+        bg_center = np.where(bg_count > 0, bg_sum / np.maximum(bg_count, 1), bg_center)
+
+    # Text covers less of its box than its background: the larger cluster
+    # is the background even when the ring was a neighbouring surface
+    swap = is_fg.sum(axis=1) > samples.shape[1] / 2
+    is_fg ^= swap[:, None]
+    bg_center = np.where(swap[:, None], fg_center, bg_center)
+
+    # Glyph cores only: anti-aliased edges sit between the two colors
+    to_bg = np.where(is_fg, _sq_distance(samples, bg_center), 0)
+    core = is_fg & (to_bg >= 0.64 * to_bg.max(axis=1, keepdims=True))  # 80% of the distance
+    fg = _masked_median(samples, core)
+    bg = _masked_median(samples, ~is_fg)
+    bg = np.where(np.isnan(bg), ring_mean, bg)
+    fg = np.where(np.isnan(fg), bg, fg)
+
+    return (np.clip(np.rint(fg), 0, 255).astype(np.uint8),
+            np.clip(np.rint(bg), 0, 255).astype(np.uint8))
+
+
+def to_hex(rgb):
+    """'#RRGGBB' strings for an (n, 3) uint8 array"""
+    return [f"#{r:02X}{g:02X}{b:02X}" for r, g, b in np.asarray(rgb).tolist()]
+
+
+def audit_text_boxes(rgb, texts, boxes, confidences, target_ratio=4.5):
+    """Analyzed pairs (check_color_accessibility format plus bbox and OCR confidence)"""
+    fg, bg = estimate_box_colors(rgb, boxes)
+    pairs = [{"foreground": f, "background": b, "element": text}
+             for f, b, text in zip(to_hex(fg), to_hex(bg), texts)]
+    analyzed, _ = analyze_pairs_with_errors(pairs, target_ratio, verbose=False)
+    for pair, box, confidence in zip(analyzed, np.asarray(boxes).tolist(), np.asarray(confidences).tolist()):
+        pair["bbox"] = box
+        pair["ocr_confidence"] = round(confidence, 1)
+    return analyzed
+
+
+def analyze_image(image_data=None, image_url=None, target_ratio=4.5, min_confidence=60):
+    """Full image audit: decode, one OCR pass, vectorized colors, contrast analysis"""
+    timings = {}
+    start = time.perf_counter()
+    image, rgb = decode_image(load_image_bytes(image_data, image_url))
+    timings["decode"] = time.perf_counter() - start
+
+    tick = time.perf_counter()
+    texts, boxes, confidences = ocr_words(image, min_confidence)
+    timings["ocr"] = time.perf_counter() - tick
+
+    tick = time.perf_counter()
+    analyzed = audit_text_boxes(rgb, texts, boxes, confidences, target_ratio) if texts else []
+    timings["analysis"] = time.perf_counter() - tick
+
+    passed = sum(1 for p in analyzed if p["passes_aa_normal"])
+    return {
+        "total_pairs": len(analyzed),
+        "passed_pairs": passed,
+        "failed_pairs": len(analyzed) - passed,
+        "target_ratio": target_ratio,
+        "image": {"width": rgb.shape[1], "height": rgb.shape[0], "words": len(texts)},
+        "timings_ms": {stage: round(seconds * 1000, 1) for stage, seconds in timings.items()},
+        "color_pairs": analyzed,
+    }
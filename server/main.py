@@ -1,13 +1,42 @@
 from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
 import json
+import logging
 import os
+import time
 from pathlib import Path
 
+import bulk_audit
+import color_cache
+import color_parser
+import compact_format
+import contrast_heatmap
+import contrast_metrics
+import contrast_solver
+import cvd_simulation
+import gamut_lut
+import image_audit
+import palette_extract
+import result_cache
+import static_responses
+import structured_log
+import telemetry
+import timing
+import worker_pool
+from color_audit import (
+    analyze_color_chunk,
+    normalize_pairs,
+    find_compliant_colors,
+    analyze_palette,
+)
+
 app = FastAPI(title="Color Accessibility Checker MCP Server")
 
+log = structured_log.get_logger("mcp")
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -20,6 +49,13 @@ app.add_middleware(
 # Get base URL from environment or default
 BASE_URL = os.getenv("BASE_URL", "http://localhost:8000")
 
+# JSON-RPC batches: maximum messages per batch and tools/call run at once per batch
+MAX_BATCH_SIZE = int(os.getenv("MCP_MAX_BATCH_SIZE", "50"))
+BATCH_TOOL_CONCURRENCY = max(1, int(os.getenv("MCP_BATCH_TOOL_CONCURRENCY", str(max(1, worker_pool.POOL_SIZE)))))
+
+# Dynamic responses at least this large are compressed when the client accepts it
+COMPRESS_MIN_BYTES = int(os.getenv("MCP_COMPRESS_MIN_BYTES", "4096"))
+
 # Serve static files from dist directory if they exist
 dist_path = Path(__file__).parent.parent / "web" / "dist"
 assets_path = dist_path / "assets"
@@ -27,166 +63,18 @@ assets_path = dist_path / "assets"
 if assets_path.exists():
     app.mount("/assets", StaticFiles(directory=str(assets_path)), name="assets")
 
-# ============================================================================
-# COLOR ACCESSIBILITY FUNCTIONS
-# ============================================================================
+# Load (or build) the OKLCH gamut table once at startup
+gamut_lut.load()
 
-def calculate_luminance(r, g, b):
-    """Calculate relative luminance according to WCAG"""
-    def normalize(c):
-        c = c / 255.0
-        return c / 12.92 if c <= 0.03928 else ((c + 0.055) / 1.055) ** 2.4
-    return 0.2126 * normalize(r) + 0.7152 * normalize(g) + 0.0722 * normalize(b)
-
-def calculate_contrast_ratio(rgb1, rgb2):
-    """Calculate contrast ratio between two RGB colors"""
-    l1 = calculate_luminance(rgb1[0], rgb1[1], rgb1[2])
-    l2 = calculate_luminance(rgb2[0], rgb2[1], rgb2[2])
-    lighter = max(l1, l2)
-    darker = min(l1, l2)
-    return (lighter + 0.05) / (darker + 0.05)
-
-def hex_to_rgb(hex_color):
-    """Convert hex color to RGB tuple"""
-    hex_color = hex_color.lstrip('#')
-    # Handle 3-digit hex
-    if len(hex_color) == 3:
-        hex_color = ''.join([c*2 for c in hex_color])
-    return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-
-def evaluate_wcag(ratio):
-    """Evaluate WCAG compliance for a contrast ratio"""
-    return {
-        "passes_aa_normal": ratio >= 4.5,
-        "passes_aa_large": ratio >= 3.0,
-        "passes_aaa_normal": ratio >= 7.0,
-        "passes_aaa_large": ratio >= 4.5
-    }
+@app.on_event("startup")
+async def start_worker_pool():
+    worker_pool.warm_up()
+    telemetry.start_lag_monitor()
 
-def generate_oklch_suggestions(bg_hex, fg_hex, target_ratio=4.5):
-    """Generate OKLCH color suggestions to improve contrast"""
-    suggestions = []
-    
-    # Normalize hex colors
-    bg_hex = bg_hex.strip().upper()
-    fg_hex = fg_hex.strip().upper()
-    if not bg_hex.startswith('#'):
-        bg_hex = '#' + bg_hex
-    if not fg_hex.startswith('#'):
-        fg_hex = '#' + fg_hex
-    
-    try:
-        from coloraide import Color
-        
-        print(f"    📐 Converting colors to OKLCH: bg={bg_hex}, fg={fg_hex}")
-        bg_color = Color(bg_hex)
-        fg_color = Color(fg_hex)
-        
-        bg_oklch = bg_color.convert('oklch')
-        fg_oklch = fg_color.convert('oklch')
-        
-        # Get lightness values using coords() - returns (L, C, H)
-        bg_coords = bg_oklch.coords()
-        fg_coords = fg_oklch.coords()
-        bg_lightness = bg_coords[0]
-        fg_lightness = fg_coords[0]
-        
-        print(f"    ✅ OKLCH conversion successful (bg L={bg_lightness:.2f}, fg L={fg_lightness:.2f})")
-        
-        # Option 1: Lighten background (if background is dark)
-        if bg_lightness < 0.7:  # Only if background is relatively dark
-            for delta in [0.15, 0.25, 0.35, 0.45, 0.55]:
-                try:
-                    new_bg_oklch = bg_oklch.clone()
-                    new_lightness = min(0.95, bg_lightness + delta)
-                    new_bg_oklch.set('lightness', new_lightness)
-                    new_bg_hex = new_bg_oklch.convert('srgb').to_string(hex=True, fit=True)
-                    new_bg_rgb = hex_to_rgb(new_bg_hex)
-                    fg_rgb = hex_to_rgb(fg_hex)
-                    
-                    ratio = calculate_contrast_ratio(new_bg_rgb, fg_rgb)
-                    if ratio >= target_ratio:
-                        suggestion = {
-                            "type": "lighten_bg",
-                            "background_oklch": new_bg_oklch.to_string(),
-                            "foreground_oklch": fg_oklch.to_string(),
-                            "new_contrast_ratio": round(ratio, 1),
-                            "preview_hex_bg": new_bg_hex,
-                            "preview_hex_fg": fg_hex
-                        }
-                        suggestions.append(suggestion)
-                        print(f"    ✅ Found lighten_bg suggestion: {new_bg_hex} → {ratio:.2f}:1")
-                        break
-                except Exception as e:
-                    print(f"    ⚠️ Error in lighten_bg delta {delta}: {e}")
-                    continue
-        
-        # Option 2: Darken background (if background is light)
-        if bg_lightness > 0.3:  # Only if background is relatively light
-            for delta in [-0.15, -0.25, -0.35, -0.45, -0.55]:
-                try:
-                    new_bg_oklch = bg_oklch.clone()
-                    new_lightness = max(0.05, bg_lightness + delta)
-                    new_bg_oklch.set('lightness', new_lightness)
-                    new_bg_hex = new_bg_oklch.convert('srgb').to_string(hex=True, fit=True)
-                    new_bg_rgb = hex_to_rgb(new_bg_hex)
-                    fg_rgb = hex_to_rgb(fg_hex)
-                    
-                    ratio = calculate_contrast_ratio(new_bg_rgb, fg_rgb)
-                    if ratio >= target_ratio:
-                        suggestion = {
-                            "type": "darken_bg",
-                            "background_oklch": new_bg_oklch.to_string(),
-                            "foreground_oklch": fg_oklch.to_string(),
-                            "new_contrast_ratio": round(ratio, 1),
-                            "preview_hex_bg": new_bg_hex,
-                            "preview_hex_fg": fg_hex
-                        }
-                        suggestions.append(suggestion)
-                        print(f"    ✅ Found darken_bg suggestion: {new_bg_hex} → {ratio:.2f}:1")
-                        break
-                except Exception as e:
-                    print(f"    ⚠️ Error in darken_bg delta {delta}: {e}")
-                    continue
-        
-        # Option 3: Adjust foreground (make it more contrasting)
-        # If foreground is light, make it darker; if dark, make it lighter
-        fg_delta = -0.4 if fg_lightness > 0.5 else 0.4
-        try:
-            new_fg_oklch = fg_oklch.clone()
-            new_lightness = max(0.05, min(0.95, fg_lightness + fg_delta))
-            new_fg_oklch.set('lightness', new_lightness)
-            new_fg_hex = new_fg_oklch.convert('srgb').to_string(hex=True, fit=True)
-            new_fg_rgb = hex_to_rgb(new_fg_hex)
-            bg_rgb = hex_to_rgb(bg_hex)
-            
-            ratio = calculate_contrast_ratio(bg_rgb, new_fg_rgb)
-            if ratio >= target_ratio:
-                suggestion = {
-                    "type": "adjust_fg",
-                    "background_oklch": bg_oklch.to_string(),
-                    "foreground_oklch": new_fg_oklch.to_string(),
-                    "new_contrast_ratio": round(ratio, 1),
-                    "preview_hex_bg": bg_hex,
-                    "preview_hex_fg": new_fg_hex
-                }
-                suggestions.append(suggestion)
-                print(f"    ✅ Found adjust_fg suggestion: {new_fg_hex} → {ratio:.2f}:1")
-        except Exception as e:
-            print(f"    ⚠️ Error in adjust_fg: {e}")
-    
-    except ImportError as e:
-        print(f"❌ ERROR: coloraide not installed or import failed: {e}")
-        print(f"   Install with: pip install coloraide")
-    except Exception as e:
-        print(f"⚠️ Error generating OKLCH suggestions: {e}")
-        import traceback
-        traceback.print_exc()
-    
-    if len(suggestions) == 0:
-        print(f"    ⚠️ No suggestions found - may need more aggressive adjustments")
-    
-    return suggestions
+@app.on_event("shutdown")
+async def shutdown_worker_pool():
+    telemetry.stop_lag_monitor()
+    worker_pool.shutdown()
 
 # ============================================================================
 # WIDGET HTML TEMPLATE (similar to gastos example)
@@ -231,6 +119,8 @@ WIDGET_HTML = """
     .suggestion { display: inline-flex; align-items: center; gap: 6px; background: #f0fff0; border: 1px solid #34C759; border-radius: 6px; padding: 6px 10px; margin-right: 8px; margin-bottom: 8px; }
     .suggestion-preview { width: 24px; height: 24px; border-radius: 4px; font-size: 10px; display: flex; align-items: center; justify-content: center; }
     .suggestion-info { font-size: 11px; }
+    .vision-item { display: inline-flex; align-items: center; gap: 6px; background: #f8f8f8; border: 1px solid #e5e5e5; border-radius: 6px; padding: 6px 10px; margin-right: 8px; margin-bottom: 8px; }
+    .vision-item.fail { background: #fff5f5; border-color: #FF3B30; }
     .empty { text-align: center; padding: 40px; color: #86868b; }
   </style>
 </head>
@@ -259,7 +149,64 @@ WIDGET_HTML = """
   </div>
 
   <script>
+    // Rebuild the default result structure from the compact-v1 columnar format
+    function expandCompact(data) {
+      const p = data.pairs;
+      const s = data.suggestions;
+      // Score columns of other metrics (apca_lc, ...) sit next to ratio
+      const scoreKeys = Object.keys(p).filter(key => !['text_sample', 'foreground', 'background', 'foreground_hex', 'background_hex', 'ratio', 'flags', 'vision'].includes(key));
+      const newScoreKeys = Object.keys(s).filter(key => !['pair', 'type', 'background', 'foreground', 'background_oklch', 'foreground_oklch', 'ratio', 'delta_e'].includes(key));
+      const pairs = p.foreground.map((fg, i) => {
+        const pair = {
+          text_sample: p.text_sample[i],
+          foreground: data.colors[fg],
+          background: data.colors[p.background[i]]
+        };
+        if (p.foreground_hex && p.foreground_hex[i] !== null) {
+          pair.foreground_hex = data.colors[p.foreground_hex[i]];
+          pair.background_hex = data.colors[p.background_hex[i]];
+        }
+        pair.ratio = p.ratio[i];
+        scoreKeys.forEach(key => { pair[key] = p[key][i]; });
+        data.flag_bits.forEach((name, bit) => {
+          pair['passes_' + name] = ((p.flags[i] >> bit) & 1) === 1;
+        });
+        pair.suggestions = [];
+        if (p.vision) {
+          pair.vision = {};
+          Object.entries(p.vision).forEach(([name, v]) => {
+            const simulated = { foreground: data.colors[v.foreground[i]], background: data.colors[v.background[i]], ratio: v.ratio[i] };
+            scoreKeys.forEach(key => { simulated[key] = v[key][i]; });
+            data.flag_bits.forEach((flag, bit) => {
+              simulated['passes_' + flag] = ((v.flags[i] >> bit) & 1) === 1;
+            });
+            pair.vision[name] = simulated;
+          });
+        }
+        return pair;
+      });
+      s.pair.forEach((i, k) => {
+        const suggestion = {
+          type: data.suggestion_types[s.type[k]],
+          background_oklch: data.oklch[s.background_oklch[k]],
+          foreground_oklch: data.oklch[s.foreground_oklch[k]],
+          new_contrast_ratio: s.ratio[k],
+          preview_hex_bg: data.colors[s.background[k]],
+          preview_hex_fg: data.colors[s.foreground[k]],
+          delta_e: s.delta_e[k]
+        };
+        newScoreKeys.forEach(key => { suggestion['new_' + key] = s[key][k]; });
+        pairs[i].suggestions.push(suggestion);
+      });
+      const expanded = { ...data, color_pairs: pairs };
+      ['format', 'flag_bits', 'suggestion_types', 'colors', 'oklch', 'pairs', 'suggestions'].forEach(key => delete expanded[key]);
+      return expanded;
+    }
+    
     function render(data) {
+      if (data && data.format === 'compact-v1') {
+        data = expandCompact(data);
+      }
       if (!data || !data.color_pairs) {
         document.getElementById('results').innerHTML = '<div class="empty">No color pairs to analyze</div>';
         return;
@@ -277,7 +224,18 @@ WIDGET_HTML = """
             ${pair.suggestions.map(s => `
               <div class="suggestion">
                 <div class="suggestion-preview" style="background:${s.preview_hex_bg};color:${s.preview_hex_fg}">Aa</div>
-                <div class="suggestion-info">${s.type.replace('_', ' ')} → ${s.new_contrast_ratio}:1</div>
+                <div class="suggestion-info">${s.type.replace('_', ' ')} → ${s.new_contrast_ratio}:1${s.new_apca_lc !== undefined ? ` · Lc ${s.new_apca_lc}` : ''}</div>
+              </div>
+            `).join('')}
+          </div>
+        ` : '';
+        const visionHtml = pair.vision && Object.keys(pair.vision).length > 0 ? `
+          <div class="suggestions">
+            <div class="suggestions-title">👁️ Vision Simulation:</div>
+            ${Object.entries(pair.vision).map(([name, v]) => `
+              <div class="vision-item ${v.passes_aa_normal ? '' : 'fail'}">
+                <div class="suggestion-preview" style="background:${v.background};color:${v.foreground}">Aa</div>
+                <div class="suggestion-info">${name} → ${v.ratio}:1 ${v.passes_aa_normal ? '✓' : '✗'}</div>
               </div>
             `).join('')}
           </div>
@@ -290,7 +248,7 @@ WIDGET_HTML = """
               <span class="pair-ratio ${isPass ? 'pass' : 'fail'}">${pair.ratio}:1 ${isPass ? '✅' : '❌'}</span>
             </div>
             <div class="preview">
-              <div class="preview-box" style="background:${pair.background};color:${pair.foreground}">Aa</div>
+              <div class="preview-box" style="background:${pair.background_hex || pair.background};color:${pair.foreground_hex || pair.foreground}">Aa</div>
               <div class="color-info">
                 <div><small>Text:</small> <span class="color-hex">${pair.foreground}</span></div>
                 <div><small>Background:</small> <span class="color-hex">${pair.background}</span></div>
@@ -301,8 +259,10 @@ WIDGET_HTML = """
               <span class="wcag-badge ${pair.passes_aa_large ? 'pass' : 'fail'}">AA Large ${pair.passes_aa_large ? '✓' : '✗'}</span>
               <span class="wcag-badge ${pair.passes_aaa_normal ? 'pass' : 'fail'}">AAA Normal ${pair.passes_aaa_normal ? '✓' : '✗'}</span>
               <span class="wcag-badge ${pair.passes_aaa_large ? 'pass' : 'fail'}">AAA Large ${pair.passes_aaa_large ? '✓' : '✗'}</span>
+              ${pair.apca_lc !== undefined ? `<span class="wcag-badge ${pair.passes_apca_body ? 'pass' : 'fail'}">APCA Lc ${pair.apca_lc} ${pair.passes_apca_body ? '✓' : '✗'}</span>` : ''}
             </div>
             ${suggestionsHtml}
+            ${visionHtml}
           </div>
         `;
       }).join('');
@@ -327,19 +287,8 @@ WIDGET_HTML = """
 </html>
 """
 
-# ============================================================================
-# ROUTES
-# ============================================================================
-
-@app.get("/")
-async def root():
-    return {"message": "Color Accessibility Checker MCP Server", "status": "running"}
-
-@app.get("/widget")
-async def widget():
-    """Serve the widget HTML with static demo data for preview"""
-    # Complete HTML with embedded demo data - no external file dependencies
-    html_content = """<!DOCTYPE html>
+# Demo page served at /widget (complete HTML with embedded demo data - no external file dependencies)
+WIDGET_DEMO_HTML = """<!DOCTYPE html>
 <html lang="es">
 <head>
   <meta charset="UTF-8">
@@ -387,6 +336,12 @@ async def widget():
     .wcag-badge { padding: 4px 8px; border-radius: 4px; font-size: 11px; font-weight: 600; }
     .wcag-badge.pass { background: #d1f4e0; color: #0f6537; }
     .wcag-badge.fail { background: #ffe5e5; color: #c41e3a; }
+    .vision-grid { display: grid; grid-template-columns: repeat(4, 1fr); gap: 12px; }
+    .vision-item { text-align: center; }
+    .vision-preview { height: 60px; border-radius: 8px; display: flex; align-items: center; justify-content: center; font-size: 24px; font-weight: 600; margin-bottom: 8px; border: 1px solid rgba(0,0,0,0.1); }
+    .vision-name { font-size: 11px; color: #86868b; text-transform: uppercase; font-weight: 600; margin-bottom: 4px; }
+    .vision-ratio { font-size: 13px; font-weight: 600; color: #34C759; }
+    .vision-ratio.fail { color: #FF3B30; }
   </style>
 </head>
 <body>
@@ -416,12 +371,7 @@ async def widget():
       <button class="tab" onclick="showTab('vision', event)">Vision</button>
     </div>
     <div id="colors-content" class="color-pairs-list"></div>
-    <div id="vision-content" style="display: none;">
-      <div style="text-align: center; padding: 60px 20px; color: #86868b;">
-        <div style="font-size: 48px; margin-bottom: 16px;">👁️</div>
-        <p>Vision simulation coming soon...</p>
-      </div>
-    </div>
+    <div id="vision-content" class="color-pairs-list" style="display: none;"></div>
   </div>
   <script>
     const sampleData = {
@@ -430,12 +380,24 @@ async def widget():
         {
           id: "pair-0", text: "Título Principal", background: "#FFFFFF", foreground: "#333333",
           contrast_ratio: 12.63, wcag_aa: { normal_text: true, large_text: true },
-          wcag_aaa: { normal_text: true, large_text: true }, status: "pass", suggestions: []
+          wcag_aaa: { normal_text: true, large_text: true }, status: "pass", suggestions: [],
+          vision: {
+            protanopia: { foreground: "#333333", background: "#FFFFFF", ratio: 12.63, passes_aa_normal: true, passes_aa_large: true },
+            deuteranopia: { foreground: "#333333", background: "#FFFFFF", ratio: 12.63, passes_aa_normal: true, passes_aa_large: true },
+            tritanopia: { foreground: "#333333", background: "#FFFFFF", ratio: 12.63, passes_aa_normal: true, passes_aa_large: true },
+            achromatopsia: { foreground: "#333333", background: "#FFFFFF", ratio: 12.63, passes_aa_normal: true, passes_aa_large: true }
+          }
         },
         {
           id: "pair-1", text: "Botón de Acción", background: "#0066CC", foreground: "#FFFFFF",
           contrast_ratio: 7.12, wcag_aa: { normal_text: true, large_text: true },
-          wcag_aaa: { normal_text: true, large_text: true }, status: "pass", suggestions: []
+          wcag_aaa: { normal_text: true, large_text: true }, status: "pass", suggestions: [],
+          vision: {
+            protanopia: { foreground: "#FFFFFF", background: "#2271D0", ratio: 4.84, passes_aa_normal: true, passes_aa_large: true },
+            deuteranopia: { foreground: "#FFFFFF", background: "#0060CA", ratio: 5.96, passes_aa_normal: true, passes_aa_large: true },
+            tritanopia: { foreground: "#FFFFFF", background: "#007F8F", ratio: 4.74, passes_aa_normal: true, passes_aa_large: true },
+            achromatopsia: { foreground: "#FFFFFF", background: "#686868", ratio: 5.57, passes_aa_normal: true, passes_aa_large: true }
+          }
         },
         {
           id: "pair-2", text: "Texto Secundario", background: "#F5F5F5", foreground: "#999999",
@@ -450,7 +412,13 @@ async def widget():
               type: "adjust_fg", background_oklch: "oklch(0.93 0.01 264)", foreground_oklch: "oklch(0.35 0.01 264)",
               new_contrast_ratio: 7.8, preview_hex_bg: "#F5F5F5", preview_hex_fg: "#4A4A4A"
             }
-          ]
+          ],
+          vision: {
+            protanopia: { foreground: "#999999", background: "#F5F5F5", ratio: 2.61, passes_aa_normal: false, passes_aa_large: false },
+            deuteranopia: { foreground: "#999999", background: "#F5F5F5", ratio: 2.61, passes_aa_normal: false, passes_aa_large: false },
+            tritanopia: { foreground: "#999999", background: "#F5F5F5", ratio: 2.61, passes_aa_normal: false, passes_aa_large: false },
+            achromatopsia: { foreground: "#999999", background: "#F5F5F5", ratio: 2.61, passes_aa_normal: false, passes_aa_large: false }
+          }
         },
         {
           id: "pair-3", text: "Enlace de Navegación", background: "#E8E8E8", foreground: "#0066CC",
@@ -461,7 +429,13 @@ async def widget():
               type: "darken_bg", background_oklch: "oklch(0.65 0.01 264)", foreground_oklch: "oklch(0.45 0.15 264)",
               new_contrast_ratio: 5.2, preview_hex_bg: "#B0B0B0", preview_hex_fg: "#0066CC"
             }
-          ]
+          ],
+          vision: {
+            protanopia: { foreground: "#2271D0", background: "#E8E8E8", ratio: 3.95, passes_aa_normal: false, passes_aa_large: true },
+            deuteranopia: { foreground: "#0060CA", background: "#E8E8E8", ratio: 4.86, passes_aa_normal: true, passes_aa_large: true },
+            tritanopia: { foreground: "#007F8F", background: "#E8E8E8", ratio: 3.87, passes_aa_normal: false, passes_aa_large: true },
+            achromatopsia: { foreground: "#686868", background: "#E8E8E8", ratio: 4.55, passes_aa_normal: true, passes_aa_large: true }
+          }
         }
       ]
     };
@@ -478,7 +452,7 @@ async def widget():
         });
       }
       document.getElementById('colors-content').style.display = tabName === 'colors' ? 'flex' : 'none';
-      document.getElementById('vision-content').style.display = tabName === 'vision' ? 'block' : 'none';
+      document.getElementById('vision-content').style.display = tabName === 'vision' ? 'flex' : 'none';
     }
     function getWCAGBadge(level, passes) {
       return `<span class="wcag-badge ${passes ? 'pass' : 'fail'}">${level}: ${passes ? '✓' : '✗'}</span>`;
@@ -535,199 +509,745 @@ async def widget():
         </div>
       `;
     }
+    function renderVisionPair(pair) {
+      const visionLabels = { protanopia: 'Protanopia', deuteranopia: 'Deuteranopia', tritanopia: 'Tritanopia', achromatopsia: 'Achromatopsia' };
+      return `
+        <div class="color-pair-card">
+          <div class="pair-header">"${pair.text}" · Original ${pair.contrast_ratio}:1</div>
+          <div class="vision-grid">
+            ${Object.entries(pair.vision).map(([name, sim]) => `
+              <div class="vision-item">
+                <div class="vision-preview" style="background: ${sim.background}; color: ${sim.foreground};">Aa</div>
+                <div class="vision-name">${visionLabels[name] || name}</div>
+                <div class="vision-ratio ${sim.passes_aa_normal ? '' : 'fail'}">${sim.ratio}:1 ${sim.passes_aa_normal ? '✓' : '✗'}</div>
+              </div>
+            `).join('')}
+          </div>
+        </div>
+      `;
+    }
     function renderResults(data) {
       document.getElementById('passing-count').textContent = data.summary.passing_pairs;
       document.getElementById('failing-count').textContent = data.summary.failing_pairs;
       document.getElementById('texts-count').textContent = data.summary.detected_texts;
       document.getElementById('colors-content').innerHTML = data.color_pairs.map(pair => renderColorPair(pair)).join('');
+      document.getElementById('vision-content').innerHTML = data.color_pairs.filter(pair => pair.vision).map(pair => renderVisionPair(pair)).join('');
     }
     renderResults(sampleData);
   </script>
 </body>
 </html>"""
-    return HTMLResponse(content=html_content)
+
+# ============================================================================
+# STATIC MCP RESULTS (serialized and compressed once, see static_responses.py)
+# ============================================================================
+
+WIDGET_URI = "ui://widget/color-accessibility.html"
+
+INITIALIZE_RESULT = {
+    "protocolVersion": "2024-11-05",
+    "capabilities": {
+        "tools": {},
+        "resources": {}
+    },
+    "serverInfo": {
+        "name": "color-accessibility-checker",
+        "version": "1.0.0"
+    }
+}
+
+RESOURCES_LIST_RESULT = {
+    "resources": [
+        {
+            "uri": WIDGET_URI,
+            "name": "Color Accessibility Widget",
+            "description": "Widget for displaying color accessibility analysis results",
+            "mimeType": "text/html+skybridge"
+        }
+    ]
+}
+
+WIDGET_RESOURCE_RESULT = {
+    "contents": [
+        {
+            "uri": WIDGET_URI,
+            "mimeType": "text/html+skybridge",
+            "text": WIDGET_HTML
+        }
+    ]
+}
+
+RESOURCE_RESULTS = {WIDGET_URI: WIDGET_RESOURCE_RESULT}
+
+TOOLS_LIST_RESULT = {
+    "tools": [
+        {
+            "name": "check_color_accessibility",
+            "description": "Analizar la accesibilidad de colores según WCAG. Cuando el usuario suba una imagen (captura de pantalla, diseño, web), mira la imagen y extrae todos los pares de colores de texto/fondo que veas. Luego llama a esta herramienta con los colores en formato hexadecimal.",
+            "inputSchema": {
+                "type": "object",
+                "properties": {
+                    "color_pairs": {
+                        "type": "array",
+                        "description": "Array de pares de colores extraídos de la imagen",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "foreground": {
+                                    "type": "string",
+                                    "description": "Color del texto: hexadecimal (#RGB, #RRGGBB, #RRGGBBAA), rgb(), hsl(), oklch(), nombre CSS u otra sintaxis CSS"
+                                },
+                                "background": {
+                                    "type": "string",
+                                    "description": "Color del fondo, en las mismas sintaxis que foreground (la transparencia se compone sobre blanco)"
+                                },
+                                "element": {
+                                    "type": "string",
+                                    "description": "Descripción del elemento (ej: 'título principal', 'botón', 'enlace de navegación')"
+                                }
+                            },
+                            "required": ["foreground", "background"]
+                        }
+                    },
+                    "target": {
+                        "type": ["string", "number"],
+                        "description": "Contraste objetivo para las sugerencias, en la métrica de target_metric. WCAG 2: 'AA' (4.5, por defecto), 'AAA' (7), 'AA_LARGE' (3), 'AAA_LARGE' (4.5) o un ratio numérico. APCA: 'BODY' (Lc 75, por defecto), 'CONTENT' (60), 'LARGE' (45), 'SPOT' (30) o un valor Lc"
+                    },
+                    "metrics": {
+                        "type": "array",
+                        "items": {"type": "string", "enum": list(contrast_metrics.METRICS)},
+                        "description": "Métricas de contraste a calcular en la misma pasada: 'wcag2' (siempre incluida) y 'apca' (Lc de APCA con banderas passes_apca_body/content/large/spot)"
+                    },
+                    "target_metric": {
+                        "type": "string",
+                        "enum": list(contrast_metrics.METRICS),
+                        "description": "Métrica que deben alcanzar las sugerencias: 'wcag2' (por defecto) o 'apca' (|Lc|)"
+                    },
+                    "thresholds": {
+                        "type": "object",
+                        "additionalProperties": {"type": "number"},
+                        "description": "Umbrales propios por bandera, p. ej. {\"aa_normal\": 5, \"apca_body\": 90}"
+                    },
+                    "format": {
+                        "type": "string",
+                        "enum": ["full", "compact"],
+                        "description": "Formato del resultado: 'full' (por defecto) o 'compact' (columnar, recomendado para auditorías grandes)"
+                    },
+                    "vision": {
+                        "anyOf": [
+                            {"type": "boolean"},
+                            {
+                                "type": "array",
+                                "items": {"type": "string", "enum": list(cvd_simulation.DEFICIENCIES)}
+                            }
+                        ],
+                        "description": "Simular deficiencias de visión del color y reevaluar cada par: true (por defecto, todas), false (ninguna) o una lista de 'protanopia', 'deuteranopia', 'tritanopia', 'achromatopsia'"
+                    },
+                    "vision_severity": {
+                        "type": "number",
+                        "minimum": 0,
+                        "maximum": 1,
+                        "description": "Severidad de la deficiencia simulada, de 0 a 1 (por defecto 1: dicromacia completa; valores menores simulan tricromacia anómala)"
+                    }
+                },
+                "required": ["color_pairs"]
+            },
+            "_meta": {
+                "openai/outputTemplate": "ui://widget/color-accessibility.html",
+                "openai/widgetAccessible": True,
+                "openai/toolInvocation/invoking": "Analizando accesibilidad de colores...",
+                "openai/toolInvocation/invoked": "Análisis completado."
+            }
+        },
+        {
+            "name": "find_compliant_colors",
+            "description": "Buscar los colores más cercanos (distancia OKLab) a un color dado que alcanzan el contraste objetivo sobre otro color. Útil para preguntas como 'el color más parecido a X que cumpla 4.5:1 sobre Y'.",
+            "inputSchema": {
+                "type": "object",
+                "properties": {
+                    "foreground": {
+                        "type": "string",
+                        "description": "Color del texto, en las mismas sintaxis que check_color_accessibility (hexadecimal, rgb(), hsl(), oklch(), nombre CSS...)"
+                    },
+                    "background": {
+                        "type": "string",
+                        "description": "Color del fondo, en las mismas sintaxis que foreground (la transparencia se compone sobre blanco)"
+                    },
+                    "adjust": {
+                        "type": "string",
+                        "enum": ["foreground", "background"],
+                        "description": "Color que se puede cambiar (por defecto el del texto)"
+                    },
+                    "target": {
+                        "type": ["string", "number"],
+                        "description": "Contraste objetivo: 'AA' (4.5, por defecto), 'AAA' (7), 'AA_LARGE' (3), 'AAA_LARGE' (4.5) o un ratio numérico"
+                    },
+                    "count": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "maximum": 20,
+                        "description": "Número de colores a devolver (por defecto 5)"
+                    }
+                },
+                "required": ["foreground", "background"]
+            }
+        },
+        {
+            "name": "check_palette_contrast",
+            "description": "Calcular la matriz de contraste completa (N×N) de una paleta de colores y devolver, para cada color, los colores de la paleta con los que cumple WCAG AA/AAA en texto normal y grande.",
+            "inputSchema": {
+                "type": "object",
+                "properties": {
+                    "palette": {
+                        "type": "array",
+                        "description": "Colores de la paleta en cualquier sintaxis CSS (hexadecimal, rgb(), hsl(), oklch(), nombre...) u objetos {color, name}; la transparencia se compone sobre blanco",
+                        "items": {
+                            "anyOf": [
+                                {"type": "string"},
+                                {
+                                    "type": "object",
+                                    "properties": {
+                                        "color": {"type": "string"},
+                                        "name": {"type": "string"}
+                                    },
+                                    "required": ["color"]
+                                }
+                            ]
+                        }
+                    },
+                    "include_matrix": {
+                        "type": "boolean",
+                        "description": "Incluir la matriz completa de ratios (por defecto false)"
+                    }
+                },
+                "required": ["palette"]
+            }
+        },
+        {
+            "name": "check_image_accessibility",
+            "description": "Analizar el contraste de todo el texto de una imagen (captura de pantalla, diseño, web) con OCR en el servidor: detecta cada palabra, estima sus colores de texto y fondo y evalúa WCAG. Usar cuando se dispone de la imagen como URL o base64 en lugar de extraer los colores a ojo.",
+            "inputSchema": {
+                "type": "object",
+                "properties": {
+                    "image_url": {
+                        "type": "string",
+                        "description": "URL http(s) de la imagen"
+                    },
+                    "image_data": {
+                        "type": "string",
+                        "description": "Imagen en base64 o como data URL"
+                    },
+                    "target": {
+                        "type": ["string", "number"],
+                        "description": "Contraste objetivo para las sugerencias: 'AA' (4.5, por defecto), 'AAA' (7), 'AA_LARGE' (3), 'AAA_LARGE' (4.5) o un ratio numérico"
+                    },
+                    "min_confidence": {
+                        "type": "number",
+                        "minimum": 0,
+                        "maximum": 100,
+                        "description": "Confianza mínima del OCR para incluir una palabra (por defecto 60)"
+                    },
+                    "mode": {
+                        "type": "string",
+                        "enum": ["ocr", "heatmap"],
+                        "description": "'ocr' (por defecto) lee cada palabra; 'heatmap' no usa OCR y localiza regiones con texto de bajo contraste, recomendado para capturas de página completa muy grandes"
+                    },
+                    "max_regions": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "maximum": 500,
+                        "description": "En modo 'heatmap', número máximo de regiones devueltas, ordenadas de peor a mejor (por defecto 50)"
+                    }
+                },
+                "anyOf": [
+                    {"required": ["image_url"]},
+                    {"required": ["image_data"]}
+                ]
+            },
+            "_meta": {
+                "openai/outputTemplate": "ui://widget/color-accessibility.html",
+                "openai/widgetAccessible": True,
+                "openai/toolInvocation/invoking": "Leyendo el texto de la imagen...",
+                "openai/toolInvocation/invoked": "Análisis completado."
+            }
+        },
+        {
+            "name": "extract_image_palette",
+            "description": "Extraer la paleta de colores dominantes de una imagen (mockup, captura, diseño) en el servidor y evaluar en la misma llamada el contraste WCAG entre todos sus colores. Usar cuando el usuario pregunta qué colores de un diseño funcionan juntos, en lugar de adivinar los códigos hexadecimales.",
+            "inputSchema": {
+                "type": "object",
+                "properties": {
+                    "image_url": {
+                        "type": "string",
+                        "description": "URL http(s) de la imagen"
+                    },
+                    "image_data": {
+                        "type": "string",
+                        "description": "Imagen en base64 o como data URL"
+                    },
+                    "palette_size": {
+                        "type": "integer",
+                        "minimum": 2,
+                        "maximum": 16,
+                        "description": "Número de colores de la paleta (por defecto 6)"
+                    },
+                    "include_matrix": {
+                        "type": "boolean",
+                        "description": "Incluir la matriz completa de ratios (por defecto false)"
+                    }
+                },
+                "anyOf": [
+                    {"required": ["image_url"]},
+                    {"required": ["image_data"]}
+                ]
+            }
+        }
+    ]
+}
+
+# Closed label sets of the request metrics (anything else is counted as "other")
+RPC_METHODS = frozenset(["initialize", "resources/list", "resources/read", "tools/list", "tools/call"])
+TOOL_NAMES = frozenset(tool["name"] for tool in TOOLS_LIST_RESULT["tools"])
+
+telemetry.register(telemetry.Gauge(
+    "mcp_worker_pool_in_flight", "Analysis tasks submitted to the worker pool and not finished.",
+    callback=lambda: worker_pool.stats()["in_flight"]))
+telemetry.register(telemetry.Gauge(
+    "mcp_worker_pool_queue_depth", "Analysis tasks waiting for a free worker.",
+    callback=lambda: worker_pool.stats()["queue_depth"]))
+
+STATIC_RESULTS = {
+    "initialize": static_responses.StaticJSONRPC(INITIALIZE_RESULT),
+    "resources/list": static_responses.StaticJSONRPC(RESOURCES_LIST_RESULT),
+    "tools/list": static_responses.StaticJSONRPC(TOOLS_LIST_RESULT),
+}
+STATIC_RESOURCES = {
+    uri: static_responses.StaticJSONRPC(result) for uri, result in RESOURCE_RESULTS.items()
+}
+WIDGET_PAGE = static_responses.StaticDocument(WIDGET_DEMO_HTML.encode("utf-8"), "text/html; charset=utf-8")
+
+def static_result(message):
+    """Pre-rendered response for a request to a static method, or None"""
+    if not isinstance(message, dict) or "id" not in message:
+        return None
+    params = message.get("params")
+    if params is not None and not isinstance(params, dict):
+        return None  # handle_rpc answers with Invalid params
+    method = message.get("method")
+    if method == "resources/read":
+        return STATIC_RESOURCES.get(params.get("uri")) if isinstance(params, dict) else None
+    return STATIC_RESULTS.get(method) if isinstance(method, str) else None
+
+def static_response(request, payload, *variant_args):
+    """
+    Serve a StaticJSONRPC / StaticDocument honoring Accept-Encoding.
+    Only GET documents carry an ETag and may answer 304: a JSON-RPC body
+    holds the request's id, so it always goes out in full.
+    """
+    available = getattr(payload, "encodings", ("gzip",))
+    encoding = static_responses.choose_encoding(request.headers.get("accept-encoding"), available)
+    headers = {"Vary": "Accept-Encoding"}
+    if request.method == "GET" and isinstance(payload, static_responses.StaticDocument):
+        headers["ETag"] = static_responses.variant_etag(payload.etag, encoding)
+        if static_responses.etag_matches(request.headers.get("if-none-match"), payload.etag):
+            return Response(status_code=304, headers=headers)
+    body, encoding = payload.render(*variant_args, encoding)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    media_type = getattr(payload, "media_type", "application/json")
+    return Response(content=body, media_type=media_type, headers=headers)
+
+async def json_response(request, body):
+    """Serialized JSON response, compressed when large and the client accepts it"""
+    headers = {"Vary": "Accept-Encoding"}
+    if len(body) >= COMPRESS_MIN_BYTES:
+        encoding = static_responses.choose_encoding(request.headers.get("accept-encoding"))
+        if encoding:
+            # zlib and brotli release the GIL: compress off the event loop
+            with timing.span("compress"):
+                body = await asyncio.to_thread(static_responses.compress, body, encoding)
+            headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose body is produced while the request body is still
+    being read. The stock one consumes receive() to watch for disconnects
+    (ASGI < 2.4), which would swallow the request body; here request.stream()
+    sees the disconnect itself and raises ClientDisconnect.
+    """
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+# ============================================================================
+# ROUTES
+# ============================================================================
+
+@app.get("/")
+async def root():
+    return {"message": "Color Accessibility Checker MCP Server", "status": "running"}
+
+@app.get("/stats")
+async def stats():
+    """
+    Runtime statistics for the in-process caches and the analysis pool.
+    color_cache / color_parser count this process only: batches handed to
+    the pool fill the workers' own caches, which are not aggregated here.
+    """
+    return {
+        "color_cache": {**color_cache.stats(), "scope": "main_process"},
+        "color_parser": {**color_parser.stats(), "scope": "main_process"},
+        "logging": structured_log.stats(),
+        "result_cache": result_cache.stats(),
+        "worker_pool": worker_pool.stats()
+    }
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of the request, analysis and event-loop metrics"""
+    return Response(telemetry.render(), media_type=telemetry.CONTENT_TYPE)
+
+@app.get("/debug/profile")
+async def debug_profile(request: Request, seconds: float = 10.0, interval: float = 0.005):
+    """Sample the server's Python stacks for `seconds`; collapsed stacks for flamegraph tools"""
+    if not timing.DEBUG_TOKEN:
+        return JSONResponse({"error": "Not found"}, status_code=404)
+    if not timing.check_token(request.headers.get("authorization")):
+        return JSONResponse({"error": "Unauthorized"}, status_code=401, headers={"WWW-Authenticate": "Bearer"})
+    log.info("🔬 Profiling for %ss", seconds)
+    try:
+        text, samples = await asyncio.to_thread(timing.profile, seconds, interval)
+    except RuntimeError as e:
+        return JSONResponse({"error": str(e)}, status_code=409)
+    return Response(text, media_type="text/plain; charset=utf-8", headers={"X-Profile-Samples": str(samples)})
+
+@app.post("/audit")
+async def audit(request: Request, target: str = "", vision: str = "all", vision_severity: float = 1.0,
+                metrics: str = "", target_metric: str = "wcag2"):
+    """
+    Bulk NDJSON audit: one fg/bg pair per line in, one result per line out.
+    Like check_color_accessibility, every deficiency is simulated unless
+    ?vision=none (or a comma-separated subset) is given.
+    """
+    try:
+        selected = contrast_metrics.resolve_metrics(metrics, target_metric)
+    except ValueError as e:
+        return JSONResponse({"error": f"Invalid metrics: {e}"}, status_code=400)
+    try:
+        target_ratio = contrast_solver.resolve_target(target or None, target_metric)
+    except ValueError as e:
+        return JSONResponse({"error": f"Invalid target: {e}"}, status_code=400)
+    try:
+        deficiencies = cvd_simulation.parse_deficiencies(vision)
+        severity = cvd_simulation.resolve_severity(vision_severity)
+    except ValueError as e:
+        return JSONResponse({"error": f"Invalid vision: {e}"}, status_code=400)
+    options = {"vision": deficiencies, "severity": severity, "metrics": selected, "target_metric": target_metric}
+    return DuplexStreamingResponse(
+        bulk_audit.audit_ndjson(request.stream(), target_ratio, options=options),
+        media_type="application/x-ndjson"
+    )
+
+@app.get("/widget")
+async def widget(request: Request):
+    """Serve the widget HTML with static demo data for preview"""
+    return static_response(request, WIDGET_PAGE)
 
 # ============================================================================
 # MCP ENDPOINT (following gastos example pattern EXACTLY)
 # ============================================================================
 
-@app.post("/mcp")
-async def mcp_endpoint(request: Request):
-    """MCP JSON-RPC 2.0 endpoint"""
-    body = await request.json()
+async def handle_rpc(message, tool_slots=None, progress=None):
+    """
+    Handle one JSON-RPC message; returns the response dict, or None for
+    notifications. `progress`, if given, is awaited with each progress
+    notification of a long tools/call (streamable HTTP mode).
+    """
+    if not isinstance(message, dict) or not isinstance(message.get("method"), str):
+        request_id = message.get("id") if isinstance(message, dict) else None
+        return {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "error": {"code": -32600, "message": "Invalid Request"}
+        }
     
-    method = body.get("method")
-    params = body.get("params", {})
-    request_id = body.get("id")
+    if "id" not in message:
+        # Notifications (e.g. notifications/initialized) never get a response
+        log.debug("🔔 Notification: %s", message["method"])
+        return None
+    
+    params = message.get("params")
+    method = telemetry.label(message["method"], RPC_METHODS)
+    tool = ""
+    if method == "tools/call" and isinstance(params, dict):
+        tool = telemetry.label(params.get("name"), TOOL_NAMES)
+    start = time.perf_counter()
+    response = None
+    # Stages of this message (its own, even inside a batch; also added to the request's)
+    with timing.scope(child=True) as timings, structured_log.request_fields() as fields:
+        try:
+            if params is not None and not isinstance(params, dict):
+                # Every method of this server takes named params
+                response = {
+                    "jsonrpc": "2.0",
+                    "id": message["id"],
+                    "error": {"code": -32602, "message": "Invalid params: expected an object"}
+                }
+            elif message["method"] == "tools/call" and tool_slots is not None:
+                # Bound the CPU-heavy calls of a batch; the rest run freely
+                async with tool_slots:
+                    response = await dispatch_rpc(message)
+            else:
+                response = await dispatch_rpc(message, progress)
+        except Exception as e:
+            log.exception("❌ Error handling %s: %s", message["method"], e)
+            response = {
+                "jsonrpc": "2.0",
+                "id": message["id"],
+                "error": {"code": -32603, "message": f"Internal error: {e}"}
+            }
+        finally:
+            elapsed = time.perf_counter() - start
+            telemetry.observe_rpc(method, tool, elapsed, response)
+    if log.isEnabledFor(logging.INFO):
+        log_request(message, elapsed, response, fields)
+    
+    meta = params.get("_meta") if isinstance(params, dict) else None
+    if isinstance(meta, dict) and meta.get("timings") and isinstance(response.get("result"), dict):
+        # Copied, not updated: the result may be shared with the result cache
+        result = response["result"]
+        response = {**response, "result": {**result, "_meta": {**result.get("_meta", {}), "timings": timings.as_ms()}}}
+    return response
+
+def log_request(message, elapsed, response, fields):
+    """The INFO summary of one JSON-RPC request, with the fields its handler annotated"""
+    params = message.get("params")
+    summary = {"method": message["method"], "id": message.get("id")}
+    if message["method"] == "tools/call" and isinstance(params, dict):
+        summary["tool"] = params.get("name")
+    summary["duration_ms"] = round(elapsed * 1000, 1)
+    failed = "error" in response
+    if failed:
+        summary["error"] = response["error"].get("code")
+    elif isinstance(response.get("result"), dict) and response["result"].get("isError"):
+        failed = True
+        summary["error"] = "tool"
+    summary.update(fields)
+    log.info("%s rpc", "❌" if failed else "✅", extra={"fields": summary})
+
+async def dispatch_rpc(message, progress=None):
+    """Route a JSON-RPC request, serving repeated tools/call results from the result cache"""
+    params = message.get("params") or {}
+    arguments = params.get("arguments") or {}
+    if (message.get("method") != "tools/call" or not result_cache.RESULTS.enabled
+            or not isinstance(arguments, dict) or "image_url" in arguments):
+        # image_url content can change behind the same arguments: never cached
+        return await route_rpc(message, progress)
+    try:
+        key = result_cache.call_key(params.get("name"), arguments)
+    except (TypeError, ValueError):
+        return await route_rpc(message, progress)
+    with timing.span("cache"):
+        cached = (await result_cache.RESULTS.aget_many([key])).get(key)
+    if cached is not None:
+        structured_log.annotate(cache="call")
+        return {
+            "jsonrpc": "2.0",
+            "id": message.get("id"),
+            "result": cached
+        }
+    response = await route_rpc(message, progress)
+    if "result" in response and not response["result"].get("isError"):
+        await result_cache.RESULTS.aput_many([(key, response["result"])])
+    return response
+
+async def route_rpc(message, progress=None):
+    """Route a JSON-RPC request to its MCP method"""
+    method = message.get("method")
+    params = message.get("params") or {}
+    request_id = message.get("id")
     
     # Handle MCP protocol methods
     if method == "initialize":
-        return JSONResponse({
+        return {
             "jsonrpc": "2.0",
             "id": request_id,
-            "result": {
-                "protocolVersion": "2024-11-05",
-                "capabilities": {
-                    "tools": {},
-                    "resources": {}
-                },
-                "serverInfo": {
-                    "name": "color-accessibility-checker",
-                    "version": "1.0.0"
-                }
-            }
-        })
+            "result": INITIALIZE_RESULT
+        }
     
     elif method == "resources/list":
-        return JSONResponse({
+        return {
             "jsonrpc": "2.0",
             "id": request_id,
-            "result": {
-                "resources": [
-                    {
-                        "uri": "ui://widget/color-accessibility.html",
-                        "name": "Color Accessibility Widget",
-                        "description": "Widget for displaying color accessibility analysis results",
-                        "mimeType": "text/html+skybridge"
-                    }
-                ]
-            }
-        })
+            "result": RESOURCES_LIST_RESULT
+        }
     
     elif method == "resources/read":
         uri = params.get("uri")
-        if uri == "ui://widget/color-accessibility.html":
-            return JSONResponse({
+        if uri in RESOURCE_RESULTS:
+            return {
                 "jsonrpc": "2.0",
                 "id": request_id,
-                "result": {
-                    "contents": [
-                        {
-                            "uri": uri,
-                            "mimeType": "text/html+skybridge",
-                            "text": WIDGET_HTML
-                        }
-                    ]
-                }
-            })
-        return JSONResponse({
+                "result": RESOURCE_RESULTS[uri]
+            }
+        return {
             "jsonrpc": "2.0",
             "id": request_id,
             "error": {"code": -32602, "message": f"Resource not found: {uri}"}
-        })
+        }
     
     # ========================================================================
     # TOOLS LIST - Following gastos example pattern
     # ========================================================================
     elif method == "tools/list":
-        return JSONResponse({
+        return {
             "jsonrpc": "2.0",
             "id": request_id,
-            "result": {
-                "tools": [
-                    {
-                        "name": "check_color_accessibility",
-                        "description": "Analizar la accesibilidad de colores según WCAG. Cuando el usuario suba una imagen (captura de pantalla, diseño, web), mira la imagen y extrae todos los pares de colores de texto/fondo que veas. Luego llama a esta herramienta con los colores en formato hexadecimal.",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "color_pairs": {
-                                    "type": "array",
-                                    "description": "Array de pares de colores extraídos de la imagen",
-                                    "items": {
-                                        "type": "object",
-                                        "properties": {
-                                            "foreground": {
-                                                "type": "string",
-                                                "description": "Color del texto en hexadecimal (#RRGGBB)"
-                                            },
-                                            "background": {
-                                                "type": "string",
-                                                "description": "Color del fondo en hexadecimal (#RRGGBB)"
-                                            },
-                                            "element": {
-                                                "type": "string",
-                                                "description": "Descripción del elemento (ej: 'título principal', 'botón', 'enlace de navegación')"
-                                            }
-                                        },
-                                        "required": ["foreground", "background"]
-                                    }
-                                }
-                            },
-                            "required": ["color_pairs"]
-                        },
-                        "_meta": {
-                            "openai/outputTemplate": "ui://widget/color-accessibility.html",
-                            "openai/widgetAccessible": True,
-                            "openai/toolInvocation/invoking": "Analizando accesibilidad de colores...",
-                            "openai/toolInvocation/invoked": "Análisis completado."
-                        }
-                    }
-                ]
-            }
-        })
+            "result": TOOLS_LIST_RESULT
+        }
     
     # ========================================================================
     # TOOLS CALL - Following gastos example pattern EXACTLY
     # ========================================================================
     elif method == "tools/call":
         tool_name = params.get("name")
-        arguments = params.get("arguments", {})
+        arguments = params.get("arguments")
+        if arguments is None:
+            arguments = {}
+        if not isinstance(arguments, dict):
+            return {
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "error": {"code": -32602, "message": "Invalid params: arguments must be an object"}
+            }
         
         if tool_name == "check_color_accessibility":
             color_pairs_input = arguments.get("color_pairs", [])
+            if not isinstance(color_pairs_input, list):
+                return {
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "error": {"code": -32602, "message": "Invalid arguments: color_pairs must be an array of pairs"}
+                }
+            output_format = arguments.get("format", "full")
+            target_metric = arguments.get("target_metric") or "wcag2"
+            try:
+                metrics = contrast_metrics.resolve_metrics(arguments.get("metrics"), target_metric)
+                thresholds = contrast_metrics.resolve_thresholds(metrics, arguments.get("thresholds"))
+            except (AttributeError, TypeError, ValueError) as e:
+                return {
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "error": {"code": -32602, "message": f"Invalid metrics: {e}"}
+                }
+            try:
+                target_ratio = contrast_solver.resolve_target(arguments.get("target"), target_metric)
+            except ValueError as e:
+                return {
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "error": {"code": -32602, "message": f"Invalid target: {e}"}
+                }
+            try:
+                deficiencies = cvd_simulation.resolve_deficiencies(arguments.get("vision"))
+                severity = cvd_simulation.resolve_severity(arguments.get("vision_severity"))
+            except (TypeError, ValueError) as e:
+                return {
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "error": {"code": -32602, "message": f"Invalid vision: {e}"}
+                }
+            if output_format not in ("full", "compact"):
+                return {
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "error": {"code": -32602, "message": f"Invalid format: {output_format}"}
+                }
+            
+            structured_log.annotate(pairs=len(color_pairs_input))
+            telemetry.PAIRS_PER_CALL.observe(len(color_pairs_input))
+            
+            options = {
+                "vision": deficiencies,
+                "severity": severity,
+                "metrics": metrics,
+                "thresholds": thresholds,
+                "target_metric": target_metric
+            }
             
-            print(f"🎨 Received {len(color_pairs_input)} color pairs from ChatGPT")
+            # Items that are not pair objects are reported like unparseable pairs
+            invalid_pairs = [
+                {
+                    "index": i,
+                    "element": None,
+                    "foreground": None,
+                    "background": None,
+                    "error": "Pair must be an object with foreground and background"
+                }
+                for i, pair in enumerate(color_pairs_input) if not isinstance(pair, dict)
+            ]
+            well_formed = [i for i, pair in enumerate(color_pairs_input) if isinstance(pair, dict)]
             
-            # Process each color pair
-            analyzed_pairs = []
+            # Pairs analyzed before with the same options come from the result cache
+            cache_start = time.perf_counter()
+            foregrounds, backgrounds, _ = normalize_pairs([color_pairs_input[i] for i in well_formed])
+            keys = dict(zip(well_formed, result_cache.pair_keys(foregrounds, backgrounds, target_ratio, options)))
+            cached = await result_cache.RESULTS.aget_many(list(keys.values()))
+            timing.add("cache", time.perf_counter() - cache_start)
+            results = [None] * len(color_pairs_input)
+            missing = []
+            for i, key in keys.items():
+                hit = cached.get(key)
+                if hit is None:
+                    missing.append(i)
+                else:
+                    results[i] = {"text_sample": color_pairs_input[i].get("element", "Elemento"), **hit}
+            pending = color_pairs_input if len(missing) == len(color_pairs_input) else [color_pairs_input[i] for i in missing]
+            if cached:
+                structured_log.annotate(cached_pairs=len(keys) - len(missing))
             
-            for pair in color_pairs_input:
-                fg_hex = pair.get("foreground", "").strip()
-                bg_hex = pair.get("background", "").strip()
-                element = pair.get("element", "Elemento")
-                
-                # Normalize hex colors
-                if not fg_hex.startswith("#"):
-                    fg_hex = f"#{fg_hex}"
-                if not bg_hex.startswith("#"):
-                    bg_hex = f"#{bg_hex}"
-                
-                try:
-                    fg_rgb = hex_to_rgb(fg_hex)
-                    bg_rgb = hex_to_rgb(bg_hex)
-                    
-                    ratio = calculate_contrast_ratio(fg_rgb, bg_rgb)
-                    wcag = evaluate_wcag(ratio)
-                    
-                    # Generate suggestions if fails
-                    suggestions = []
-                    if not wcag["passes_aa_normal"]:
-                        print(f"  🔍 Generating OKLCH suggestions for failing pair: {fg_hex} on {bg_hex}")
-                        suggestions = generate_oklch_suggestions(bg_hex, fg_hex, 4.5)
-                        print(f"  💡 Generated {len(suggestions)} suggestions")
-                        if len(suggestions) == 0:
-                            print(f"  ⚠️ No suggestions generated - coloraide may not be working correctly")
-                    
-                    analyzed_pairs.append({
-                        "text_sample": element,
-                        "foreground": fg_hex.upper(),
-                        "background": bg_hex.upper(),
-                        "ratio": round(ratio, 2),
-                        "passes_aa_normal": wcag["passes_aa_normal"],
-                        "passes_aa_large": wcag["passes_aa_large"],
-                        "passes_aaa_normal": wcag["passes_aaa_normal"],
-                        "passes_aaa_large": wcag["passes_aaa_large"],
-                        "suggestions": suggestions
+            # Chunks finish in any order; each one is reported as soon as it is done
+            meta = params.get("_meta")
+            progress_token = meta.get("progressToken") if isinstance(meta, dict) else None
+            fresh = []
+            suggestion_seconds = 0.0
+            done = len(color_pairs_input) - len(missing)
+            analyze_start = time.perf_counter()
+            async for offset, size, (chunk_pairs, chunk_invalid, chunk_stats) in worker_pool.iter_chunks(analyze_color_chunk, pending, target_ratio, options):
+                # Stages measured where the chunk ran (CPU time, summed over workers)
+                timing.merge(chunk_stats["stages"])
+                suggestion_seconds += chunk_stats["stages"]["suggestions"]
+                telemetry.SUGGESTIONS.inc(chunk_stats["suggestions"])
+                positions = missing[offset:offset + size]
+                chunk_results = []
+                for position, pair in zip(positions, chunk_pairs):
+                    if pair is not None:
+                        results[position] = pair
+                        chunk_results.append(pair)
+                        fresh.append((keys[position], {key: value for key, value in pair.items() if key != "text_sample"}))
+                invalid_pairs.extend({**invalid, "index": positions[invalid["index"]]} for invalid in chunk_invalid)
+                done += size
+                if progress is not None and progress_token is not None:
+                    # Input positions are contiguous unless cached or malformed pairs were skipped
+                    location = {"offset": positions[0]} if len(missing) == len(color_pairs_input) else {
+                        "indices": [position for position, pair in zip(positions, chunk_pairs) if pair is not None]}
+                    await progress({
+                        "jsonrpc": "2.0",
+                        "method": "notifications/progress",
+                        "params": {
+                            "progressToken": progress_token,
+                            "progress": done,
+                            "total": len(color_pairs_input),
+                            "message": f"{done}/{len(color_pairs_input)} pares analizados",
+                            "_meta": {**location, "color_pairs": chunk_results}
+                        }
                     })
-                    
-                    status = "✅" if wcag["passes_aa_normal"] else "❌"
-                    print(f"  {status} {element}: {fg_hex} on {bg_hex} = {ratio:.2f}:1")
-                    
-                except Exception as e:
-                    print(f"  ⚠️ Error: {e}")
+            timing.add("analyze", time.perf_counter() - analyze_start)
+            analyzed_pairs = [pair for pair in results if pair is not None]
+            await result_cache.RESULTS.aput_many(fresh)
             
             # Calculate summary
+            report_start = time.perf_counter()
             passed = sum(1 for p in analyzed_pairs if p.get("passes_aa_normal", False))
             failed = len(analyzed_pairs) - passed
             
@@ -735,20 +1255,58 @@ async def mcp_endpoint(request: Request):
                 "total_pairs": len(analyzed_pairs),
                 "passed_pairs": passed,
                 "failed_pairs": failed,
+                "target_ratio": target_ratio,
                 "color_pairs": analyzed_pairs
             }
+            if metrics != contrast_metrics.DEFAULT_METRICS or arguments.get("thresholds"):
+                result_data["metrics"] = contrast_metrics.summarize(analyzed_pairs, metrics, thresholds, target_metric)
+            if deficiencies:
+                result_data["vision"] = cvd_simulation.summarize(analyzed_pairs, deficiencies, severity)
+            if invalid_pairs:
+                result_data["invalid_pairs"] = sorted(invalid_pairs, key=lambda invalid: invalid["index"])
             
-            print(f"📊 Results: {passed} passed, {failed} failed")
+            structured_log.annotate(passed=passed, failed=failed, invalid=len(invalid_pairs))
+            telemetry.FAILING_PAIRS.inc(failed)
+            telemetry.INVALID_PAIRS.inc(len(invalid_pairs))
+            if missing:
+                telemetry.SUGGESTION_DURATION.observe(suggestion_seconds)
             
+            summary = f"Análisis completado: {len(analyzed_pairs)} pares de colores. {passed} pasan WCAG AA, {failed} fallan."
+            if invalid_pairs:
+                summary += f" {len(invalid_pairs)} pares no se pudieron analizar (color no válido): " + "; ".join(
+                    f"par {invalid['index']}: {invalid['error']}" for invalid in result_data["invalid_pairs"][:5])
+            
+            if output_format == "compact":
+                # Columnar data, sent once (the widget reads structuredContent as toolOutput)
+                compact_data = compact_format.to_compact(result_data)
+                timing.add("report", time.perf_counter() - report_start)
+                return {
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "result": {
+                        "content": [{"type": "text", "text": summary}],
+                        "structuredContent": {
+                            "data": compact_data,
+                            "_meta": {
+                                "openai/outputTemplate": {
+                                    "type": "resource",
+                                    "resource": "ui://widget/color-accessibility.html"
+                                }
+                            }
+                        }
+                    }
+                }
+            
+            timing.add("report", time.perf_counter() - report_start)
             # Return in EXACT same format as gastos example
-            return JSONResponse({
+            return {
                 "jsonrpc": "2.0",
                 "id": request_id,
                 "result": {
                     "content": [
                         {
                             "type": "text",
-                            "text": f"Análisis completado: {len(analyzed_pairs)} pares de colores. {passed} pasan WCAG AA, {failed} fallan."
+                            "text": summary
                         }
                     ],
                     "structuredContent": {
@@ -764,19 +1322,298 @@ async def mcp_endpoint(request: Request):
                         "data": result_data
                     }
                 }
-            })
+            }
         
-        return JSONResponse({
+        elif tool_name == "find_compliant_colors":
+            adjust = arguments.get("adjust", "foreground")
+            try:
+                target_ratio = contrast_solver.resolve_target(arguments.get("target"))
+                count = max(1, min(20, int(arguments.get("count", 5))))
+                if adjust not in ("foreground", "background"):
+                    raise ValueError(f"adjust must be 'foreground' or 'background', got {adjust}")
+                # An index query scans ~1e5 records: always worth a worker
+                result_data = await worker_pool.run(
+                    find_compliant_colors,
+                    arguments.get("foreground", ""), arguments.get("background", ""),
+                    adjust, target_ratio, count,
+                    weight=worker_pool.INLINE_THRESHOLD
+                )
+            except ValueError as e:
+                return {
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "error": {"code": -32602, "message": f"Invalid arguments: {e}"}
+                }
+            
+            found = len(result_data["candidates"])
+            structured_log.annotate(found=found)
+            if found:
+                best = result_data["candidates"][0]
+                text = f"El color más cercano que alcanza {target_ratio}:1 es {best['hex']} ({best['contrast_ratio']}:1, ΔE {best['delta_e']})."
+            else:
+                text = f"Ningún color alcanza {target_ratio}:1 con el otro color fijo."
+            
+            return {
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "result": {
+                    "content": [{"type": "text", "text": text}],
+                    "structuredContent": {"data": result_data}
+                }
+            }
+        
+        elif tool_name == "check_palette_contrast":
+            palette_input = arguments.get("palette", [])
+            try:
+                if not isinstance(palette_input, list):
+                    raise ValueError("palette must be an array of colors")
+                for i, item in enumerate(palette_input):
+                    if not isinstance(item.get("color") if isinstance(item, dict) else item, str):
+                        raise ValueError(f"palette[{i}] must be a color string or an object with a 'color' string")
+            except ValueError as e:
+                return {
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "error": {"code": -32602, "message": f"Invalid arguments: {e}"}
+                }
+            structured_log.annotate(colors=len(palette_input))
+            
+            result_data = await worker_pool.run(
+                analyze_palette, palette_input, bool(arguments.get("include_matrix", False)),
+                weight=len(palette_input) * (len(palette_input) - 1) // 2
+            )
+            counts = result_data["pair_counts"]
+            
+            structured_log.annotate(aa_pairs=counts["aa_normal"])
+            
+            return {
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "result": {
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": f"Paleta analizada: {result_data['total_colors']} colores. {counts['aa_normal']} combinaciones cumplen WCAG AA y {counts['aaa_normal']} cumplen AAA para texto normal."
+                        }
+                    ],
+                    "structuredContent": {"data": result_data}
+                }
+            }
+        
+        elif tool_name == "check_image_accessibility":
+            mode = arguments.get("mode", "ocr")
+            try:
+                target_ratio = contrast_solver.resolve_target(arguments.get("target"))
+                if mode == "heatmap":
+                    analyze, option = contrast_heatmap.analyze_heatmap, max(1, min(500, int(arguments.get("max_regions", 50))))
+                elif mode == "ocr":
+                    analyze, option = image_audit.analyze_image, float(arguments.get("min_confidence", 60))
+                else:
+                    raise ValueError(f"mode must be 'ocr' or 'heatmap', got {mode}")
+                # Decoding and OCR / the contrast map always dominate: run in a worker
+                result_data = await worker_pool.run(
+                    analyze,
+                    arguments.get("image_data"), arguments.get("image_url"),
+                    target_ratio, option,
+                    weight=worker_pool.INLINE_THRESHOLD
+                )
+            except (TypeError, ValueError) as e:
+                return {
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "error": {"code": -32602, "message": f"Invalid arguments: {e}"}
+                }
+            except RuntimeError as e:
+                return {
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "error": {"code": -32603, "message": str(e)}
+                }
+            
+            passed = result_data["passed_pairs"]
+            failed = result_data["failed_pairs"]
+            found = "regiones de bajo contraste" if mode == "heatmap" else "textos detectados"
+            structured_log.annotate(mode=mode, width=result_data["image"]["width"], height=result_data["image"]["height"],
+                                    boxes=result_data["total_pairs"], failed=failed, timings_ms=result_data["timings_ms"])
+            
+            return {
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "result": {
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": f"Imagen analizada: {result_data['total_pairs']} {found}. {passed} pasan WCAG AA, {failed} fallan."
+                        }
+                    ],
+                    "structuredContent": {
+                        "data": result_data,
+                        "_meta": {
+                            "openai/outputTemplate": {
+                                "type": "resource",
+                                "resource": "ui://widget/color-accessibility.html"
+                            }
+                        }
+                    },
+                    "toolOutput": {
+                        "data": result_data
+                    }
+                }
+            }
+        
+        elif tool_name == "extract_image_palette":
+            try:
+                palette_size = int(arguments.get("palette_size", 6))
+                result_data = await worker_pool.run(
+                    palette_extract.analyze_image_palette,
+                    arguments.get("image_data"), arguments.get("image_url"),
+                    palette_size, bool(arguments.get("include_matrix", False)),
+                    weight=worker_pool.INLINE_THRESHOLD
+                )
+            except (TypeError, ValueError) as e:
+                return {
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "error": {"code": -32602, "message": f"Invalid arguments: {e}"}
+                }
+            except RuntimeError as e:
+                return {
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "error": {"code": -32603, "message": str(e)}
+                }
+            counts = result_data["pair_counts"]
+            
+            structured_log.annotate(width=result_data["image"]["width"], height=result_data["image"]["height"],
+                                    palette=[c["color"] for c in result_data["colors"]], timings_ms=result_data["timings_ms"])
+            
+            return {
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "result": {
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": f"Paleta extraída: {', '.join(c['color'] for c in result_data['colors'])}. {counts['aa_normal']} combinaciones cumplen WCAG AA y {counts['aaa_normal']} cumplen AAA para texto normal."
+                        }
+                    ],
+                    "structuredContent": {"data": result_data}
+                }
+            }
+        
+        return {
             "jsonrpc": "2.0",
             "id": request_id,
             "error": {"code": -32601, "message": f"Tool not found: {tool_name}"}
-        })
+        }
     
-    return JSONResponse({
+    return {
         "jsonrpc": "2.0",
         "id": request_id,
         "error": {"code": -32601, "message": f"Method not found: {method}"}
-    })
+    }
+
+def wants_stream(request, message):
+    """Streamable HTTP: answer tools/call with SSE when the client accepts it"""
+    return (
+        "text/event-stream" in request.headers.get("accept", "")
+        and isinstance(message, dict)
+        and message.get("method") == "tools/call"
+        and "id" in message
+    )
+
+def sse_event(message):
+    return b"event: message\ndata: " + static_responses.dumps(message) + b"\n\n"
+
+async def stream_rpc(message):
+    """SSE stream of a request's progress notifications followed by its response"""
+    queue = asyncio.Queue()
+    
+    async def run():
+        try:
+            await queue.put(await handle_rpc(message, progress=queue.put))
+        finally:
+            await queue.put(None)
+    
+    task = asyncio.ensure_future(run())
+    try:
+        while (item := await queue.get()) is not None:
+            yield sse_event(item)
+    finally:
+        # Stop the work if the client disconnects mid-stream
+        task.cancel()
+
+@app.post("/mcp")
+async def mcp_endpoint(request: Request):
+    """MCP JSON-RPC 2.0 endpoint (single messages and batches)"""
+    with timing.scope() as timings:
+        response = await serve_mcp(request)
+        if timing.SERVER_TIMING and not isinstance(response, StreamingResponse):
+            # SSE streams send their headers before any work is done
+            response.headers["Server-Timing"] = timings.header()
+    return response
+
+async def serve_mcp(request):
+    """Parse the JSON-RPC body, run its message(s) and build the HTTP response"""
+    with timing.span("read"):
+        raw = await request.body()
+    try:
+        with timing.span("decode"):
+            body = json.loads(raw)
+    except ValueError:
+        return JSONResponse({
+            "jsonrpc": "2.0",
+            "id": None,
+            "error": {"code": -32700, "message": "Parse error"}
+        })
+    
+    if not isinstance(body, list):
+        start = time.perf_counter()
+        payload = static_result(body)
+        if payload is not None:
+            response = static_response(request, payload, body["id"])
+            telemetry.observe_rpc(body["method"], "", time.perf_counter() - start, None)
+            return response
+        if wants_stream(request, body):
+            return StreamingResponse(stream_rpc(body), media_type="text/event-stream", headers={
+                "Cache-Control": "no-cache",
+                "X-Accel-Buffering": "no"
+            })
+        response = await handle_rpc(body)
+        if response is None:
+            return Response(status_code=202)
+        with timing.span("serialize"):
+            content = static_responses.dumps(response)
+        return await json_response(request, content)
+    
+    if len(body) == 0 or len(body) > MAX_BATCH_SIZE:
+        return JSONResponse({
+            "jsonrpc": "2.0",
+            "id": None,
+            "error": {"code": -32600, "message": f"Invalid Request: batch must hold 1 to {MAX_BATCH_SIZE} messages"}
+        })
+    
+    log.debug("📦 Batch of %d messages", len(body))
+    tool_slots = asyncio.Semaphore(BATCH_TOOL_CONCURRENCY)
+    
+    async def render(message):
+        # Static results are spliced in as pre-serialized bytes
+        start = time.perf_counter()
+        payload = static_result(message)
+        if payload is not None:
+            part = payload.body(message["id"])
+            telemetry.observe_rpc(message["method"], "", time.perf_counter() - start, None)
+            return part
+        response = await handle_rpc(message, tool_slots)
+        if response is None:
+            return None
+        with timing.span("serialize"):
+            return static_responses.dumps(response)
+    
+    parts = [p for p in await asyncio.gather(*(render(m) for m in body)) if p is not None]
+    if not parts:
+        return Response(status_code=202)
+    return await json_response(request, b"[" + b",".join(parts) + b"]")
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,162 @@
+"""
+Vectorized sRGB <-> linear sRGB <-> OKLab <-> OKLCH conversions.
+
+Array counterpart of the coloraide conversions used by the suggestion
+generator: every function takes (..., 3) arrays and converts all colors
+in one pass, without creating per-color objects. String formatting
+follows coloraide's to_string() output (5 digits of precision, trailing
+zeros trimmed, achromatic hue printed as 0).
+"""
+import math
+
+import numpy as np
+
+# Linear sRGB -> LMS: coloraide's XYZD65_TO_LMS @ RGB_TO_XYZ. Björn
+# Ottosson's published 10-digit matrices are close but not equal, enough
+# to flip the last printed digit of ~1% of colors against to_string().
+_RGB_TO_LMS = np.array([
+    [0.4122214694707628, 0.5363325372617349, 0.05144599326750219],
+    [0.2119034958178251, 0.6806995506452344, 0.10739695353694051],
+    [0.08830245919005637, 0.2817188391361215, 0.6299787016738222],
+])
+
+# LMS^(1/3) -> OKLab (coloraide's LMS3_TO_OKLAB)
+_LMS3_TO_OKLAB = np.array([
+    [0.21045426830931396, 0.7936177747023053, -0.0040720430116192585],
+    [1.9779985324311686, -2.42859224204858, 0.450593709617411],
+    [0.025904042465547734, 0.7827717124575297, -0.8086757549230774],
+])
+
+# Inverses computed from the forward matrices so round trips are exact
+_LMS_TO_RGB = np.linalg.inv(_RGB_TO_LMS)
+_OKLAB_TO_LMS3 = np.linalg.inv(_LMS3_TO_OKLAB)
+
+# Chroma below this is treated as achromatic (hue undefined)
+ACHROMATIC_THRESHOLD = 1e-5
+
+# Tolerance used when deciding whether a linear RGB value is in gamut: float
+# noise only. Near black linear values are ~L**3 (1e-9 at L = 0.001), so a
+# looser bound lets fit_oklch keep chroma coloraide would remove.
+GAMUT_EPSILON = 1e-12
+
+
+def srgb_to_linear(srgb):
+    """Gamma-encoded sRGB in [0, 1] to linear sRGB"""
+    srgb = np.asarray(srgb, dtype=np.float64)
+    a = np.abs(srgb)
+    lin = np.where(a <= 0.04045, a / 12.92, ((a + 0.055) / 1.055) ** 2.4)
+    return np.copysign(lin, srgb)
+
+
+def linear_to_srgb(lin):
+    """Linear sRGB to gamma-encoded sRGB in [0, 1]"""
+    lin = np.asarray(lin, dtype=np.float64)
+    a = np.abs(lin)
+    srgb = np.where(a <= 0.0031308, a * 12.92, 1.055 * a ** (1 / 2.4) - 0.055)
+    return np.copysign(srgb, lin)
+
+
+def linear_to_oklab(lin):
+    """Linear sRGB to OKLab"""
+    lms = np.asarray(lin, dtype=np.float64) @ _RGB_TO_LMS.T
+    return np.cbrt(lms) @ _LMS3_TO_OKLAB.T
+
+
+def oklab_to_linear(lab):
+    """OKLab to linear sRGB (may fall outside [0, 1])"""
+    lms3 = np.asarray(lab, dtype=np.float64) @ _OKLAB_TO_LMS3.T
+    return (lms3 ** 3) @ _LMS_TO_RGB.T
+
+
+def oklab_to_oklch(lab):
+    """OKLab to OKLCH; hue is NaN for achromatic colors"""
+    lab = np.asarray(lab, dtype=np.float64)
+    a = lab[..., 1]
+    b = lab[..., 2]
+    c = np.hypot(a, b)
+    h = np.degrees(np.arctan2(b, a)) % 360.0
+    h = np.where(c < ACHROMATIC_THRESHOLD, np.nan, h)
+    return np.stack([lab[..., 0], c, h], axis=-1)
+
+
+def oklch_to_oklab(lch):
+    """OKLCH to OKLab; NaN hue is treated as 0"""
+    lch = np.asarray(lch, dtype=np.float64)
+    h = np.radians(np.nan_to_num(lch[..., 2]))
+    c = lch[..., 1]
+    return np.stack([lch[..., 0], c * np.cos(h), c * np.sin(h)], axis=-1)
+
+
+def srgb8_to_oklab(rgb):
+    """(..., 3) uint8 sRGB to OKLab"""
+    return linear_to_oklab(srgb_to_linear(np.asarray(rgb, dtype=np.float64) / 255.0))
+
+
+def srgb8_to_oklch(rgb):
+    """(..., 3) uint8 sRGB to OKLCH"""
+    return oklab_to_oklch(srgb8_to_oklab(rgb))
+
+
+def in_gamut(lin):
+    """True where a linear sRGB color lies inside the sRGB gamut"""
+    return np.all((lin >= -GAMUT_EPSILON) & (lin <= 1 + GAMUT_EPSILON), axis=-1)
+
+
+def fit_oklch(lch, iterations=16):
+    """
+    Bring OKLCH colors inside sRGB by reducing chroma at constant L and H.
+
+    Only out-of-gamut colors are bisected, all of them together; lightness
+    outside [0, 1] maps to black or white. Returns the fitted OKLCH array.
+    """
+    lch = np.array(lch, dtype=np.float64)
+    lch[..., 0] = np.clip(lch[..., 0], 0.0, 1.0)
+    flat = lch.reshape(-1, 3)
+    outside = ~in_gamut(oklab_to_linear(oklch_to_oklab(flat)))
+    if not outside.any():
+        return lch
+
+    probe = flat[outside]
+    low = np.zeros(len(probe))
+    high = probe[:, 1].copy()
+    for _ in range(iterations):
+        mid = (low + high) / 2
+        probe[:, 1] = mid
+        ok = in_gamut(oklab_to_linear(oklch_to_oklab(probe)))
+        low = np.where(ok, mid, low)
+        high = np.where(ok, high, mid)
+
+    flat[outside, 1] = low
+    return lch
+
+
+def oklch_to_srgb8(lch, fit=True):
+    """OKLCH to (..., 3) uint8 sRGB, gamut-fitted unless fit=False (clipped)"""
+    if fit:
+        lch = fit_oklch(lch)
+    srgb = linear_to_srgb(np.clip(oklab_to_linear(oklch_to_oklab(lch)), 0.0, 1.0))
+    return np.floor(np.clip(srgb, 0.0, 1.0) * 255 + 0.5).astype(np.uint8)
+
+
+def to_hex(rgb):
+    """Format a uint8 RGB triple as #RRGGBB (the case of normalized input colors)"""
+    r, g, b = (int(c) for c in rgb)
+    return f"#{r:02X}{g:02X}{b:02X}"
+
+
+def format_number(value, precision=5):
+    """Format a float the way coloraide's to_string() does"""
+    if math.isnan(value):
+        value = 0.0
+    if value == 0:
+        return "0"
+    start = -math.floor(math.log10(abs(value)))
+    digits = min(precision, start + precision - 1)
+    value = math.floor(value * 10.0 ** digits + 0.5) / 10.0 ** digits
+    return f"{value:0.{max(digits, 1)}f}".rstrip('0').rstrip('.') or "0"
+
+
+def format_oklch(lch):
+    """Format one (L, C, H) triple as an oklch() string"""
+    l, c, h = (float(v) for v in lch)
+    return f"oklch({format_number(l)} {format_number(c)} {format_number(h)})"
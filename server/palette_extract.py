@@ -0,0 +1,149 @@
+"""
+Dominant palette of an image, evaluated for contrast in the same call.
+
+Designers often upload a mockup and ask which of its colors work together.
+Instead of having the model guess hex codes, the palette is extracted on
+the server:
+
+1. The image is decoded at reduced size (JPEG DCT scaling via draft(),
+   then a box reduce()) to at most PALETTE_SAMPLE_PIXELS pixels.
+2. Pixels are binned into a 5-bit-per-channel histogram with
+   np.bincount; each occupied bin keeps its pixel count and the sum of
+   its exact sRGB values.
+3. A weighted k-means runs in OKLab over the occupied bins (a few
+   thousand points instead of hundreds of thousands of pixels), seeded
+   with a deterministic weighted farthest-point pass, so the same image
+   always gives the same palette.
+4. Each cluster is reported as the pixel-weighted mean of its sRGB values
+   (flat design colors come back exactly) and the palette goes through
+   analyze_palette() for the N x N contrast matrix.
+
+Environment:
+  PALETTE_SAMPLE_PIXELS  pixels kept after downsampling (default 262144)
+"""
+import math
+import os
+import time
+
+import numpy as np
+
+import oklab
+from color_audit import analyze_palette
+from image_audit import load_image_bytes, open_image, to_rgb
+
+SAMPLE_PIXELS = int(os.getenv("PALETTE_SAMPLE_PIXELS", str(512 * 512)))
+MIN_COLORS = 2
+MAX_COLORS = 16
+# 5 bits per channel: 32768 bins, quantization step well under 1 ΔE OKLab
+BIN_BITS = 5
+MAX_ITERATIONS = 24
+
+
+def load_pixels(data, sample_pixels=SAMPLE_PIXELS):
+    """(pixels, 3) uint8 array of the image downsampled to ~sample_pixels, plus its full size"""
+    image = open_image(data)
+    width, height = image.size
+    factor = max(1, math.ceil(math.sqrt(width * height / sample_pixels)))
+    try:
+        if factor > 1:
+            # JPEG decodes at 1/2, 1/4 or 1/8 scale directly; other formats ignore this
+            image.draft("RGB", (width // factor, height // factor))
+            factor = max(1, math.ceil(math.sqrt(image.width * image.height / sample_pixels)))
+        image = to_rgb(image)
+        if factor > 1:
+            image = image.reduce(factor)
+    except OSError as e:
+        raise ValueError(f"Invalid image: {e}")
+    return np.asarray(image).reshape(-1, 3), (width, height)
+
+
+def color_histogram(pixels, bits=BIN_BITS):
+    """Occupied bins of a bits-per-channel histogram: pixel counts and mean sRGB"""
+    shift = 8 - bits
+    q = (pixels >> shift).astype(np.int32)
+    index = (q[:, 0] << (2 * bits)) | (q[:, 1] << bits) | q[:, 2]
+    size = 1 << (3 * bits)
+    counts = np.bincount(index, minlength=size)
+    occupied = np.flatnonzero(counts)
+    sums = np.stack([
+        np.bincount(index, weights=pixels[:, channel], minlength=size)[occupied]
+        for channel in range(3)
+    ], axis=1)
+    weights = counts[occupied].astype(np.float64)
+    return weights, sums / weights[:, None]
+
+
+def _seed_centers(lab, weights, k):
+    """Deterministic k-means++ style seeding: heaviest bin, then weighted farthest points"""
+    chosen = [int(np.argmax(weights))]
+    distance = np.sum((lab - lab[chosen[0]]) ** 2, axis=1)
+    for _ in range(1, k):
+        score = weights * distance
+        best = int(np.argmax(score))
+        if score[best] <= 0:
+            break
+        chosen.append(best)
+        distance = np.minimum(distance, np.sum((lab - lab[best]) ** 2, axis=1))
+    return lab[chosen].copy()
+
+
+def weighted_kmeans(lab, weights, k, iterations=MAX_ITERATIONS):
+    """Lloyd iterations over weighted points; returns (centers, labels)"""
+    centers = _seed_centers(lab, weights, k)
+    labels = None
+    for _ in range(iterations):
+        # |x - c|^2 without the |x|^2 term, which does not change the argmin
+        distance = np.sum(centers ** 2, axis=1)[None, :] - 2.0 * lab @ centers.T
+        new_labels = np.argmin(distance, axis=1)
+        if labels is not None and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        totals = np.bincount(labels, weights=weights, minlength=len(centers))
+        for channel in range(3):
+            sums = np.bincount(labels, weights=weights * lab[:, channel], minlength=len(centers))
+            np.divide(sums, totals, out=centers[:, channel], where=totals > 0)
+    return centers, labels
+
+
+def quantize(pixels, palette_size):
+    """Dominant colors of a pixel array: [(rgb uint8, share)] sorted by share"""
+    weights, mean_rgb = color_histogram(pixels)
+    lab = oklab.linear_to_oklab(oklab.srgb_to_linear(mean_rgb / 255.0))
+    _, labels = weighted_kmeans(lab, weights, min(palette_size, len(weights)))
+
+    totals = np.bincount(labels, weights=weights)
+    used = np.flatnonzero(totals)
+    rgb_sums = np.stack([
+        np.bincount(labels, weights=weights * mean_rgb[:, channel])
+        for channel in range(3)
+    ], axis=1)
+    rgb = np.clip(np.rint(rgb_sums[used] / totals[used, None]), 0, 255).astype(np.uint8)
+    shares = totals[used] / weights.sum()
+    # Largest share first; stable, so ties keep cluster order
+    order = np.argsort(-shares, kind="stable")
+    return rgb[order], shares[order]
+
+
+def analyze_image_palette(image_data=None, image_url=None, palette_size=6, include_matrix=False):
+    """Extract the dominant palette of an image and evaluate every pair for WCAG contrast"""
+    timings = {}
+    start = time.perf_counter()
+    pixels, (width, height) = load_pixels(load_image_bytes(image_data, image_url))
+    timings["decode"] = time.perf_counter() - start
+
+    tick = time.perf_counter()
+    rgb, shares = quantize(pixels, max(MIN_COLORS, min(MAX_COLORS, int(palette_size))))
+    timings["quantize"] = time.perf_counter() - tick
+
+    tick = time.perf_counter()
+    palette = [{"color": oklab.to_hex(color), "name": f"Color {i + 1}"} for i, color in enumerate(rgb)]
+    result = analyze_palette(palette, include_matrix)
+    lch = oklab.srgb8_to_oklch(rgb)
+    for i, color in enumerate(result["colors"]):
+        color["share"] = round(float(shares[i]), 4)
+        color["oklch"] = oklab.format_oklch(lch[i])
+    timings["analysis"] = time.perf_counter() - tick
+
+    result["image"] = {"width": width, "height": height, "sampled_pixels": len(pixels)}
+    result["timings_ms"] = {stage: round(seconds * 1000, 1) for stage, seconds in timings.items()}
+    return result
@@ -0,0 +1,293 @@
+"""
+Content-addressed cache of tools/call results.
+
+The same design tokens and screenshots are audited over and over, so
+results are kept at two levels:
+
+- call level: the whole tools/call result, keyed by a hash of the tool
+  name and its canonical (sorted-key JSON) arguments;
+- pair level: one analyzed pair of check_color_accessibility, keyed by
+  its normalized colors plus everything else that shapes the result
+  (target, metrics, thresholds, vision options). A call that repeats
+  most of a previous audit only analyzes the pairs that are new.
+
+Two tiers: an in-memory LRU per process (color_cache.LRUCache) and an
+optional SQLite file (WAL mode) that several uvicorn workers share.
+Entries expire after RESULT_CACHE_TTL seconds; the memory tier is
+bounded by entry count and the SQLite tier by total value bytes, least
+recently used first. Keys carry a schema version, so changing the result
+format only needs a SCHEMA_VERSION bump.
+
+Cached values are shared, not copied: callers must not mutate them.
+
+Environment:
+  RESULT_CACHE_SIZE           entries in the memory tier (default 20000, 0 = cache disabled)
+  RESULT_CACHE_TTL            seconds an entry stays valid (default 3600)
+  RESULT_CACHE_DB             SQLite file of the shared tier (default: none)
+  RESULT_CACHE_DB_MAX_BYTES   size of the SQLite tier before eviction (default 512 MB)
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from color_cache import LRUCache
+
+SCHEMA_VERSION = 1
+
+CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "20000"))
+TTL = float(os.getenv("RESULT_CACHE_TTL", "3600"))
+DB_PATH = os.getenv("RESULT_CACHE_DB", "")
+DB_MAX_BYTES = int(os.getenv("RESULT_CACHE_DB_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Size / expiry checks of the SQLite tier happen every this many writes
+_EVICTION_INTERVAL = 512
+# SQLite host-parameter limit is 999 on older builds
+_SQL_BATCH = 500
+
+
+def _dumps(value, sort_keys=False):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), sort_keys=sort_keys)
+
+
+def _digest(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _kind(key):
+    return key[:key.index(":")]
+
+
+def call_key(tool_name, arguments):
+    """Key of a whole tools/call: tool name plus canonical arguments"""
+    return "call:" + _digest(_dumps([SCHEMA_VERSION, tool_name, arguments], sort_keys=True))
+
+
+def pair_keys(foregrounds, backgrounds, target_ratio, options):
+    """
+    Keys of analyzed pairs: normalized fg/bg colors plus the target and the
+    analysis options, which are hashed once for the whole call.
+    """
+    context = _digest(_dumps([SCHEMA_VERSION, target_ratio, options], sort_keys=True))
+    return ["pair:" + _digest(fg + "\0" + bg) + context for fg, bg in zip(foregrounds, backgrounds)]
+
+
+class _SQLiteTier:
+    """Shared tier: one row per entry with its expiry and last access time"""
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._conn = None
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.evictions = 0
+
+    def _connection(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+                "expires REAL NOT NULL, accessed REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, keys, now):
+        """{key: (expires, value bytes)} of the stored keys, touching their access time"""
+        found = {}
+        with self._lock:
+            conn = self._connection()
+            for start in range(0, len(keys), _SQL_BATCH):
+                batch = keys[start:start + _SQL_BATCH]
+                marks = ",".join("?" * len(batch))
+                rows = conn.execute(f"SELECT key, expires, value FROM results WHERE key IN ({marks})", batch)
+                found.update((key, (expires, value)) for key, expires, value in rows)
+                live = [key for key in batch if key in found and found[key][0] > now]
+                if live:
+                    conn.execute(f"UPDATE results SET accessed = ? WHERE key IN ({','.join('?' * len(live))})",
+                                 [now, *live])
+        return found
+
+    def put_many(self, items, now):
+        """Store [(key, expires, value bytes)], evicting if the tier grew past max_bytes"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT OR REPLACE INTO results (key, value, size, expires, accessed) VALUES (?, ?, ?, ?, ?)",
+                [(key, value, len(value), expires, now) for key, expires, value in items])
+            conn.execute("COMMIT")
+            self._writes += len(items)
+            if self._writes >= _EVICTION_INTERVAL:
+                self._writes = 0
+                self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        """Drop expired rows, then least recently used ones down to 90% of max_bytes, in one transaction"""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            evicted = conn.execute("DELETE FROM results WHERE expires <= ?", (now,)).rowcount
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+            if total > self.max_bytes:
+                # Rows whose older neighbours don't free the excess yet: a running sum by access time
+                evicted += conn.execute(
+                    "DELETE FROM results WHERE key IN (SELECT key FROM ("
+                    "SELECT key, SUM(size) OVER (ORDER BY accessed, key ROWS UNBOUNDED PRECEDING) - size AS freed "
+                    "FROM results) WHERE freed < ?)", (total - int(self.max_bytes * 0.9),)).rowcount
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self.evictions += evicted
+
+    def clear(self):
+        with self._lock:
+            self._connection().execute("DELETE FROM results")
+            self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        return {"path": self.path, "entries": entries, "bytes": size,
+                "max_bytes": self.max_bytes, "evictions": self.evictions}
+
+
+class ResultCache:
+    """Memory LRU in front of an optional shared SQLite tier, with TTL and per-kind hit counters"""
+
+    def __init__(self, maxsize=CACHE_SIZE, ttl=TTL, db_path=DB_PATH, db_max_bytes=DB_MAX_BYTES):
+        self.enabled = maxsize > 0 and ttl > 0
+        self.ttl = ttl
+        self.memory = LRUCache(max(1, maxsize))
+        self.disk = _SQLiteTier(db_path, db_max_bytes) if db_path and self.enabled else None
+        self._counts = {}
+        self._lock = threading.Lock()
+        # Background SQLite writes still running (kept referenced until done)
+        self._writes = set()
+
+    def _count(self, tally):
+        """Add {(kind, event): n} to the counters"""
+        with self._lock:
+            for (kind, event), n in tally.items():
+                counts = self._counts.setdefault(kind, {"memory_hits": 0, "disk_hits": 0, "misses": 0, "expired": 0})
+                counts[event] += n
+
+    def get_many(self, keys):
+        """
+        {key: value} of the keys with a live entry in either tier. Each
+        lookup counts once: a memory or disk hit, else "expired" if a tier
+        held a stale entry, else a miss.
+        """
+        if not self.enabled:
+            return {}
+        now = time.time()
+        found = {}
+        missing = []
+        stale = set()
+        tally = Counter()
+        for key in dict.fromkeys(keys):
+            entry = self.memory.get(key)
+            if entry is not None and entry[0] > now:
+                found[key] = entry[1]
+                tally[_kind(key), "memory_hits"] += 1
+            else:
+                if entry is not None:
+                    stale.add(key)
+                missing.append(key)
+        if missing and self.disk is not None:
+            for key, (expires, value) in self.disk.get_many(missing, now).items():
+                if expires <= now:
+                    stale.add(key)
+                    continue
+                found[key] = json.loads(value)
+                # Promote, keeping the expiry of the shared entry
+                self.memory.put(key, (expires, found[key]))
+                tally[_kind(key), "disk_hits"] += 1
+        for key in missing:
+            if key not in found:
+                tally[_kind(key), "expired" if key in stale else "misses"] += 1
+        self._count(tally)
+        return found
+
+    def _put_memory(self, items):
+        now = time.time()
+        expires = now + self.ttl
+        for key, value in items:
+            self.memory.put(key, (expires, value))
+        return now, expires
+
+    def _put_disk(self, items, now, expires):
+        self.disk.put_many([(key, expires, _dumps(value).encode("utf-8")) for key, value in items], now)
+
+    def put_many(self, items):
+        """Store [(key, value)] in both tiers"""
+        if not self.enabled or not items:
+            return
+        now, expires = self._put_memory(items)
+        if self.disk is not None:
+            self._put_disk(items, now, expires)
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def put(self, key, value):
+        self.put_many([(key, value)])
+
+    async def aget_many(self, keys):
+        """get_many() off the event loop when the SQLite tier is in use"""
+        if self.disk is None or not keys:
+            return self.get_many(keys)
+        return await asyncio.to_thread(self.get_many, keys)
+
+    async def aput_many(self, items):
+        """
+        put_many() for the event loop: the memory tier is updated at once,
+        the SQLite write happens in the background (write-behind), so it
+        never adds to the latency of the call that produced the results.
+        """
+        if not self.enabled or not items:
+            return
+        now, expires = self._put_memory(items)
+        if self.disk is not None:
+            task = asyncio.ensure_future(asyncio.to_thread(self._put_disk, items, now, expires))
+            self._writes.add(task)
+            task.add_done_callback(self._writes.discard)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+        with self._lock:
+            self._counts.clear()
+
+    def stats(self):
+        with self._lock:
+            kinds = {kind: dict(counts) for kind, counts in self._counts.items()}
+        for counts in kinds.values():
+            hits = counts["memory_hits"] + counts["disk_hits"]
+            lookups = hits + counts["misses"] + counts["expired"]
+            counts["hit_rate"] = round(hits / lookups, 4) if lookups else 0.0
+        memory = self.memory.stats()
+        return {
+            "enabled": self.enabled,
+            "ttl_seconds": self.ttl,
+            "memory": {"size": memory["size"], "maxsize": memory["maxsize"], "evictions": memory["evictions"]},
+            "disk": self.disk.stats() if self.disk is not None else None,
+            "kinds": kinds,
+        }
+
+
+RESULTS = ResultCache()
+
+
+def stats():
+    return RESULTS.stats()
@@ -0,0 +1,145 @@
+"""
+Responses rendered to bytes once and served as-is, plus the compression
+helpers shared with dynamic responses.
+
+`initialize`, `resources/list`, `tools/list`, `resources/read` and the
+/widget demo page never change while the server runs, so their bodies
+are serialized (and compressed) at startup. JSON-RPC results are stored
+as `{"jsonrpc":"2.0","result":...,"id":` followed by the id: per request
+only the id is encoded, and for gzip only that tail is deflated and
+appended to the pre-compressed head (a deflate stream may continue with
+independent blocks; the gzip trailer CRC is combined from the head's).
+
+Documents served on GET carry a strong ETag (a hash of the content),
+suffixed per content coding as each encoding is its own representation;
+If-None-Match matches any coding of the same content and gets a 304.
+JSON-RPC results have no ETag: their body holds the request's id.
+"""
+import gzip
+import hashlib
+import json
+import struct
+import zlib
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Content codings this server can produce, in order of preference
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+# gzip member header: deflate, no flags, mtime 0, no extra flags, unknown OS
+_GZIP_HEADER = b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff"
+
+
+def dumps(value):
+    """Serialize like JSONResponse does (compact separators, UTF-8)"""
+    return json.dumps(value, ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def make_etag(content):
+    """Content hash used as the base of every variant's ETag"""
+    return hashlib.sha256(content).hexdigest()[:32]
+
+
+def variant_etag(etag, encoding=None):
+    """Quoted strong ETag of one content coding"""
+    return f'"{etag}-{encoding}"' if encoding else f'"{etag}"'
+
+
+def etag_matches(if_none_match, etag):
+    """True if an If-None-Match header names any variant of the content"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for tag in if_none_match.split(","):
+        # If-None-Match uses weak comparison (RFC 9110 13.1.2)
+        tag = tag.strip().removeprefix("W/").strip('"')
+        if tag.split("-", 1)[0] == etag:
+            return True
+    return False
+
+
+def choose_encoding(accept_encoding, available=ENCODINGS):
+    """Best content coding from an Accept-Encoding header, or None for identity"""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[token.strip().lower()] = quality
+    for coding in available:
+        if weights.get(coding, weights.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+
+def compress(body, encoding):
+    """Compress a dynamic response body with a fast setting of the chosen coding"""
+    if encoding == "br" and brotli is not None:
+        return brotli.compress(body, quality=4)
+    if encoding == "gzip":
+        return gzip.compress(body, 6, mtime=0)
+    return body
+
+
+class StaticJSONRPC:
+    """A JSON-RPC result serialized once; only the request id varies"""
+
+    def __init__(self, result):
+        content = dumps(result)
+        self._head = b'{"jsonrpc":"2.0","result":' + content + b',"id":'
+
+        # Raw deflate of the head, flushed to a byte boundary but not finished
+        compressor = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS)
+        self._gzip_head = (_GZIP_HEADER + compressor.compress(self._head)
+                           + compressor.flush(zlib.Z_SYNC_FLUSH))
+        self._head_crc = zlib.crc32(self._head)
+
+    def body(self, request_id):
+        return self._head + dumps(request_id) + b"}"
+
+    def gzip_body(self, request_id):
+        tail = dumps(request_id) + b"}"
+        compressor = zlib.compressobj(1, zlib.DEFLATED, -zlib.MAX_WBITS)
+        deflated = compressor.compress(tail) + compressor.flush()
+        crc = zlib.crc32(tail, self._head_crc)
+        size = (len(self._head) + len(tail)) & 0xFFFFFFFF
+        return self._gzip_head + deflated + struct.pack("<II", crc, size)
+
+    def render(self, request_id, encoding=None):
+        """(body bytes, content coding) for the encoding chosen by choose_encoding"""
+        if encoding == "gzip":
+            return self.gzip_body(request_id), "gzip"
+        return self.body(request_id), None
+
+
+class StaticDocument:
+    """A fixed document with its gzip and (if available) brotli variants"""
+
+    def __init__(self, content, media_type):
+        self.media_type = media_type
+        self.etag = make_etag(content)
+        self.variants = {None: content, "gzip": gzip.compress(content, 9, mtime=0)}
+        if brotli is not None:
+            self.variants["br"] = brotli.compress(content, quality=11)
+
+    @property
+    def encodings(self):
+        return tuple(coding for coding in ("br", "gzip") if coding in self.variants)
+
+    def render(self, encoding=None):
+        """(body bytes, content coding) for the encoding chosen by choose_encoding"""
+        if encoding not in self.variants:
+            encoding = None
+        return self.variants[encoding], encoding
@@ -0,0 +1,170 @@
+"""
+Structured, non-blocking logging.
+
+The server used to print() several lines per pair and per suggestion,
+synchronously, from the event loop. Logging now goes through the
+standard logging module with a queue in between:
+
+- Callers only build a LogRecord and put it on a bounded queue. The
+  message is formatted by a background thread (QueueListener), never on
+  the request path; when the queue is full, records are dropped and
+  counted instead of blocking.
+- Disabled levels cost one isEnabledFor() check: hot loops check it once
+  per batch, not per pair.
+- Each JSON-RPC request produces one INFO summary. The code handling the
+  request attaches fields to it with annotate() (pairs, failed, cache,
+  ...). Per-pair and per-suggestion detail is DEBUG and sampled
+  (LOG_PAIR_SAMPLE of the records are kept).
+
+Records carry structured fields (`extra={"fields": {...}}`), written as
+key=value after the message (LOG_FORMAT=text, the emoji lines as before)
+or as one JSON object per line (LOG_FORMAT=json). Each process, worker
+processes included, has its own queue and writer thread.
+
+Environment:
+  LOG_LEVEL         DEBUG, INFO, WARNING or ERROR (default INFO)
+  LOG_FORMAT        text or json (default text)
+  LOG_PAIR_SAMPLE   fraction of per-pair DEBUG records kept (default 0.01)
+  LOG_QUEUE_SIZE    records waiting to be written before new ones are dropped (default 10000)
+"""
+import atexit
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+PAIR_SAMPLE = float(os.getenv("LOG_PAIR_SAMPLE", "0.01"))
+QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+ROOT = "color_a11y"
+
+_FIELDS = contextvars.ContextVar("log_fields", default=None)
+
+
+class TextFormatter(logging.Formatter):
+    """The message, then its fields as key=value"""
+
+    def format(self, record):
+        message = record.getMessage()
+        fields = getattr(record, "fields", None)
+        if fields:
+            message += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_info:
+            message += "\n" + self.formatException(record.exc_info)
+        return message
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message and fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """
+    Enqueue the record as is: formatting happens in the listener thread
+    (the stock prepare() formats in the caller). Arguments must not be
+    mutated after logging, which holds for the strings and numbers logged here.
+    """
+
+    def __init__(self, records):
+        super().__init__(records)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_handler = None
+_listener = None
+_configure_lock = threading.Lock()
+
+
+def configure(level=LEVEL, fmt=FORMAT, stream=None):
+    """Route the ROOT logger through the queue to `stream` (stdout); only the first call has effect"""
+    global _handler, _listener
+    with _configure_lock:
+        if _listener is not None:
+            return
+        output = logging.StreamHandler(stream or sys.stdout)
+        output.setFormatter(JSONFormatter() if fmt == "json" else TextFormatter())
+        _handler = _NonBlockingQueueHandler(queue.Queue(QUEUE_SIZE))
+        _listener = QueueListener(_handler.queue, output)
+        _listener.start()
+        logger = logging.getLogger(ROOT)
+        logger.addHandler(_handler)
+        logger.setLevel(level)
+        logger.propagate = False
+        atexit.register(shutdown)
+
+
+def shutdown():
+    """Write what is still queued and stop the writer thread"""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+            logging.getLogger(ROOT).removeHandler(_handler)
+
+
+def get_logger(name):
+    configure()
+    return logging.getLogger(f"{ROOT}.{name}")
+
+
+def sampled(rate=PAIR_SAMPLE):
+    """True for a `rate` fraction of calls: whether to log one per-pair DEBUG record"""
+    return rate >= 1.0 or random.random() < rate
+
+
+@contextlib.contextmanager
+def request_fields():
+    """Collect the annotate() fields of one request; yields the dict they go into"""
+    fields = {}
+    token = _FIELDS.set(fields)
+    try:
+        yield fields
+    finally:
+        _FIELDS.reset(token)
+
+
+def annotate(**fields):
+    """Add fields to the summary record of the running request (no-op outside one)"""
+    current = _FIELDS.get()
+    if current is not None:
+        current.update(fields)
+
+
+def stats():
+    return {
+        "level": logging.getLevelName(logging.getLogger(ROOT).level),
+        "format": FORMAT,
+        "queued": _handler.queue.qsize() if _handler is not None else 0,
+        "dropped": _handler.dropped if _handler is not None else 0,
+    }
+
@@ -0,0 +1,246 @@
+"""
+In-process metrics registry, exposed in the Prometheus text format at /metrics.
+
+A handful of counters, gauges and histograms with fixed label names,
+rendered as text exposition format 0.0.4 without any client library.
+Updates take a lock and a dict lookup (histograms add a bisect over
+their bucket bounds), so instrumentation stays on for every request.
+
+Label values come from closed sets (known JSON-RPC methods and tool
+names, everything else reported as "other"), so a client sending
+arbitrary names cannot grow the series count.
+
+Metrics:
+  mcp_rpc_requests_total            JSON-RPC requests by method and tool
+  mcp_rpc_errors_total              error responses by method, tool and code
+  mcp_rpc_duration_seconds          request latency by method and tool
+  mcp_color_pairs_per_call          pairs per check_color_accessibility call
+  mcp_color_pairs_failing_total     analyzed pairs failing WCAG AA (normal text)
+  mcp_color_pairs_invalid_total     pairs whose colors could not be parsed
+  mcp_suggestions_generated_total   OKLCH suggestions produced by the solver
+  mcp_suggestion_duration_seconds   time in generate_oklch_suggestions_batch per call
+  mcp_event_loop_lag_seconds        delay of a periodic timer on the event loop
+  mcp_worker_pool_in_flight         analysis tasks submitted and not finished
+  mcp_worker_pool_queue_depth       analysis tasks waiting for a worker
+
+Environment:
+  TELEMETRY_LAG_INTERVAL  seconds between event-loop lag probes (default 0.5, 0 = off)
+"""
+import asyncio
+import bisect
+import os
+import threading
+
+LAG_INTERVAL = float(os.getenv("TELEMETRY_LAG_INTERVAL", "0.5"))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets (seconds): sub-millisecond cached responses up to 100k-pair audits
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PAIR_BUCKETS = (1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+OTHER = "other"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if isinstance(value, float):
+        if value == float("inf"):
+            return "+Inf"
+        return repr(value)
+    return str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = self._header()
+        lines.extend(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}" for labels, value in values)
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, *labels):
+        if amount:
+            with self._lock:
+                self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+
+class Gauge(_Metric):
+    """Gauge set by the code, or read from `callback()` at scrape time"""
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labelnames=(), callback=None):
+        super().__init__(name, help_text, labelnames)
+        self.callback = callback
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def render(self):
+        if self.callback is not None:
+            self.set(self.callback())
+        return super().render()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(float(bound) for bound in buckets)
+
+    def observe(self, value, *labels):
+        # bisect_left: a value equal to a bound belongs to that bucket (le = less or equal)
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][slot] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, *labels):
+        state = self._values.get(labels)
+        return state[2] if state else 0
+
+    def render(self):
+        with self._lock:
+            values = sorted((labels, ([*counts], total, n)) for labels, (counts, total, n) in self._values.items())
+        lines = self._header()
+        for labels, (counts, total, n) in values:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {n}")
+        return lines
+
+
+REGISTRY = []
+
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+def render():
+    """Every registered metric in the Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def clear():
+    for metric in REGISTRY:
+        metric.clear()
+
+
+# ============================================================================
+# METRICS
+# ============================================================================
+
+RPC_REQUESTS = register(Counter(
+    "mcp_rpc_requests_total", "JSON-RPC requests handled, by method and tool.", ("method", "tool")))
+RPC_ERRORS = register(Counter(
+    "mcp_rpc_errors_total", "JSON-RPC error responses and tool results with isError, by method, tool and code.",
+    ("method", "tool", "code")))
+RPC_DURATION = register(Histogram(
+    "mcp_rpc_duration_seconds", "JSON-RPC request latency, by method and tool.", ("method", "tool")))
+PAIRS_PER_CALL = register(Histogram(
+    "mcp_color_pairs_per_call", "Color pairs received per check_color_accessibility call.", buckets=PAIR_BUCKETS))
+FAILING_PAIRS = register(Counter(
+    "mcp_color_pairs_failing_total", "Analyzed color pairs failing WCAG AA for normal text."))
+INVALID_PAIRS = register(Counter(
+    "mcp_color_pairs_invalid_total", "Color pairs whose colors could not be parsed."))
+SUGGESTIONS = register(Counter(
+    "mcp_suggestions_generated_total", "OKLCH color suggestions generated for failing pairs."))
+SUGGESTION_DURATION = register(Histogram(
+    "mcp_suggestion_duration_seconds", "Time spent in generate_oklch_suggestions_batch per call, over all workers."))
+EVENT_LOOP_LAG = register(Histogram(
+    "mcp_event_loop_lag_seconds", "Delay of a periodic event-loop timer past its deadline.", buckets=LAG_BUCKETS))
+
+
+def label(value, allowed):
+    """`value` if it belongs to the closed set `allowed`, else "other" (bounded series count)"""
+    return value if value in allowed else OTHER
+
+
+def observe_rpc(method, tool, seconds, response):
+    """Count one handled JSON-RPC request, its latency and its error, if any"""
+    RPC_REQUESTS.inc(1, method, tool)
+    RPC_DURATION.observe(seconds, method, tool)
+    if not response:
+        return
+    if "error" in response:
+        RPC_ERRORS.inc(1, method, tool, str(response["error"].get("code", "")))
+    elif isinstance(response.get("result"), dict) and response["result"].get("isError"):
+        RPC_ERRORS.inc(1, method, tool, "tool")
+
+
+# ============================================================================
+# EVENT LOOP LAG
+# ============================================================================
+
+async def _probe_lag(interval):
+    loop = asyncio.get_running_loop()
+    while True:
+        deadline = loop.time() + interval
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, loop.time() - deadline))
+
+
+_lag_task = None
+
+
+def start_lag_monitor(interval=LAG_INTERVAL):
+    """Start the event-loop lag probe on the running loop (no-op if disabled or running)"""
+    global _lag_task
+    if interval > 0 and _lag_task is None:
+        _lag_task = asyncio.ensure_future(_probe_lag(interval))
+
+
+def stop_lag_monitor():
+    global _lag_task
+    if _lag_task is not None:
+        _lag_task.cancel()
+        _lag_task = None
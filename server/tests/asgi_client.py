@@ -0,0 +1,44 @@
+"""
+Run HTTP requests through an ASGI app in-process, without a server.
+
+Used by the tests and by the benchmarks' end-to-end tools/call case.
+"""
+import asyncio
+
+
+async def asgi_request(app, method, path, body=b"", headers=()):
+    """Run one HTTP request through an ASGI app without a server; returns (status, body bytes)"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode("ascii"),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"testserver"), (b"content-length", str(len(body)).encode("ascii")), *headers],
+        "client": ("127.0.0.1", 0),
+        "server": ("testserver", 80),
+    }
+    request = [{"type": "http.request", "body": body, "more_body": False}]
+    finished = asyncio.Event()
+    response = {"status": None, "body": []}
+
+    async def receive():
+        if request:
+            return request.pop()
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            response["body"].append(message.get("body", b""))
+            if not message.get("more_body"):
+                finished.set()
+
+    await app(scope, receive, send)
+    return response["status"], b"".join(response["body"])
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The server modules are flat siblings imported by name (python main.py)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
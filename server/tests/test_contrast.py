@@ -0,0 +1,99 @@
+"""
+contrast_engine / contrast_metrics against the scalar WCAG functions in
+color_audit, which define the reported ratios and flags.
+"""
+import numpy as np
+import pytest
+
+import color_audit
+import contrast_engine
+import contrast_metrics
+
+
+@pytest.fixture(scope="module")
+def pairs():
+    rgb = np.random.default_rng(11).integers(0, 256, size=(5000, 2, 3), dtype=np.uint8)
+    extremes = np.array([
+        [[0, 0, 0], [255, 255, 255]],
+        [[255, 255, 255], [0, 0, 0]],
+        [[10, 10, 10], [10, 10, 10]],
+        [[118, 118, 118], [255, 255, 255]],  # 4.54: just above AA
+        [[119, 119, 119], [255, 255, 255]],  # 4.48: just below AA
+    ], dtype=np.uint8)
+    return np.concatenate([rgb, extremes, rgb[:100]])  # repeated pairs exercise deduplication
+
+
+def _hex(rgb):
+    return "#{:02X}{:02X}{:02X}".format(*(int(c) for c in rgb))
+
+
+def test_relative_luminance_is_bit_identical(pairs):
+    colors = pairs.reshape(-1, 3)
+    expected = [color_audit.calculate_luminance(r, g, b) for r, g, b in colors.tolist()]
+    assert contrast_engine.relative_luminance(colors).tolist() == expected
+
+
+def test_contrast_ratios_are_bit_identical(pairs):
+    expected = [color_audit.calculate_contrast_ratio(fg, bg) for fg, bg in pairs.tolist()]
+    assert contrast_engine.contrast_ratios(pairs[:, 0], pairs[:, 1]).tolist() == expected
+
+
+def test_contrast_matrix_matches_pairwise_ratios():
+    colors = np.random.default_rng(12).integers(0, 256, size=(40, 3), dtype=np.uint8).tolist()
+    matrix = contrast_engine.contrast_matrix(np.array(colors, dtype=np.uint8))
+    expected = [[color_audit.calculate_contrast_ratio(a, b) for b in colors] for a in colors]
+    assert matrix.tolist() == expected
+
+
+def test_analyze_batch_matches_evaluate_wcag(pairs):
+    foregrounds = [_hex(fg) for fg in pairs[:, 0]]
+    backgrounds = [_hex(bg) for bg in pairs[:, 1]]
+    batch = contrast_metrics.analyze_batch(foregrounds, backgrounds)
+    assert batch["valid"].all() and batch["errors"] == {}
+    for i, (fg, bg) in enumerate(pairs.tolist()):
+        ratio = color_audit.calculate_contrast_ratio(fg, bg)
+        assert batch["ratio"][i] == ratio
+        for flag, passes in color_audit.evaluate_wcag(ratio).items():
+            assert bool(batch[flag][i]) is passes, (i, flag)
+
+
+def test_analyze_batch_reports_invalid_pairs():
+    batch = contrast_metrics.analyze_batch(["#000000", "not-a-color", "#FFFFFF"], ["#FFFFFF", "#000000", "#FFFFFF"])
+    assert batch["valid"].tolist() == [True, False, True]
+    assert set(batch["errors"]) == {1}
+    assert batch["ratio"][0] == 21.0 and batch["ratio"][2] == 1.0
+    assert not batch["passes_aa_large"][1]
+
+
+def test_analyze_pairs_matches_scalar_reference(pairs):
+    color_pairs = [{"foreground": _hex(fg), "background": _hex(bg)} for fg, bg in pairs[:500]]
+    analyzed, errors = color_audit.analyze_pairs_with_errors(color_pairs, verbose=False)
+    assert not errors
+    for pair, (fg, bg) in zip(analyzed, pairs[:500].tolist()):
+        ratio = color_audit.calculate_contrast_ratio(fg, bg)
+        assert pair["ratio"] == round(ratio, 2)
+        assert {flag: pair[flag] for flag in color_audit.evaluate_wcag(ratio)} == color_audit.evaluate_wcag(ratio)
+
+
+def test_pack_rgb():
+    rgb = np.array([[0x12, 0x34, 0x56], [255, 255, 255]], dtype=np.uint8)
+    assert contrast_engine.pack_rgb(rgb).tolist() == [0x123456, 0xFFFFFF]
+
+
+@pytest.mark.parametrize("value", ["#AABBCCDD", "#12345", "red", "#GGG"])
+def test_hex_to_rgb_rejects_what_is_not_hex(value):
+    # Truncating or guessing would report a different color than the one given
+    with pytest.raises(ValueError):
+        color_audit.hex_to_rgb(value)
+
+
+def test_hex_to_rgb():
+    assert color_audit.hex_to_rgb("abc") == color_audit.hex_to_rgb("#AABBCC") == (0xAA, 0xBB, 0xCC)
+
+
+def test_metric_without_contrast_cannot_be_built():
+    class Incomplete(contrast_metrics.ContrastMetric):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete("incomplete", "score", None, {}, {}, (0.0, 1.0), 2)
@@ -0,0 +1,116 @@
+"""
+oklab / gamut_lut against coloraide, the reference implementation the
+vectorized conversions replace.
+"""
+import numpy as np
+import pytest
+from coloraide import Color
+
+import gamut_lut
+import oklab
+
+SAMPLES = 3000
+
+
+@pytest.fixture(scope="module")
+def rgb():
+    colors = np.random.default_rng(3).integers(0, 256, size=(SAMPLES, 3), dtype=np.uint8)
+    # Corners, grays and pure primaries are where hue and gamut edges break
+    grays = np.repeat(np.arange(0, 256, 15, dtype=np.uint8)[:, None], 3, axis=1)
+    corners = np.array([[r, g, b] for r in (0, 255) for g in (0, 255) for b in (0, 255)], dtype=np.uint8)
+    return np.concatenate([colors, grays, corners])
+
+
+def _hex(rgb):
+    return "#{:02x}{:02x}{:02x}".format(*(int(c) for c in rgb))
+
+
+def _random_lch(n, seed):
+    rng = np.random.default_rng(seed)
+    return np.stack([rng.uniform(0, 1, n), rng.uniform(0, 0.4, n), rng.uniform(0, 360, n)], axis=-1)
+
+
+def test_srgb8_to_oklch_matches_coloraide(rgb):
+    lch = oklab.srgb8_to_oklch(rgb)
+    for color, coords in zip(rgb, lch):
+        expected = Color(_hex(color)).convert("oklch").coords()
+        assert coords[0] == pytest.approx(expected[0], abs=1e-12)
+        assert coords[1] == pytest.approx(expected[1], abs=1e-12)
+        if np.isnan(expected[2]):
+            assert np.isnan(coords[2])
+        else:
+            assert abs((coords[2] - expected[2] + 180) % 360 - 180) < 1e-9
+
+
+def test_format_oklch_matches_to_string(rgb):
+    lch = oklab.srgb8_to_oklch(rgb)
+    mismatches = [
+        (_hex(color), oklab.format_oklch(coords), Color(_hex(color)).convert("oklch").to_string())
+        for color, coords in zip(rgb, lch)
+        if oklab.format_oklch(coords) != Color(_hex(color)).convert("oklch").to_string()
+    ]
+    assert mismatches == []
+
+
+@pytest.mark.parametrize("value", [0.0, 1.0, 0.5, 0.000012345678, 0.99999951, 123.456789, 359.999996, float("nan")])
+def test_format_number_matches_coloraide(value):
+    expected = Color("oklch", [value, 0, 0]).to_string().split("(")[1].split()[0]
+    assert oklab.format_number(value) == expected
+
+
+def test_oklch_to_srgb8_round_trip(rgb):
+    assert np.array_equal(oklab.oklch_to_srgb8(oklab.srgb8_to_oklch(rgb)), rgb)
+
+
+def _delta_e_ok(rgb_a, rgb_b):
+    return np.linalg.norm(oklab.srgb8_to_oklab(rgb_a) - oklab.srgb8_to_oklab(rgb_b), axis=-1)
+
+
+def _coloraide_fit(lch):
+    return np.array([
+        [round(c * 255) for c in Color("oklch", list(coords)).convert("srgb").fit(method="oklch-chroma", jnd=0)
+         .coords()]
+        for coords in lch.tolist()
+    ], dtype=np.uint8)
+
+
+def _coloraide_fit_oklab(lch):
+    return np.array([
+        Color("oklch", list(coords)).fit("srgb", method="oklch-chroma", jnd=0).convert("oklab").coords()
+        for coords in lch.tolist()
+    ])
+
+
+def test_fit_oklch_matches_coloraide_chroma_reduction():
+    lch = _random_lch(1000, 5)
+    fitted = oklab.oklch_to_oklab(oklab.fit_oklch(lch))
+    assert np.linalg.norm(fitted - _coloraide_fit_oklab(lch), axis=-1).max() <= 0.0002
+
+
+def test_fit_oklch_near_black():
+    # Linear values are ~L**3 here: a loose gamut tolerance kept chroma ~0.02
+    lch = np.array([[0.001, 0.06, 340.0], [0.0025, 0.3, 177.0], [0.004, 0.38, 167.0]])
+    fitted = oklab.oklch_to_oklab(oklab.fit_oklch(lch))
+    assert np.linalg.norm(fitted - _coloraide_fit_oklab(lch), axis=-1).max() <= 0.0002
+
+
+def test_fitted_colors_are_in_gamut():
+    fitted = oklab.fit_oklch(_random_lch(1000, 6))
+    assert oklab.in_gamut(oklab.oklab_to_linear(oklab.oklch_to_oklab(fitted))).all()
+
+
+def test_gamut_table_within_documented_error_bound():
+    # Module docstring: at most 0.017 OKLab ΔE (8-bit) from coloraide's oklch-chroma fit
+    lch = _random_lch(2000, 7)
+    from_table = oklab.oklch_to_srgb8(gamut_lut.fit(lch), fit=False)
+    against_coloraide = _delta_e_ok(from_table, _coloraide_fit(lch))
+    assert against_coloraide.max() <= 0.017
+    # ...and at most 0.034 from exact bisection, nearly all colors within 0.002
+    against_bisection = _delta_e_ok(from_table, oklab.oklch_to_srgb8(lch))
+    assert against_bisection.max() <= 0.034
+    assert (against_bisection <= 0.002).mean() >= 0.995
+
+
+def test_gamut_table_never_raises_chroma():
+    lch = _random_lch(1000, 8)
+    assert (gamut_lut.fit(lch)[:, 1] <= lch[:, 1]).all()
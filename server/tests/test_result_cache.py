@@ -0,0 +1,53 @@
+"""ResultCache tiers and the per-kind lookup counters reported in /stats."""
+import result_cache
+
+
+def _counts(cache, kind="call"):
+    return {key: value for key, value in cache.stats()["kinds"][kind].items() if key != "hit_rate"}
+
+
+def test_each_lookup_counts_once(tmp_path, monkeypatch):
+    cache = result_cache.ResultCache(maxsize=100, ttl=60, db_path=str(tmp_path / "results.db"))
+    cache.put_many([("call:live", 1), ("call:stale", 2)])
+    clock = result_cache.time.time() + 3600
+    monkeypatch.setattr(result_cache.time, "time", lambda: clock)
+    cache.put_many([("call:fresh", 3)])
+
+    # stale: expired in both tiers; fresh: hit; absent: never stored
+    found = cache.get_many(["call:stale", "call:fresh", "call:absent"])
+    assert found == {"call:fresh": 3}
+    assert _counts(cache) == {"memory_hits": 1, "disk_hits": 0, "misses": 1, "expired": 1}
+
+
+def test_expired_memory_entry_served_from_disk_is_a_disk_hit(tmp_path, monkeypatch):
+    cache = result_cache.ResultCache(maxsize=100, ttl=60, db_path=str(tmp_path / "results.db"))
+    now = result_cache.time.time()
+    cache.put_many([("pair:a", {"ratio": 4.5})])
+    # Another worker refreshed the shared entry; this process still holds the old one
+    cache.memory.put("pair:a", (now - 1, {"ratio": 0}))
+    assert cache.get_many(["pair:a"]) == {"pair:a": {"ratio": 4.5}}
+    assert _counts(cache, "pair") == {"memory_hits": 0, "disk_hits": 1, "misses": 0, "expired": 0}
+
+
+def test_memory_only_cache(monkeypatch):
+    cache = result_cache.ResultCache(maxsize=100, ttl=60, db_path="")
+    cache.put_many([("call:a", 1)])
+    clock = result_cache.time.time() + 3600
+    monkeypatch.setattr(result_cache.time, "time", lambda: clock)
+    assert cache.get_many(["call:a", "call:b"]) == {}
+    assert _counts(cache) == {"memory_hits": 0, "disk_hits": 0, "misses": 1, "expired": 1}
+
+
+def test_disk_eviction_drops_expired_then_least_recently_used(tmp_path):
+    tier = result_cache._SQLiteTier(str(tmp_path / "results.db"), max_bytes=1000)
+    # Ten 100-byte rows accessed at t=0..9, plus one expired row
+    for t in range(10):
+        tier.put_many([(f"call:{t}", 100.0, b"x" * 100)], now=float(t))
+    tier.put_many([("call:old", 5.0, b"x" * 100)], now=20.0)
+    tier.put_many([("call:new", 100.0, b"x" * 100)], now=21.0)
+    tier._evict(tier._connection(), now=50.0)
+    # 1100 live bytes over a 1000 budget: down to 900, oldest access first
+    remaining = [key for key, in tier._connection().execute("SELECT key FROM results ORDER BY accessed")]
+    assert remaining == [f"call:{t}" for t in range(2, 10)] + ["call:new"]
+    assert tier.evictions == 3
+    assert not tier._connection().in_transaction
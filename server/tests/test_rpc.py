@@ -0,0 +1,138 @@
+"""JSON-RPC handling of POST /mcp, through the ASGI app in-process."""
+import asyncio
+import json
+import os
+
+import pytest
+
+# Analysis in this process: the tests don't start the worker pool
+os.environ.setdefault("ANALYSIS_POOL_SIZE", "0")
+
+import main  # noqa: E402
+from tests.asgi_client import asgi_request  # noqa: E402
+
+
+def rpc(message, headers=()):
+    body = json.dumps(message).encode("utf-8")
+    status, content = asyncio.run(asgi_request(
+        main.app, "POST", "/mcp", body, [(b"content-type", b"application/json"), *headers]))
+    return status, json.loads(content) if content else None
+
+
+@pytest.mark.parametrize("params", [[1, 2], "color_pairs", 3])
+@pytest.mark.parametrize("method", ["tools/call", "tools/list", "initialize"])
+def test_non_object_params_are_invalid(method, params):
+    status, response = rpc({"jsonrpc": "2.0", "id": 7, "method": method, "params": params})
+    assert status == 200
+    assert response == {"jsonrpc": "2.0", "id": 7,
+                        "error": {"code": -32602, "message": "Invalid params: expected an object"}}
+
+
+def test_null_params_are_treated_as_missing():
+    status, response = rpc({"jsonrpc": "2.0", "id": 1, "method": "tools/list", "params": None})
+    assert status == 200 and "tools" in response["result"]
+
+
+def test_invalid_params_in_a_batch_only_fail_their_message():
+    status, response = rpc([
+        {"jsonrpc": "2.0", "id": 1, "method": "tools/list", "params": [1]},
+        {"jsonrpc": "2.0", "id": 2, "method": "tools/list"},
+    ])
+    assert status == 200
+    assert response[0]["error"]["code"] == -32602
+    assert "tools" in response[1]["result"]
+
+
+def test_static_results_always_have_a_body():
+    message = {"jsonrpc": "2.0", "id": 41, "method": "tools/list"}
+    status, first = rpc(message)
+    # Even with an If-None-Match that matches any content: the body holds this request's id
+    status, second = rpc({**message, "id": 42}, [(b"if-none-match", b"*")])
+    assert status == 200 and second["id"] == 42 and second["result"] == first["result"]
+
+
+def test_widget_revalidates_with_etag():
+    status, _ = asyncio.run(asgi_request(main.app, "GET", "/widget"))
+    assert status == 200
+    etag = main.WIDGET_PAGE.etag.encode("ascii")
+    status, body = asyncio.run(asgi_request(main.app, "GET", "/widget", headers=[(b"if-none-match", b'"' + etag + b'"')]))
+    assert status == 304 and body == b""
+
+
+def call_tool(name, arguments):
+    return rpc({"jsonrpc": "2.0", "id": 5, "method": "tools/call", "params": {"name": name, "arguments": arguments}})[1]
+
+
+@pytest.mark.parametrize("palette", ["#FFFFFF", 12, [["#FFFFFF"]], [{"name": "brand"}], [{"color": 5}], [None]])
+def test_check_palette_contrast_rejects_malformed_palettes(palette):
+    response = call_tool("check_palette_contrast", {"palette": palette})
+    assert response["error"]["code"] == -32602
+
+
+def test_check_palette_contrast_reports_unparseable_colors():
+    response = call_tool("check_palette_contrast", {"palette": ["#FFFFFF", "#000000", "nope"]})
+    data = response["result"]["structuredContent"]["data"]
+    assert data["total_colors"] == 2 and data["errors"][0]["index"] == 2
+
+
+@pytest.mark.parametrize("tool", ["check_image_accessibility", "extract_image_palette"])
+@pytest.mark.parametrize("arguments", [
+    {},
+    {"image_data": "!!!not base64"},
+    {"image_url": "http://169.254.169.254/latest/meta-data/"},
+    {"image_data": "aGVsbG8=", "palette_size": [6], "min_confidence": [60]},
+])
+def test_image_tools_reject_invalid_arguments(tool, arguments):
+    assert call_tool(tool, arguments)["error"]["code"] == -32602
+
+
+@pytest.mark.parametrize("arguments", [[1], "x"])
+def test_tools_reject_non_object_arguments(arguments):
+    assert call_tool("check_color_accessibility", arguments)["error"]["code"] == -32602
+
+
+@pytest.mark.parametrize("color_pairs", ["x", 1, {"foreground": "#000000"}])
+def test_check_color_accessibility_rejects_non_array_pairs(color_pairs):
+    assert call_tool("check_color_accessibility", {"color_pairs": color_pairs})["error"]["code"] == -32602
+
+
+def test_check_color_accessibility_reports_non_object_pairs():
+    response = call_tool("check_color_accessibility", {"color_pairs": [
+        1, {"foreground": "#000000", "background": "#FFFFFF"}, "x", {"foreground": "nope", "background": "#FFFFFF"}]})
+    data = response["result"]["structuredContent"]["data"]
+    assert data["total_pairs"] == 1 and data["color_pairs"][0]["ratio"] == 21.0
+    assert [invalid["index"] for invalid in data["invalid_pairs"]] == [0, 2, 3]
+
+
+@pytest.mark.parametrize("foreground", [5, ["#000000"], "rgx", "rgb(1, 2)"])
+def test_find_compliant_colors_rejects_unparseable_colors(foreground):
+    response = call_tool("find_compliant_colors", {"foreground": foreground, "background": "#FFFFFF"})
+    assert response["error"]["code"] == -32602 and "foreground" in response["error"]["message"]
+
+
+def test_color_tools_accept_the_same_syntaxes():
+    response = call_tool("find_compliant_colors", {"foreground": "red", "background": "rgb(255 255 255 / 50%)", "count": 1})
+    data = response["result"]["structuredContent"]["data"]
+    assert data["foreground"] == "red" and data["foreground_hex"] == "#FF0000"
+    assert data["background_hex"] == "#FFFFFF" and data["original_ratio"] == 4.0
+    response = call_tool("check_palette_contrast", {"palette": ["#000000", "#00000080", "hsl(0 0% 100%)"]})
+    colors = response["result"]["structuredContent"]["data"]["colors"]
+    # Alpha is composited over white, never dropped
+    assert [color.get("color_hex", color["color"]) for color in colors] == ["#000000", "#7F7F7F", "#FFFFFF"]
+    assert colors[1]["color"] == "#00000080"
+
+
+@pytest.mark.parametrize("meta", ["x", [1], 3])
+def test_non_object_meta_is_ignored(meta):
+    status, response = rpc({"jsonrpc": "2.0", "id": 9, "method": "tools/call", "params": {
+        "name": "check_color_accessibility", "_meta": meta,
+        "arguments": {"color_pairs": [{"foreground": "#000000", "background": "#FFFFFF"}]}}})
+    assert status == 200 and response["result"]["structuredContent"]["data"]["total_pairs"] == 1
+    assert "_meta" not in response["result"]
+
+
+def test_meta_timings_are_reported():
+    status, response = rpc({"jsonrpc": "2.0", "id": 9, "method": "tools/call", "params": {
+        "name": "check_color_accessibility", "_meta": {"timings": True},
+        "arguments": {"color_pairs": [{"foreground": "#000000", "background": "#FFFFFF"}]}}})
+    assert status == 200 and response["result"]["_meta"]["timings"]
@@ -0,0 +1,28 @@
+"""OKLCH suggestions from contrast_solver, as check_color_accessibility reports them."""
+import pytest
+
+import color_audit
+
+
+@pytest.mark.parametrize("background, foreground", [
+    ("#FFFFFF", "#AAAAAA"),  # background can't lighten: adjust_both would repeat adjust_fg
+    ("#000000", "#333333"),
+    ("#F1A0AF", "#E594C6"),
+])
+def test_suggestions_are_distinct(background, foreground):
+    suggestions = color_audit.generate_oklch_suggestions(background, foreground)
+    colors = [(s["preview_hex_bg"], s["preview_hex_fg"]) for s in suggestions]
+    assert suggestions and len(colors) == len(set(colors))
+
+
+def test_suggestion_hex_is_uppercase():
+    for suggestion in color_audit.generate_oklch_suggestions("#f1a0af", "#e594c6"):
+        for key in ("preview_hex_bg", "preview_hex_fg"):
+            assert suggestion[key] == suggestion[key].upper()
+
+
+def test_suggestions_reach_target():
+    for suggestion in color_audit.generate_oklch_suggestions("#777777", "#888888", target_ratio=7.0):
+        bg = color_audit.hex_to_rgb(suggestion["preview_hex_bg"])
+        fg = color_audit.hex_to_rgb(suggestion["preview_hex_fg"])
+        assert color_audit.calculate_contrast_ratio(fg, bg) >= 7.0
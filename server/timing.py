@@ -0,0 +1,171 @@
+"""
+Per-stage request timing (Server-Timing) and an on-demand sampling profiler.
+
+Stage spans: mcp_endpoint opens a Timings for each request and every
+coroutine of the request adds its stages to it through a ContextVar
+(`with timing.span("decode"): ...`). Each JSON-RPC message of a batch
+gets its own child Timings, so a message can report its own stages in
+the result `_meta` (requested with `"_meta": {"timings": true}`) while the
+Server-Timing header of the HTTP response carries the whole request.
+Stages that run in worker processes (color parsing, contrast math,
+suggestions...) come back with each chunk and are summed, so they are
+CPU time over all workers and may add up to more than the wall time.
+
+Profiler: profile() samples the Python stack of every thread of the
+server process at a fixed interval and returns them in the collapsed
+format of flamegraph.pl / speedscope / inferno ("frame;frame;frame
+count" per line). It runs in a thread against live traffic; worker
+processes are not sampled.
+
+Environment:
+  SERVER_TIMING               send the Server-Timing header (default 1)
+  DEBUG_TOKEN                 bearer token of /debug/* endpoints (default: none = disabled)
+  DEBUG_PROFILE_MAX_SECONDS   longest profiling run allowed (default 60)
+"""
+import contextlib
+import contextvars
+import hmac
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+SERVER_TIMING = os.getenv("SERVER_TIMING", "1").lower() not in ("0", "false", "no", "")
+DEBUG_TOKEN = os.getenv("DEBUG_TOKEN", "")
+PROFILE_MAX_SECONDS = float(os.getenv("DEBUG_PROFILE_MAX_SECONDS", "60"))
+PROFILE_MIN_INTERVAL = 0.001
+
+_CURRENT = contextvars.ContextVar("timings", default=None)
+
+
+class Timings:
+    """Seconds per stage name, in first-seen order; also added to `parent` if given"""
+
+    def __init__(self, parent=None):
+        self.start = time.perf_counter()
+        self.stages = {}
+        self.parent = parent
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+        if self.parent is not None:
+            self.parent.add(name, seconds)
+
+    def merge(self, stages):
+        for name, seconds in stages.items():
+            self.add(name, seconds)
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def as_ms(self):
+        """{stage: milliseconds} plus the total elapsed so far"""
+        timings = {name: round(seconds * 1000, 2) for name, seconds in self.stages.items()}
+        timings["total"] = round(self.elapsed() * 1000, 2)
+        return timings
+
+    def header(self):
+        """Server-Timing header value"""
+        return ", ".join(f"{name};dur={ms:.2f}" for name, ms in self.as_ms().items())
+
+
+def current():
+    """Timings of the running request, or None outside one"""
+    return _CURRENT.get()
+
+
+@contextlib.contextmanager
+def scope(child=False):
+    """Make a new Timings current (a child of the current one if `child`) for the block"""
+    timings = Timings(_CURRENT.get() if child else None)
+    token = _CURRENT.set(timings)
+    try:
+        yield timings
+    finally:
+        _CURRENT.reset(token)
+
+
+@contextlib.contextmanager
+def span(name):
+    """Add the duration of the block to stage `name` of the running request"""
+    timings = _CURRENT.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+def add(name, seconds):
+    timings = _CURRENT.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+def merge(stages):
+    timings = _CURRENT.get()
+    if timings is not None:
+        timings.merge(stages)
+
+
+# ============================================================================
+# SAMPLING PROFILER
+# ============================================================================
+
+_profile_lock = threading.Lock()
+
+
+def check_token(authorization):
+    """True if the Authorization header carries DEBUG_TOKEN (constant-time comparison)"""
+    scheme, _, token = (authorization or "").partition(" ")
+    return bool(DEBUG_TOKEN) and scheme.lower() == "bearer" and hmac.compare_digest(
+        token.strip().encode("utf-8"), DEBUG_TOKEN.encode("utf-8"))
+
+
+def _frame_name(code):
+    # ';' separates frames and ' ' the count in the collapsed format
+    name = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    return name.replace(";", ":")
+
+
+def _stacks(own_thread, names):
+    for thread_id, frame in sys._current_frames().items():
+        if thread_id == own_thread:
+            continue
+        stack = []
+        while frame is not None:
+            stack.append(_frame_name(frame.f_code))
+            frame = frame.f_back
+        stack.append(names.get(thread_id, f"thread-{thread_id}").replace(";", ":").replace(" ", "_"))
+        yield ";".join(reversed(stack))
+
+
+def profile(seconds, interval=0.005):
+    """
+    Sample every thread for `seconds`; returns (collapsed stacks text, samples taken).
+    Raises RuntimeError if another profiling run is in progress.
+    """
+    seconds = max(0.0, min(float(seconds), PROFILE_MAX_SECONDS))
+    interval = max(PROFILE_MIN_INTERVAL, float(interval))
+    if not _profile_lock.acquire(blocking=False):
+        raise RuntimeError("A profiling run is already in progress")
+    try:
+        own_thread = threading.get_ident()
+        counts = Counter()
+        samples = 0
+        deadline = time.perf_counter() + seconds
+        next_sample = time.perf_counter()
+        while next_sample < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            counts.update(_stacks(own_thread, names))
+            samples += 1
+            next_sample += interval
+            time.sleep(max(0.0, next_sample - time.perf_counter()))
+    finally:
+        _profile_lock.release()
+    text = "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+    return text, samples
@@ -0,0 +1,161 @@
+"""
+Process pool for CPU-bound analysis.
+
+The MCP endpoint is async, so contrast checks and suggestion solving run
+in a separate process pool instead of the event loop; `initialize`,
+`tools/list` and health checks stay responsive while a large call is
+being computed. Small jobs stay inline, where IPC would cost more than
+the work itself.
+
+Configuration (environment variables):
+  ANALYSIS_POOL_SIZE         worker processes (default: CPU count, 0 = always inline)
+  ANALYSIS_INLINE_THRESHOLD  jobs lighter than this many pairs run inline (default 256)
+  ANALYSIS_CHUNK_SIZE        pairs per task when a batch is split across workers (default 2048)
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import gamut_lut
+
+POOL_SIZE = int(os.getenv("ANALYSIS_POOL_SIZE", str(os.cpu_count() or 1)))
+INLINE_THRESHOLD = int(os.getenv("ANALYSIS_INLINE_THRESHOLD", "256"))
+CHUNK_SIZE = max(1, int(os.getenv("ANALYSIS_CHUNK_SIZE", "2048")))
+
+_executor = None
+_lock = threading.Lock()
+
+# Counters are only touched from the event loop thread
+_pending = 0
+_completed = 0
+_failed = 0
+_inline = 0
+
+
+def _init_worker():
+    """Load the lookup tables once per worker process"""
+    gamut_lut.load()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                # spawn: workers import only the analysis modules, never the web app
+                _executor = ProcessPoolExecutor(
+                    max_workers=POOL_SIZE,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                )
+    return _executor
+
+
+async def run(fn, *args, weight=0):
+    """
+    Run fn(*args) in the pool, or inline when the pool is disabled or the
+    job weighs (in pairs) less than INLINE_THRESHOLD.
+    """
+    global _pending, _completed, _failed, _inline
+    if POOL_SIZE <= 0 or weight < INLINE_THRESHOLD:
+        _inline += 1
+        return fn(*args)
+
+    loop = asyncio.get_running_loop()
+    _pending += 1
+    executor = _get_executor()
+    try:
+        result = await loop.run_in_executor(executor, fn, *args)
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory): start a fresh pool next time
+        _failed += 1
+        _discard(executor)
+        raise
+    except Exception:
+        _failed += 1
+        raise
+    finally:
+        _pending -= 1
+    _completed += 1
+    return result
+
+
+async def iter_chunks(fn, items, *args):
+    """
+    Call fn(chunk, *args), which must return a list, on CHUNK_SIZE pieces of
+    items and yield (offset, size, results) for each piece as soon as it is
+    done (completion order). With the pool enabled all pieces run on the
+    workers concurrently; otherwise they run inline one after another.
+    Inputs under INLINE_THRESHOLD are a single inline piece.
+    """
+    if len(items) < INLINE_THRESHOLD:
+        yield 0, len(items), await run(fn, items, *args)
+        return
+
+    offsets = range(0, len(items), CHUNK_SIZE)
+    if POOL_SIZE <= 0:
+        for offset in offsets:
+            chunk = items[offset:offset + CHUNK_SIZE]
+            yield offset, len(chunk), await run(fn, chunk, *args)
+            # Let other requests (and a streaming consumer) run between chunks
+            await asyncio.sleep(0)
+        return
+
+    tasks = {}
+    for offset in offsets:
+        chunk = items[offset:offset + CHUNK_SIZE]
+        task = asyncio.ensure_future(run(fn, chunk, *args, weight=INLINE_THRESHOLD))
+        tasks[task] = (offset, len(chunk))
+    try:
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in sorted(done, key=lambda t: tasks[t][0]):
+                offset, size = tasks[task]
+                yield offset, size, task.result()
+    finally:
+        # The consumer went away (e.g. client disconnected): drop queued chunks
+        for task in tasks:
+            task.cancel()
+
+
+def warm_up():
+    """Start every worker now so the first large call doesn't pay for spawning"""
+    if POOL_SIZE > 0:
+        executor = _get_executor()
+        for _ in range(POOL_SIZE):
+            executor.submit(_init_worker)
+
+
+def stats():
+    return {
+        "pool_size": POOL_SIZE,
+        "started": _executor is not None,
+        "inline_threshold": INLINE_THRESHOLD,
+        "chunk_size": CHUNK_SIZE,
+        "in_flight": _pending,
+        "queue_depth": max(0, _pending - POOL_SIZE),
+        "completed": _completed,
+        "failed": _failed,
+        "inline": _inline,
+    }
+
+
+def _discard(executor):
+    global _executor
+    with _lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown():
+    """Stop the workers (called when the server shuts down)"""
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None